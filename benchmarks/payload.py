@@ -0,0 +1,63 @@
+"""
+Micro-benchmark of building feature type payloads.
+
+Usage::
+
+    python benchmarks/payload.py --layers 10000
+
+Prints the cost per layer of geoserverlib.client.feature_type_xml for plain
+and parameterized SQL views, with the CRS cache cold and warm.
+
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from geoserverlib import crs  # NOQA
+from geoserverlib.client import feature_type_xml  # NOQA
+
+
+SRIDS = [28992, 4326, 3857, 25831, 32631]
+
+
+def build(layers, **kwargs):
+    start = time.time()
+    size = 0
+    for i in range(layers):
+        srid = SRIDS[i % len(SRIDS)]
+        payload = feature_type_xml(
+            'layer_%d' % i,
+            "SELECT * FROM data WHERE id = %d AND kind <> 'x'" % i,
+            srs='EPSG:%d' % srid, srid=srid,
+            native_bbox=(0.0, 0.0, 1000.0 + i, 1000.0), **kwargs)
+        size += len(payload)
+    return time.time() - start, size
+
+
+def report(name, layers, duration, size):
+    print "%-24s %8.1f us/layer %8d bytes/layer %10.0f layers/s" % (
+        name, duration / layers * 1e6, size / layers, layers / duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--layers', type=int, default=10000)
+    options = parser.parse_args()
+    layers = options.layers
+
+    crs.clear_cache()
+    duration, size = build(len(SRIDS))
+    report('cold crs cache', len(SRIDS), duration, size)
+    report('plain view', layers, *build(layers))
+    parameters = [('region', 'north', r'^\w+$'), ('year', 2020, r'^\d{4}$')]
+    report('parameterized view', layers,
+           *build(layers, parameters=parameters, key_column='id',
+                  geometry_type='MultiPolygon'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+"""
+Benchmarks of realistic workflows against geoserverlib.testing.FakeGeoServer.
+
+Usage::
+
+    python benchmarks/run.py --latency 0.005 --jitter 0.002 \\
+        --output benchmarks/results.jsonl --compare benchmarks/results.jsonl
+
+Every run is appended as a JSON line to the output file. With --compare, the
+results are compared with the last run in that file and the script exits
+with status 1 when a workflow got slower than --max-regression times.
+
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from geoserverlib.client import GeoserverClient  # NOQA
+from geoserverlib.limiter import AdaptiveLimiter  # NOQA
+from geoserverlib.limiter import RetryPolicy  # NOQA
+from geoserverlib.provision import provision  # NOQA
+from geoserverlib.styles import sync_styles  # NOQA
+from geoserverlib.testing import FakeGeoServer  # NOQA
+from geoserverlib.upload import ingest_shapefiles  # NOQA
+from geoserverlib.wfs import FeatureReader  # NOQA
+
+
+SLD = """<?xml version="1.0" encoding="UTF-8"?>
+<StyledLayerDescriptor version="1.0.0">
+  <NamedLayer>
+    <Name>%(name)s</Name>
+    <UserStyle>
+      <FeatureTypeStyle>
+        <Rule>
+          <PolygonSymbolizer>
+            <Fill><CssParameter name="fill">#%(color)06x</CssParameter></Fill>
+          </PolygonSymbolizer>
+        </Rule>
+      </FeatureTypeStyle>
+    </UserStyle>
+  </NamedLayer>
+</StyledLayerDescriptor>
+"""
+
+
+def make_client(server, options):
+    kwargs = {}
+    if options.adaptive:
+        kwargs['limiter'] = AdaptiveLimiter(maximum=options.workers)
+        kwargs['retry'] = RetryPolicy(backoff=0.05)
+    return GeoserverClient('127.0.0.1', server.port, 'admin', 'geoserver',
+                           pool_size=options.workers, **kwargs)
+
+
+def bench_provision(options):
+    """Provision a workspace with datastores, layers and default styles."""
+    datastores = ['store_%d' % i for i in range(10)]
+    manifest = {
+        'workspaces': ['bench'],
+        'datastores': [{'workspace': 'bench', 'name': name,
+                        'connection_parameters': {'dbtype': 'postgis'}}
+                       for name in datastores],
+        'feature_types': [],
+        'styles': [{'name': 'bench_style', 'data': SLD % {
+            'name': 'bench_style', 'color': 0}}],
+        'layer_styles': [],
+    }
+    for i in range(options.layers):
+        datastore = datastores[i % len(datastores)]
+        layer = 'layer_%d' % i
+        manifest['feature_types'].append({
+            'workspace': 'bench', 'datastore': datastore, 'name': layer,
+            'sql': 'SELECT * FROM data WHERE id = %d' % i})
+        manifest['layer_styles'].append({
+            'workspace': 'bench', 'datastore': datastore, 'layer': layer,
+            'style': 'bench_style'})
+    with FakeGeoServer(options.latency, options.jitter,
+                       options.error_rate) as server:
+        client = make_client(server, options)
+        start = time.time()
+        report = provision(client, manifest, max_workers=options.workers)
+        duration = time.time() - start
+        client.close()
+        return {'duration': duration, 'requests': server.request_count,
+                'items': options.layers, 'failed': len(report.failed)}
+
+
+def bench_upload(options):
+    """Upload zipped shapefiles in parallel."""
+    directory = tempfile.mkdtemp()
+    try:
+        jobs = []
+        for i in range(options.shapefiles):
+            path = os.path.join(directory, 'shape_%d.zip' % i)
+            with open(path, 'wb') as zipfile:
+                zipfile.write(os.urandom(options.shapefile_size))
+            jobs.append(('bench', 'shape_%d' % i, path))
+        with FakeGeoServer(options.latency, options.jitter,
+                           options.error_rate) as server:
+            client = make_client(server, options)
+            client.create_workspace('bench')
+            start = time.time()
+            results = ingest_shapefiles(client, jobs,
+                                        max_workers=options.workers)
+            duration = time.time() - start
+            client.close()
+            return {'duration': duration, 'requests': server.request_count,
+                    'items': len(jobs),
+                    'bytes': options.shapefiles * options.shapefile_size,
+                    'failed': len([result for result in results
+                                   if not result.ok])}
+    finally:
+        shutil.rmtree(directory)
+
+
+def bench_styles(options):
+    """Sync styles twice: first everything is new, then nothing changed."""
+    styles = dict(('style_%d' % i, SLD % {'name': 'style_%d' % i,
+                                          'color': i})
+                  for i in range(options.styles))
+    directory = tempfile.mkdtemp()
+    manifest_path = os.path.join(directory, 'hashes.json')
+    try:
+        with FakeGeoServer(options.latency, options.jitter,
+                           options.error_rate) as server:
+            client = make_client(server, options)
+            start = time.time()
+            first = sync_styles(client, styles, manifest_path=manifest_path,
+                                max_workers=options.workers)
+            second = sync_styles(client, styles,
+                                 manifest_path=manifest_path,
+                                 max_workers=options.workers)
+            duration = time.time() - start
+            client.close()
+            return {'duration': duration, 'requests': server.request_count,
+                    'items': options.styles,
+                    'failed': len(first.failed) + len(second.failed)}
+    finally:
+        shutil.rmtree(directory)
+
+
+def bench_wfs(options):
+    """Read all features of a layer with parallel WFS paging."""
+    features = [{'type': 'Feature', 'id': 'bench.%d' % i,
+                 'geometry': {'type': 'Point', 'coordinates': [i, i]},
+                 'properties': {'id': i, 'name': 'feature %d' % i}}
+                for i in range(options.features)]
+    with FakeGeoServer(options.latency, options.jitter,
+                       options.error_rate) as server:
+        server.add_features('bench:points', features)
+        client = make_client(server, options)
+        reader = FeatureReader(client, 'bench:points',
+                               page_size=options.page_size,
+                               max_workers=options.workers)
+        start = time.time()
+        read = sum(1 for _ in reader)
+        duration = time.time() - start
+        client.close()
+        return {'duration': duration, 'requests': server.request_count,
+                'items': read, 'bytes': reader.bytes,
+                'failed': options.features - read}
+
+
+BENCHMARKS = [
+    ('provision', bench_provision),
+    ('upload', bench_upload),
+    ('styles', bench_styles),
+    ('wfs', bench_wfs),
+]
+
+
+def last_run(path):
+    if not path or not os.path.exists(path):
+        return None
+    last = None
+    with open(path) as results_file:
+        for line in results_file:
+            if line.strip():
+                last = json.loads(line)
+    return last
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--latency', type=float, default=0.005)
+    parser.add_argument('--jitter', type=float, default=0.002)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--adaptive', action='store_true',
+                        help="use an adaptive limiter and retries")
+    parser.add_argument('--layers', type=int, default=1000)
+    parser.add_argument('--shapefiles', type=int, default=100)
+    parser.add_argument('--shapefile-size', type=int, default=256 * 1024)
+    parser.add_argument('--styles', type=int, default=2000)
+    parser.add_argument('--features', type=int, default=100000)
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--only', action='append',
+                        choices=[name for name, _ in BENCHMARKS])
+    parser.add_argument('--output', help="append results to this file")
+    parser.add_argument('--compare', help="compare with the last run here")
+    parser.add_argument('--max-regression', type=float, default=1.2)
+    options = parser.parse_args()
+
+    previous = last_run(options.compare)
+    run = {'timestamp': time.time(), 'options': vars(options), 'results': {}}
+    regressions = []
+    for name, benchmark in BENCHMARKS:
+        if options.only and name not in options.only:
+            continue
+        result = benchmark(options)
+        result['rate'] = result['items'] / result['duration']
+        run['results'][name] = result
+        line = "%-10s %8.2fs %8.1f items/s %7d requests %d failed" % (
+            name, result['duration'], result['rate'], result['requests'],
+            result['failed'])
+        if previous and name in previous['results']:
+            ratio = result['duration'] / previous['results'][name]['duration']
+            line += "  (%.2fx previous)" % ratio
+            if ratio > options.max_regression:
+                regressions.append(name)
+        print line
+
+    if options.output:
+        with open(options.output, 'a') as results_file:
+            results_file.write(json.dumps(run) + '\n')
+    if regressions:
+        print "regressions: %s" % ', '.join(regressions)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+
+from geoserverlib.client import GeoserverClient
+from geoserverlib.singleflight import FutureSingleFlight
+
+
+logger = logging.getLogger('geoserverlib.asyncclient')
+
+# Read-only methods whose identical pending calls share a future when
+# coalescing.
+COALESCED_PREFIXES = ('get_', 'list_')
+COALESCED_SUFFIXES = ('_exists',)
+
+
+def _async_method(name):
+    """Create a method that runs GeoserverClient.<name> in the worker pool."""
+    def method(self, *args, **kwargs):
+        if self.single_flight is not None and (
+                name.startswith(COALESCED_PREFIXES) or
+                name.endswith(COALESCED_SUFFIXES)):
+            key = (name, args, tuple(sorted(kwargs.items())))
+            return self.single_flight.submit(
+                key, self.submit, getattr(self.client, name), *args,
+                **kwargs)
+        return self.submit(getattr(self.client, name), *args, **kwargs)
+    method.__name__ = name
+    method.__doc__ = (
+        "Non-blocking version of GeoserverClient.%s, returns a "
+        "concurrent.futures.Future." % name)
+    return method
+
+
+class AsyncGeoserverClient(object):
+    """
+    Non-blocking Geoserver client.
+
+    Offers the same operations as GeoserverClient, but every method returns
+    a concurrent.futures.Future immediately. At most max_workers requests
+    are in flight at the same time; the others wait in the queue of the
+    worker pool.
+
+    Futures can be awaited from an asyncio event loop with
+    asyncio.wrap_future(future).
+
+    Params:
+    - max_workers, maximum number of concurrent requests
+    - client, an existing GeoserverClient to use instead of creating one;
+      host, port, username and password are ignored in that case
+    - coalesce, let identical pending calls of read-only methods (get_*,
+      list_* and *_exists) share one future; see single_flight.stats()
+    - other keyword arguments are passed to GeoserverClient
+
+    """
+    def __init__(self, host=None, port=None, username=None, password=None,
+                 max_workers=10, client=None, coalesce=False, **kwargs):
+        if client is None:
+            kwargs.setdefault('pool_size', max_workers)
+            client = GeoserverClient(host, port, username, password,
+                                     **kwargs)
+        self.client = client
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.single_flight = FutureSingleFlight() if coalesce else None
+
+    def submit(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) in the worker pool, return a Future."""
+        return self.executor.submit(fn, *args, **kwargs)
+
+    def close(self, wait=True):
+        """Shut down the worker pool and close the pooled connections."""
+        self.executor.shutdown(wait=wait)
+        self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# Mirror all public GeoserverClient methods, except context managers.
+_NOT_MIRRORED = ('prefetched',)
+for _name, _value in sorted(vars(GeoserverClient).items()):
+    if (not _name.startswith('_') and callable(_value) and
+            _name not in _NOT_MIRRORED and
+            not hasattr(AsyncGeoserverClient, _name)):
+        setattr(AsyncGeoserverClient, _name, _async_method(_name))
+del _name, _value
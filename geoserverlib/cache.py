@@ -0,0 +1,152 @@
+import threading
+import time
+
+from collections import OrderedDict
+
+
+class CatalogCache(object):
+    """
+    Thread-safe cache of catalog existence checks.
+
+    Keys are tuples of REST path segments, for example ('workspaces', 'ws')
+    or ('workspaces', 'ws', 'datastores', 'ds'), so a key is a prefix of the
+    keys of everything it contains. Entries expire after ttl seconds; when
+    more than max_size entries are stored the least recently used one is
+    evicted.
+
+    Hit and miss counts are available as the hits and misses attributes.
+
+    """
+    def __init__(self, ttl=60, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return True or False if the key is cached, None otherwise."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                exists, expires = entry
+                if self.ttl is None or expires > time.time():
+                    # Re-insert to mark as most recently used.
+                    self._entries[key] = entry
+                    self.hits += 1
+                    return exists
+            self.misses += 1
+            return None
+
+    def set(self, key, exists):
+        with self._lock:
+            self._entries.pop(key, None)
+            expires = time.time() + self.ttl if self.ttl is not None else None
+            self._entries[key] = (exists, expires)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key, recurse=False):
+        """
+        Forget the key and, with recurse, all keys below it.
+
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            if recurse:
+                length = len(key)
+                for other in list(self._entries):
+                    if other[:length] == key:
+                        del self._entries[other]
+
+    def invalidate_matching(self, predicate):
+        """Forget all keys for which predicate(key) is true."""
+        with self._lock:
+            for key in list(self._entries):
+                if predicate(key):
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return a dict with the size and hit/miss counts of the cache."""
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits,
+                    'misses': self.misses}
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CatalogIndex(object):
+    """
+    Catalog listings fetched in bulk, used to answer existence checks
+    without a request per resource.
+
+    Listings are stored per collection key, for example the names in
+    ('workspaces',) or ('workspaces', 'ws', 'datastores'). A resource key
+    can be answered when the listing of its collection, or of one of its
+    ancestors, is known.
+
+    """
+    def __init__(self):
+        self._listings = {}
+        self._lock = threading.Lock()
+
+    def set_listing(self, collection, names):
+        with self._lock:
+            self._listings[tuple(collection)] = set(names)
+
+    def listing(self, collection):
+        """Return the set of names in the collection, or None."""
+        with self._lock:
+            names = self._listings.get(tuple(collection))
+            return set(names) if names is not None else None
+
+    def exists(self, key):
+        """Return True or False if the key is covered, None otherwise."""
+        with self._lock:
+            return self._exists(key)
+
+    def _exists(self, key):
+        # Resource keys have an even length: collection, name, collection...
+        for end in range(2, len(key) + 1, 2):
+            names = self._listings.get(key[:end - 1])
+            if names is None:
+                if end == len(key):
+                    return None
+                continue
+            if key[end - 1] not in names:
+                return False
+            if end == len(key):
+                return True
+        return None
+
+    def add(self, key):
+        with self._lock:
+            names = self._listings.get(key[:-1])
+            if names is not None:
+                names.add(key[-1])
+
+    def discard(self, key):
+        """Remove the key and the listings of everything below it."""
+        with self._lock:
+            names = self._listings.get(key[:-1])
+            if names is not None:
+                names.discard(key[-1])
+            length = len(key)
+            for collection in list(self._listings):
+                if collection[:length] == key:
+                    del self._listings[collection]
+
+    def forget_listing(self, collection):
+        """Drop a listing, so its names are no longer known."""
+        with self._lock:
+            self._listings.pop(tuple(collection), None)
+
+    def clear(self):
+        with self._lock:
+            self._listings.clear()
@@ -1,16 +1,32 @@
 import os
 import json
 import logging
+import sys
+import time
 import urllib
 import urlparse
+from contextlib import contextmanager
+from xml.sax.saxutils import escape
 
 import requests
+from concurrent.futures import ThreadPoolExecutor
+
+from geoserverlib.cache import CatalogIndex
+from geoserverlib.crs import native_crs_xml
+from geoserverlib.limiter import replayable
+from geoserverlib.metrics import RequestEvent
+from geoserverlib.upload import DEFAULT_CHUNK_SIZE
+from geoserverlib.upload import iter_zip
+from geoserverlib.upload import open_upload
+from geoserverlib.upload import report_progress
+from geoserverlib.upload import shapefile_members
+from requests.adapters import HTTPAdapter
 
 
 logger = logging.getLogger('geoserverlib.client')
 
 
-class GeoserverClientException(BaseException):
+class GeoserverClientException(Exception):
     pass
 
 
@@ -37,31 +53,705 @@ def process_response(response, success_msg):
         logger.error(response.text)
 
 
+def body_size(prepared_request):
+    """Size in bytes of the body of a prepared request, None if unknown."""
+    length = prepared_request.headers.get('Content-Length')
+    if length is not None:
+        return int(length)
+    if prepared_request.body is None:
+        return 0
+    if isinstance(prepared_request.body, basestring):
+        return len(prepared_request.body)
+    return None
+
+
+def content_size(response, stream=False):
+    """
+    Size in bytes of the response body. For streamed responses only the
+    Content-Length header is used, so the body is not consumed.
+
+    """
+    length = response.headers.get('Content-Length')
+    if length is not None:
+        return int(length)
+    if stream:
+        return None
+    return len(response.content)
+
+
+def make_session(pool_size=10, keep_alive=True, max_retries=0):
+    """
+    Create a requests session with a pool of persistent connections.
+
+    Pass the returned session to several GeoserverClient instances to let
+    them share one connection pool.
+
+    Params:
+    - pool_size, maximum number of connections kept open per host
+    - keep_alive, reuse connections between requests; when False every
+      request asks the server to close the connection afterwards
+    - max_retries, number of retries on failed connection attempts
+
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=max_retries)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+    return session
+
+
+# GeoServer's default validator for SQL view parameters.
+DEFAULT_PARAMETER_REGEX = r'^[\w\d\s]+$'
+
+BOUNDING_BOX_TEMPLATE = (
+    '<%(tag)s><minx>%(minx)r</minx><maxx>%(maxx)r</maxx>'
+    '<miny>%(miny)r</miny><maxy>%(maxy)r</maxy><crs>%(crs)s</crs></%(tag)s>')
+
+
+def bounding_box_xml(tag, bbox, crs):
+    """Bounding box element for a (minx, miny, maxx, maxy) tuple."""
+    minx, miny, maxx, maxy = [float(value) for value in bbox]
+    return BOUNDING_BOX_TEMPLATE % {'tag': tag, 'minx': minx, 'maxx': maxx,
+                                    'miny': miny, 'maxy': maxy,
+                                    'crs': escape(crs)}
+
+
+def view_parameters(parameters):
+    """
+    Return SQL view parameters as a list of (name, default, regex) tuples.
+
+    Parameters are given as such tuples, as (name, default) tuples or as
+    dicts with 'name' and optional 'default' and 'regex' keys. Without a
+    regex, GeoServer's default validator DEFAULT_PARAMETER_REGEX is used.
+
+    """
+    result = []
+    for parameter in parameters or []:
+        if isinstance(parameter, dict):
+            name = parameter['name']
+            default = parameter.get('default')
+            regex = parameter.get('regex')
+        else:
+            name, default, regex = (tuple(parameter) + (None, None))[:3]
+        if regex is None:
+            regex = DEFAULT_PARAMETER_REGEX
+        result.append((name, '' if default is None else default, regex))
+    return result
+
+
+def view_params(values):
+    """
+    Format a dict of SQL view parameter values for the viewparams
+    parameter of WMS and WFS requests, e.g. {'region': 'north'} becomes
+    'region:north'.
+
+    """
+    def quote(value):
+        value = unicode(value)
+        for character in ('\\', ';', ',', ':'):
+            value = value.replace(character, '\\' + character)
+        return value
+
+    return ';'.join('%s:%s' % (quote(name), quote(value))
+                    for name, value in sorted(values.items()))
+
+
+def latlon_bbox_from_native(bbox, srid, samples=21):
+    """
+    Compute the WGS84 bounding box of a native (minx, miny, maxx, maxy)
+    bounding box by transforming points along its edges.
+
+    Returns None when pyproj is not installed.
+
+    """
+    if int(srid) == 4326:
+        return tuple(bbox)
+    try:
+        import pyproj
+    except ImportError:
+        return None
+    minx, miny, maxx, maxy = [float(value) for value in bbox]
+    xs = []
+    ys = []
+    for i in range(samples):
+        fraction = float(i) / (samples - 1)
+        x = minx + fraction * (maxx - minx)
+        y = miny + fraction * (maxy - miny)
+        xs.extend([x, x, minx, maxx])
+        ys.extend([miny, maxy, y, y])
+    source = 'EPSG:%s' % srid
+    if hasattr(pyproj, 'Transformer'):
+        transformer = pyproj.Transformer.from_crs(source, 'EPSG:4326',
+                                                  always_xy=True)
+        lons, lats = transformer.transform(xs, ys)
+    else:
+        lons, lats = pyproj.transform(pyproj.Proj(init=source.lower()),
+                                      pyproj.Proj(init='epsg:4326'), xs, ys)
+    return (min(lons), min(lats), max(lons), max(lats))
+
+
+def feature_type_xml(view, sql_query, srs='EPSG:28992', srid=28992,
+                     native_bbox=None, latlon_bbox=None, enabled=None,
+                     parameters=None, key_column=None, geometry_name='geom',
+                     geometry_type='Geometry'):
+    """
+    Return the XML payload for a feature type based on an SQL view.
+
+    Bounding boxes are (minx, miny, maxx, maxy) tuples, in the native CRS
+    and in WGS84 respectively. Parameters are the SQL view parameters (see
+    view_parameters), referenced as %name% in the SQL query; key_column is
+    the column that identifies features; geometry_name and geometry_type
+    (e.g. 'MultiPolygon') describe the geometry column.
+
+    The native CRS definition comes from geoserverlib.crs; all values are
+    XML escaped, so the SQL may contain <, > and &.
+
+    """
+    view = escape(view)
+    parts = ['<featureType><name>', view, '</name>', native_crs_xml(srid),
+             '<srs>', escape(srs), '</srs>']
+    if native_bbox is not None:
+        parts.append(bounding_box_xml('nativeBoundingBox', native_bbox, srs))
+    if latlon_bbox is not None:
+        parts.append(bounding_box_xml('latLonBoundingBox', latlon_bbox,
+                                      'EPSG:4326'))
+    if enabled is not None:
+        parts.extend(['<enabled>', str(bool(enabled)).lower(), '</enabled>'])
+    parts.extend(['<metadata><entry key="cachingEnabled">false</entry>'
+                  '<entry key="JDBC_VIRTUAL_TABLE"><virtualTable><name>',
+                  view, '</name><sql>', escape(sql_query), '</sql>'])
+    if key_column is not None:
+        parts.extend(['<keyColumn>', escape(key_column), '</keyColumn>'])
+    parts.extend(['<geometry><name>', escape(geometry_name),
+                  '</name><type>', escape(geometry_type), '</type><srid>',
+                  str(int(srid)), '</srid></geometry>'])
+    for name, default, regex in view_parameters(parameters):
+        parts.extend(['<parameter><name>', escape(name),
+                      '</name><defaultValue>', escape(unicode(default)),
+                      '</defaultValue><regexpValidator>', escape(regex),
+                      '</regexpValidator></parameter>'])
+    parts.append('</virtualTable></entry></metadata></featureType>')
+    payload = ''.join(parts)
+    if isinstance(payload, unicode):
+        payload = payload.encode('utf-8')
+    return payload
+
+
+class PublishReport(object):
+    """Responses of the requests done by GeoserverClient.publish_layer."""
+    def __init__(self, view):
+        self.view = view
+        self.responses = []
+
+    def add(self, name, response):
+        self.responses.append((name, response))
+
+    @property
+    def calls(self):
+        """Number of HTTP requests made."""
+        return len(self.responses)
+
+    @property
+    def ok(self):
+        return all(response.ok for _, response in self.responses)
+
+    def __repr__(self):
+        return '<PublishReport %s: %s in %d calls>' % (
+            self.view, 'ok' if self.ok else 'failed', self.calls)
+
+
 class GeoserverClient(object):
-    """Geoserver client class for storing connection details."""
-    def __init__(self, host, port, username, password):
+    """
+    Geoserver client class for storing connection details.
+
+    All requests go through a pooled, keep-alive session. Optional params:
+    - use_https, connect to the GeoServer over https instead of http
+    - timeout, maximum number of seconds to wait for a response
+    - connect_timeout, maximum number of seconds to wait for a connection
+    - pool_size, keep_alive, see make_session
+    - session, an existing session (see make_session) to share its
+      connection pool with other clients
+    - catalog_cache, a geoserverlib.cache.CatalogCache remembering the
+      results of existence checks; it is kept up to date by the create and
+      delete methods of this client
+    - hooks, callables that are called with a
+      geoserverlib.metrics.RequestEvent after every request
+    - response_cache, a geoserverlib.httpcache.ResponseCache for GET
+      responses, which are then revalidated with conditional requests
+    - limiter, a geoserverlib.limiter.AdaptiveLimiter capping the number of
+      concurrent requests of all threads using this client
+    - retry, a geoserverlib.limiter.RetryPolicy for retrying transient
+      errors with exponential backoff
+    - single_flight, a geoserverlib.singleflight.SingleFlight; identical
+      GETs made concurrently by several threads are then sent once and
+      share the response
+
+    """
+    def __init__(self, host, port, username, password, use_https=False,
+                 timeout=None, connect_timeout=None, pool_size=10,
+                 keep_alive=True, session=None, catalog_cache=None,
+                 hooks=None, response_cache=None, limiter=None,
+                 retry=None, single_flight=None):
         self.host = host
         self.port = port
         self.username = username
         self.password = password
-        self.base_url = 'http://%s:%s' % (self.host, self.port)
+        scheme = 'https' if use_https else 'http'
+        self.base_url = '%s://%s:%s' % (scheme, self.host, self.port)
         self.auth = (self.username, self.password)
+        if connect_timeout is not None:
+            self.timeout = (connect_timeout, timeout)
+        else:
+            self.timeout = timeout
+        if session is None:
+            session = make_session(pool_size=pool_size, keep_alive=keep_alive)
+        self.session = session
+        self.catalog_cache = catalog_cache
+        self.catalog_index = None
+        self._prefetch_options = None
+        self.hooks = list(hooks or [])
+        self.response_cache = response_cache
+        self.limiter = limiter
+        self.retry = retry
+        self.single_flight = single_flight
 
-    def workspace_exists(self, workspace):
-        request_url = url(self.base_url, ['/geoserver/rest/workspaces',
-                                          workspace])
+    def close(self):
+        """Close all pooled connections of the session."""
+        self.session.close()
+
+    def add_hook(self, hook):
+        """Call hook with a RequestEvent after every request."""
+        self.hooks.append(hook)
+
+    def request(self, method, path, **kwargs):
+        """
+        Perform a request to this GeoServer and return the response, for
+        endpoints without a method of their own.
+
+        Path is a list of url segments, e.g. ['/geoserver/rest/layers',
+        'ws:name.json'], or a path string such as '/geoserver/wfs'. Keyword
+        arguments are passed on to requests. The credentials, timeouts,
+        limiter, retry policy, caches and hooks of this client apply.
+
+        """
+        if isinstance(path, basestring):
+            request_url = self.base_url + '/' + path.lstrip('/')
+        else:
+            request_url = url(self.base_url, path)
+        return self._request(method, request_url, **kwargs)
+
+    def _request(self, method, request_url, **kwargs):
+        """
+        Perform a request through the session of this client, using the
+        credentials and timeouts of this client, single flight for GETs and
+        the response cache.
+
+        """
+        kwargs.setdefault('auth', self.auth)
+        kwargs.setdefault('timeout', self.timeout)
+        if (self.single_flight is None or method != 'GET' or
+                kwargs.get('stream')):
+            return self._cached_request(method, request_url, **kwargs)
+        key = (self._cache_key(request_url, kwargs.get('params')),
+               tuple(sorted((kwargs.get('headers') or {}).items())))
+        return self.single_flight.do(key, self._cached_request, method,
+                                     request_url, **kwargs)
+
+    def _cached_request(self, method, request_url, **kwargs):
+        """Perform a request, answering GETs from the response cache."""
+        cache = self.response_cache
+        if cache is None or kwargs.get('stream'):
+            return self._send(method, request_url, **kwargs)
+        if method != 'GET':
+            if cache.max_age:
+                # Forget the resource, its collection and what is below.
+                path = request_url.split('?')[0]
+                if method != 'POST':
+                    path = path.rsplit('/', 1)[0]
+                cache.invalidate_prefix(self._cache_key(path))
+                # Workspace, datastore and feature type writes also create
+                # or (recursively) delete layers.
+                workspaces = url(self.base_url, ['/geoserver/rest/workspaces'])
+                if path.startswith(workspaces):
+                    cache.invalidate_prefix(self._cache_key(url(
+                        self.base_url, ['/geoserver/rest/layers'])))
+            return self._send(method, request_url, **kwargs)
+
+        key = self._cache_key(request_url, kwargs.get('params'))
+        entry = cache.get(key)
+        if entry is None:
+            cache.count('misses')
+            response = self._send(method, request_url, **kwargs)
+            if response.status_code == 200:
+                cache.store(key, response)
+            return response
+        if cache.fresh(entry):
+            cache.count('hits')
+            return cache.build_response(entry)
+        headers = dict(kwargs.get('headers') or {})
+        headers.update(cache.conditional_headers(entry))
+        kwargs['headers'] = headers
+        cache.count('revalidations')
+        response = self._send(method, request_url, **kwargs)
+        if response.status_code == 304:
+            cache.count('hits')
+            cache.touch(key)
+            return cache.build_response(entry, response.request)
+        cache.count('misses')
+        if response.status_code == 200:
+            cache.store(key, response)
+        return response
+
+    def _cache_key(self, request_url, params=None):
+        """Response cache key: the user and the url including params."""
+        if params:
+            separator = '&' if '?' in request_url else '?'
+            request_url += separator + urllib.urlencode(sorted(params.items()))
+        return '%s %s' % (self.username, request_url)
+
+    def _send(self, method, request_url, **kwargs):
+        """
+        Perform a request within the concurrency limit, retrying transient
+        failures according to the retry policy.
+
+        """
+        retry = self.retry
+        if retry is not None and not replayable(kwargs):
+            retry = None
+        attempt = 0
+        while True:
+            response = error = exc_info = None
+            try:
+                if self.limiter is None:
+                    response = self._send_once(method, request_url, **kwargs)
+                else:
+                    with self.limiter.slot() as outcome:
+                        response = self._send_once(method, request_url,
+                                                   **kwargs)
+                        outcome.report(response.status_code < 500)
+            except Exception as e:
+                error, exc_info = e, sys.exc_info()
+            if retry is None or not retry.should_retry(
+                    method, attempt, response=response, error=error):
+                if error is not None:
+                    raise exc_info[0], exc_info[1], exc_info[2]
+                return response
+            delay = retry.delay(attempt)
+            logger.warning("%s %s failed (%s), retrying in %.1fs" % (
+                method, request_url,
+                error if error is not None else response.status_code, delay))
+            retry.retried += 1
+            attempt += 1
+            time.sleep(delay)
+
+    def _send_once(self, method, request_url, **kwargs):
+        """Perform a request and report it to the hooks."""
+        if not self.hooks:
+            return self.session.request(method, request_url, **kwargs)
+        start = time.time()
+        try:
+            response = self.session.request(method, request_url, **kwargs)
+        except Exception as e:
+            self._emit(RequestEvent(method, request_url,
+                                    latency=time.time() - start, error=e))
+            raise
+        latency = time.time() - start
+        self._emit(RequestEvent(
+            method, response.request.url, status=response.status_code,
+            bytes_sent=body_size(response.request),
+            bytes_received=content_size(response, kwargs.get('stream')),
+            latency=latency))
+        return response
+
+    def _emit(self, event):
+        for hook in self.hooks:
+            try:
+                hook(event)
+            except Exception:
+                logger.exception("request hook failed")
+
+    def _cached_exists(self, key):
+        """
+        Return the existence of a catalog key according to the prefetched
+        catalog index or the cache, or None if unknown.
+
+        """
+        if self.catalog_index is not None:
+            exists = self.catalog_index.exists(key)
+            if exists is not None:
+                return exists
+        if self.catalog_cache is None:
+            return None
+        return self.catalog_cache.get(key)
+
+    def _remember(self, key, exists, recurse=False):
+        """
+        Store the existence of a catalog key in the index and the cache.
+        With recurse, everything below the key is forgotten as well.
+
+        """
+        if self.catalog_index is not None:
+            if exists:
+                self.catalog_index.add(key)
+            else:
+                self.catalog_index.discard(key)
+        if self.catalog_cache is None:
+            return
+        if recurse:
+            self.catalog_cache.invalidate(key, recurse=True)
+        self.catalog_cache.set(key, exists)
+
+    def _forget_layers(self, workspace, datastore=None, feature_type=None):
+        """
+        Forget the layers published from a deleted workspace, datastore or
+        feature type. Call before remembering the deletion, while the
+        listings below it are still known.
+
+        """
+        prefix = workspace + ':'
+        if feature_type is not None:
+            names = [feature_type]
+        elif datastore is None or self.catalog_index is None:
+            names = None
+        else:
+            names = self.catalog_index.listing((
+                'workspaces', workspace, 'datastores', datastore,
+                'featuretypes'))
+        if self.catalog_index is not None:
+            if names is not None:
+                for name in names:
+                    self.catalog_index.discard(('layers', prefix + name))
+            elif datastore is None:
+                for name in self.catalog_index.listing(('layers',)) or []:
+                    if name.startswith(prefix):
+                        self.catalog_index.discard(('layers', name))
+            else:
+                # Which layers the datastore published is unknown.
+                self.catalog_index.forget_listing(('layers',))
+        if self.catalog_cache is not None:
+            if names is not None:
+                for name in names:
+                    self.catalog_cache.set(('layers', prefix + name), False)
+            else:
+                self.catalog_cache.invalidate_matching(
+                    lambda key: key[0] == 'layers' and len(key) == 2 and
+                    key[1].startswith(prefix))
+
+    def _remember_datastore(self, workspace, datastore):
+        """Remember a created datastore, which implies its workspace."""
+        self._remember(('workspaces', workspace), True)
+        self._remember(('workspaces', workspace, 'datastores', datastore),
+                       True)
+
+    def _resource_exists(self, key, segments):
+        """
+        Check whether the catalog resource at the url segments exists,
+        using the index and cache for key when possible.
+
+        """
+        cached = self._cached_exists(key)
+        if cached is not None:
+            return cached
+        request_url = url(self.base_url, segments)
         logger.debug("request url: %s" % request_url)
         headers = {'content-type': 'application/json'}
-        response = requests.get(request_url, headers=headers, auth=self.auth)
+        response = self._request('GET', request_url, headers=headers)
         if response.ok:
+            self._remember(key, True)
             return True
         elif response.status_code == 404:
-            # workspace does not exist
+            self._remember(key, False)
             return False
         else:
             logger.error("unexpected status code: %s (%s)" % (
                 response.status_code, response.text))
 
+    def _get_json(self, segments):
+        """
+        Return the JSON representation of the catalog resource at the url
+        segments as a dict, or None if it does not exist.
+
+        """
+        segments = list(segments)
+        segments[-1] = segments[-1] + '.json'
+        request_url = url(self.base_url, segments)
+        logger.debug("request url: %s" % request_url)
+        response = self._request('GET', request_url)
+        if response.ok:
+            return response.json()
+        if response.status_code != 404:
+            logger.error("unexpected status code: %s (%s)" % (
+                response.status_code, response.text))
+        return None
+
+    def _list(self, segments, collection, item):
+        """
+        Return the names in a REST catalog listing, for example
+        {"workspaces": {"workspace": [{"name": ...}, ...]}}, or None when
+        the request fails.
+
+        """
+        segments = list(segments)
+        segments[-1] = segments[-1] + '.json'
+        request_url = url(self.base_url, segments)
+        logger.debug("request url: %s" % request_url)
+        response = self._request('GET', request_url)
+        if not response.ok:
+            logger.error("listing failed: %s (%s)" % (
+                response.status_code, response.text))
+            return None
+        content = response.json().get(collection)
+        # GeoServer returns an empty string for an empty collection.
+        if not content:
+            return []
+        items = content.get(item, [])
+        if isinstance(items, dict):
+            items = [items]
+        return [entry['name'] for entry in items]
+
+    def list_workspaces(self):
+        return self._list(['/geoserver/rest/workspaces'],
+                          'workspaces', 'workspace')
+
+    def list_datastores(self, workspace):
+        return self._list(['/geoserver/rest/workspaces', workspace,
+                           'datastores'], 'dataStores', 'dataStore')
+
+    def list_feature_types(self, workspace, datastore):
+        return self._list(['/geoserver/rest/workspaces', workspace,
+                           'datastores', datastore, 'featuretypes'],
+                          'featureTypes', 'featureType')
+
+    def list_layers(self):
+        """Return layer names, prefixed with their workspace ('ws:name')."""
+        return self._list(['/geoserver/rest/layers'], 'layers', 'layer')
+
+    def list_styles(self, workspace=None):
+        """Return the global styles, or the styles of a workspace."""
+        if workspace is None:
+            segments = ['/geoserver/rest/styles']
+        else:
+            segments = ['/geoserver/rest/workspaces', workspace, 'styles']
+        return self._list(segments, 'styles', 'style')
+
+    def prefetch(self, workspaces=None, feature_types=True, layers=True,
+                 styles=True, max_workers=4):
+        """
+        Fetch catalog listings in bulk so that the *_exists methods can be
+        answered locally, without a request per resource.
+
+        Params:
+        - workspaces, names of the workspaces to fetch datastores (and
+          feature types) for; all workspaces when None
+        - feature_types, layers, styles, whether to fetch these listings
+        - max_workers, number of listing requests done in parallel
+
+        The listings are kept up to date by the create and delete methods
+        of this client. Call refresh_prefetch to fetch them again and
+        end_prefetch to go back to asking the server.
+
+        """
+        self._prefetch_options = dict(
+            workspaces=workspaces, feature_types=feature_types,
+            layers=layers, styles=styles, max_workers=max_workers)
+        index = CatalogIndex()
+        all_workspaces = self.list_workspaces()
+        if all_workspaces is None:
+            raise GeoserverClientException("could not list workspaces")
+        index.set_listing(('workspaces',), all_workspaces)
+        if workspaces is None:
+            workspaces = all_workspaces
+        workspaces = [workspace for workspace in workspaces
+                      if workspace in all_workspaces]
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            datastore_futures = dict(
+                (workspace, executor.submit(self.list_datastores, workspace))
+                for workspace in workspaces)
+            other_futures = {}
+            if layers:
+                other_futures[('layers',)] = executor.submit(self.list_layers)
+            if styles:
+                other_futures[('styles',)] = executor.submit(self.list_styles)
+                for workspace in workspaces:
+                    other_futures[('workspaces', workspace, 'styles')] = \
+                        executor.submit(self.list_styles, workspace)
+            for workspace, future in datastore_futures.items():
+                datastores = future.result()
+                if datastores is None:
+                    continue
+                index.set_listing(('workspaces', workspace, 'datastores'),
+                                  datastores)
+                if feature_types:
+                    for datastore in datastores:
+                        collection = ('workspaces', workspace, 'datastores',
+                                      datastore, 'featuretypes')
+                        other_futures[collection] = executor.submit(
+                            self.list_feature_types, workspace, datastore)
+            for collection, future in other_futures.items():
+                names = future.result()
+                if names is not None:
+                    index.set_listing(collection, names)
+        finally:
+            executor.shutdown(wait=True)
+        self.catalog_index = index
+        return index
+
+    def refresh_prefetch(self):
+        """Fetch the listings of the last prefetch call again."""
+        if self._prefetch_options is None:
+            raise GeoserverClientException("prefetch has not been called")
+        return self.prefetch(**self._prefetch_options)
+
+    def end_prefetch(self):
+        """Stop answering existence checks from prefetched listings."""
+        self.catalog_index = None
+        self._prefetch_options = None
+
+    @contextmanager
+    def prefetched(self, **kwargs):
+        """
+        Context manager for a batch of operations using prefetched
+        listings, takes the same arguments as prefetch.
+
+        """
+        self.prefetch(**kwargs)
+        try:
+            yield self.catalog_index
+        finally:
+            self.end_prefetch()
+
+    def feature_type_exists(self, workspace, datastore, feature_type):
+        key = ('workspaces', workspace, 'datastores', datastore,
+               'featuretypes', feature_type)
+        return self._resource_exists(
+            key, ['/geoserver/rest/workspaces', workspace, 'datastores',
+                  datastore, 'featuretypes', feature_type])
+
+    def layer_exists(self, layer):
+        """Layer names are prefixed with their workspace ('ws:name')."""
+        return self._resource_exists(
+            ('layers', layer), ['/geoserver/rest/layers', layer])
+
+    def style_exists(self, style_name, workspace=None):
+        if workspace is None:
+            key = ('styles', style_name)
+            segments = ['/geoserver/rest/styles', style_name]
+        else:
+            key = ('workspaces', workspace, 'styles', style_name)
+            segments = ['/geoserver/rest/workspaces', workspace, 'styles',
+                        style_name]
+        return self._resource_exists(key, segments)
+
+    def workspace_exists(self, workspace):
+        return self._resource_exists(
+            ('workspaces', workspace),
+            ['/geoserver/rest/workspaces', workspace])
+
     def create_workspace(self, workspace):
         """
 
@@ -76,10 +766,12 @@ class GeoserverClient(object):
         logger.debug("request url: %s" % request_url)
         headers = {'content-type': 'application/json'}
         payload = {'workspace': {'name': workspace}}
-        response = requests.post(request_url, data=json.dumps(payload),
-                                 headers=headers, auth=self.auth)
+        response = self._request('POST', request_url,
+                                 data=json.dumps(payload), headers=headers)
         success_msg = "workspace '%s' created successfully" % workspace
         process_response(response, success_msg)
+        if response.ok:
+            self._remember(('workspaces', workspace), True)
         return response
 
     def delete_workspace(self, workspace, recurse=False):
@@ -91,27 +783,23 @@ class GeoserverClient(object):
         params = {'recurse': str(recurse).lower()}
         request_url = url(self.base_url, ['/geoserver/rest/workspaces',
                                           workspace])
-        response = requests.delete(request_url, auth=self.auth, params=params)
+        response = self._request('DELETE', request_url, params=params)
         success_msg = "deleted workspace '%s'" % workspace
         process_response(response, success_msg)
+        if response.ok:
+            if recurse:
+                self._forget_layers(workspace)
+            self._remember(('workspaces', workspace), False, recurse=True)
         return response
 
     def datastore_exists(self, workspace, datastore):
-        request_url = url(self.base_url, ['/geoserver/rest/workspaces',
-                                          workspace, 'datastores', datastore])
-        logger.debug("request url: %s" % request_url)
-        headers = {'content-type': 'application/json'}
-        response = requests.get(request_url, headers=headers, auth=self.auth)
-        if response.ok:
-            return True
-        elif response.status_code == 404:
-            # workspace does not exist
-            return False
-        else:
-            logger.warning("unexpected status code: %s (%s)" % (
-                response.status_code, response.text))
+        return self._resource_exists(
+            ('workspaces', workspace, 'datastores', datastore),
+            ['/geoserver/rest/workspaces', workspace, 'datastores',
+             datastore])
 
-    def upload_shapefile(self, workspace, datastore, path):
+    def upload_shapefile(self, workspace, datastore, path, progress=None,
+                         chunk_size=DEFAULT_CHUNK_SIZE, use_mmap=False):
         """
         Mimicks XML cUrl command, for example:
 
@@ -119,6 +807,11 @@ class GeoserverClient(object):
         
         Path is the absolute path to the zipfile.
         The separate .shp, .shx, .dbf etc. files must be in the root of the zip.
+
+        The zipfile is streamed as the raw request body in chunks of
+        chunk_size bytes, optionally read through an mmap (use_mmap), so
+        the archive is never held in memory as a whole. Progress is reported
+        by calling progress(bytes_sent, total_bytes, bytes_per_second).
         """
         # if datastore exists, return
         if self.datastore_exists(workspace, datastore):
@@ -128,15 +821,53 @@ class GeoserverClient(object):
                                           workspace, 'datastores',
                                           datastore, 'file.shp'])
         headers = {'content-type': 'application/zip'}
-        archivefile = open(path, 'rb')
-        response = requests.put(request_url, headers=headers,
-                                auth=self.auth,
-                                files={'filename': archivefile})
+        with open_upload(path, progress=progress, chunk_size=chunk_size,
+                         use_mmap=use_mmap) as body:
+            response = self._request('PUT', request_url, headers=headers,
+                                     data=body)
+            logger.debug("sent %d bytes in %.2fs (%.0f bytes/s)" % (
+                body.bytes_sent, body.elapsed, body.throughput))
         success_msg = "shapefile datastore '%s' created successfully" % datastore
         process_response(response, success_msg)
-        archivefile.close()
+        if response.ok:
+            self._remember_datastore(workspace, datastore)
         return response
     
+    def upload_shapefile_components(self, workspace, datastore, source,
+                                    progress=None, compresslevel=6):
+        """
+        Zip shapefile components on the fly and stream the zip to GeoServer,
+        without writing a temporary zipfile.
+
+        Source is either the path to a .shp file (the .shx, .dbf, .prj and
+        .cpg files next to it are collected automatically) or a dict
+        mapping filenames (e.g. 'roads.shp') to paths or file-like objects.
+
+        The size of the zip is not known up front, so it is sent with
+        chunked transfer encoding. Progress is reported by calling
+        progress(bytes_sent, None, bytes_per_second).
+        """
+        if self.datastore_exists(workspace, datastore):
+            logger.error("datastore '%s' already exists" % datastore)
+            return False
+        if isinstance(source, dict):
+            members = sorted(source.items())
+        else:
+            members = shapefile_members(source)
+        request_url = url(self.base_url, ['/geoserver/rest/workspaces',
+                                          workspace, 'datastores',
+                                          datastore, 'file.shp'])
+        headers = {'content-type': 'application/zip'}
+        body = report_progress(iter_zip(members, compresslevel=compresslevel),
+                               progress=progress)
+        response = self._request('PUT', request_url, headers=headers,
+                                 data=body)
+        success_msg = "shapefile datastore '%s' created successfully" % datastore
+        process_response(response, success_msg)
+        if response.ok:
+            self._remember_datastore(workspace, datastore)
+        return response
+
     def add_shapefile_directory(self, workspace, datastore, path):
         """
         Mimicks XML cUrl command, for example:
@@ -155,11 +886,12 @@ curl -v -u admin:geoserver -XPUT -H "Content-type: text/plain" -d "file:///var/l
                                           datastore, 'external.shp'])
         headers = {'content-type': 'text/plain'}
         datapath = 'file://{}/'.format(path.rstrip('/'))
-        response = requests.put(request_url, 
-                                auth=self.auth, headers=headers,
-                                data=datapath, params={'configure': 'all'})
+        response = self._request('PUT', request_url, headers=headers,
+                                 data=datapath, params={'configure': 'all'})
         success_msg = "shapefile datastore '%s' created successfully" % datastore
         process_response(response, success_msg)
+        if response.ok:
+            self._remember_datastore(workspace, datastore)
         return response
     
     def create_datastore(self, workspace, datastore, connection_parameters):
@@ -196,10 +928,12 @@ curl -v -u admin:geoserver -XPUT -H "Content-type: text/plain" -d "file:///var/l
                 'connectionParameters': connection_parameters
             }
         }
-        response = requests.post(request_url, data=json.dumps(payload),
-                                 headers=headers, auth=self.auth)
+        response = self._request('POST', request_url,
+                                 data=json.dumps(payload), headers=headers)
         success_msg = "datastore '%s' created successfully" % datastore
         process_response(response, success_msg)
+        if response.ok:
+            self._remember_datastore(workspace, datastore)
         return response
 
     def delete_datastore(self, workspace, datastore, recurse=False):
@@ -211,13 +945,21 @@ curl -v -u admin:geoserver -XPUT -H "Content-type: text/plain" -d "file:///var/l
         params = {'recurse': str(recurse).lower()}
         request_url = url(self.base_url, ['/geoserver/rest/workspaces',
                                           workspace, 'datastores', datastore])
-        response = requests.delete(request_url, auth=self.auth, params=params)
+        response = self._request('DELETE', request_url, params=params)
         success_msg = "deleted datastore '%s'" % datastore
         process_response(response, success_msg)
+        if response.ok:
+            if recurse:
+                self._forget_layers(workspace, datastore)
+            self._remember(('workspaces', workspace, 'datastores', datastore),
+                           False, recurse=True)
         return response
 
     def create_feature_type(self, workspace, datastore, view, sql_query,
-                            srs='EPSG:28992', srid=28992):
+                            srs='EPSG:28992', srid=28992, native_bbox=None,
+                            latlon_bbox=None, enabled=None, parameters=None,
+                            key_column=None, geometry_name='geom',
+                            geometry_type='Geometry'):
         """
         Mimicks XML cUrl command, for example:
 
@@ -229,42 +971,139 @@ curl -v -u admin:geoserver -XPUT -H "Content-type: text/plain" -d "file:///var/l
         cause is an order problem, since JSON dicts are unordered and XML is
         ordered (see http://jira.codehaus.org/browse/GEOS-4986).
 
+        Optional native_bbox and latlon_bbox are (minx, miny, maxx, maxy)
+        tuples; enabled sets the enabled flag of the feature type.
+
+        Parameters turn the SQL view into a parameterized one: a list of
+        (name, default, regex) tuples or dicts (see view_parameters), used
+        as %name% in the query and filled in by the viewparams of WMS and
+        WFS requests (see view_params). One feature type can so serve many
+        filtered views. Key_column, geometry_name and geometry_type
+        describe the columns of the view.
+
         """
         request_url = url(self.base_url, ['/geoserver/rest/workspaces',
                                           workspace, 'datastores', datastore,
                                           'featuretypes'])
         headers = {'content-type': 'text/xml'}
-        payload = """
-        <featureType>
-            <name>%(view)s</name>
-            <nativeCRS class="projected">PROJCS["Amersfoort / RD New", GEOGCS["Amersfoort", DATUM["Amersfoort", SPHEROID["Bessel 1841", 6377397.155, 299.1528128, AUTHORITY["EPSG","7004"]], TOWGS84[565.2369, 50.0087, 465.658, -0.40685733032239757, -0.3507326765425626, 1.8703473836067959, 4.0812], AUTHORITY["EPSG","6289"]], PRIMEM["Greenwich", 0.0, AUTHORITY["EPSG","8901"]], UNIT["degree", 0.017453292519943295], AXIS["Geodetic longitude", EAST], AXIS["Geodetic latitude", NORTH], AUTHORITY["EPSG","4289"]], PROJECTION["Oblique_Stereographic", AUTHORITY["EPSG","9809"]], PARAMETER["central_meridian", 5.387638888888891], PARAMETER["latitude_of_origin", 52.15616055555556], PARAMETER["scale_factor", 0.9999079], PARAMETER["false_easting", 155000.0], PARAMETER["false_northing", 463000.0], UNIT["m", 1.0], AXIS["Easting", EAST], AXIS["Northing", NORTH], AUTHORITY["EPSG","%(srid)s"]]</nativeCRS>
-            <srs>%(srs)s</srs>
-            <metadata>
-                <entry key="cachingEnabled">false</entry>
-                <entry key="JDBC_VIRTUAL_TABLE">
-                <virtualTable>
-                    <name>%(view)s</name>
-                    <sql>%(sql_query)s</sql>
-                    <geometry>
-                        <name>geom</name>
-                        <type>Geometry</type>
-                        <srid>%(srid)s</srid>
-                    </geometry>
-                </virtualTable>
-                </entry>
-            </metadata>
-        </featureType>""" % {
-            'view': view,
-            'sql_query': sql_query,
-            'srs': srs,
-            'srid': srid
-        }
-        response = requests.post(request_url, data=payload, headers=headers,
-                                 auth=self.auth)
+        payload = feature_type_xml(view, sql_query, srs=srs, srid=srid,
+                                   native_bbox=native_bbox,
+                                   latlon_bbox=latlon_bbox, enabled=enabled,
+                                   parameters=parameters,
+                                   key_column=key_column,
+                                   geometry_name=geometry_name,
+                                   geometry_type=geometry_type)
+        response = self._request('POST', request_url, data=payload,
+                                 headers=headers)
         success_msg = "view '%s' created successfully" % view
         process_response(response, success_msg)
+        if response.ok:
+            self._remember(('workspaces', workspace, 'datastores', datastore,
+                            'featuretypes', view), True)
+            self._remember(('layers', '%s:%s' % (workspace, view)), True)
         return response
 
+    def publish_layer(self, workspace, datastore, view, sql_query,
+                      srs='EPSG:28992', srid=28992, native_bbox=None,
+                      latlon_bbox=None, style_name=None, **view_options):
+        """
+        Create an enabled feature type (and layer) for an SQL view and set
+        its default style, in as few requests as possible.
+
+        The enabled flag and the bounding boxes are included in the feature
+        type POST. When native_bbox is given but latlon_bbox is not, the
+        lat/lon bounding box is computed locally if pyproj is installed.
+        Only when the bounding boxes are not known is a separate request
+        made to let GeoServer recalculate them. Setting the default style
+        always takes a separate request. Other keyword arguments (parameters,
+        key_column, geometry_name, geometry_type) are passed to
+        create_feature_type.
+
+        Returns a PublishReport with the responses of all requests.
+
+        """
+        report = PublishReport(view)
+        if native_bbox is not None and latlon_bbox is None:
+            latlon_bbox = latlon_bbox_from_native(native_bbox, srid)
+        bboxes_known = native_bbox is not None and latlon_bbox is not None
+        response = self.create_feature_type(
+            workspace, datastore, view, sql_query, srs=srs, srid=srid,
+            native_bbox=native_bbox if bboxes_known else None,
+            latlon_bbox=latlon_bbox if bboxes_known else None, enabled=True,
+            **view_options)
+        report.add('create_feature_type', response)
+        if not response.ok:
+            return report
+        if not bboxes_known:
+            report.add('recalculate_bounding_boxes',
+                       self.recalculate_bounding_boxes(workspace, datastore,
+                                                       view))
+        if style_name is not None:
+            report.add('set_default_style',
+                       self.set_default_style(workspace, datastore, view,
+                                              style_name))
+        logger.info("published '%s' in %d requests" % (view, report.calls))
+        return report
+
+    def update_feature_type(self, workspace, datastore, view, sql_query,
+                            srs='EPSG:28992', srid=28992, **view_options):
+        """
+        Replace the SQL query and SRS of an existing SQL view feature type.
+        Other keyword arguments (parameters, key_column, geometry_name,
+        geometry_type) are as for create_feature_type.
+
+        cURL example:
+        curl -u admin:geoserver -XPUT -T xml/featuretype.xml -H 'Content-type: text/xml' http://localhost:${GEOSERVER_PORT}/geoserver/rest/workspaces/deltaportaal/datastores/deltaportaal/featuretypes/deltaportaalview
+
+        """
+        request_url = url(self.base_url, ['/geoserver/rest/workspaces',
+                                          workspace, 'datastores', datastore,
+                                          'featuretypes', view])
+        headers = {'content-type': 'text/xml'}
+        payload = feature_type_xml(view, sql_query, srs=srs, srid=srid,
+                                   enabled=True, **view_options)
+        response = self._request('PUT', request_url, data=payload,
+                                 headers=headers)
+        success_msg = "view '%s' updated successfully" % view
+        process_response(response, success_msg)
+        return response
+
+    def get_datastore(self, workspace, datastore):
+        """
+        Return the datastore as a dict (the parsed JSON representation),
+        or None if it does not exist.
+
+        """
+        content = self._get_json(['/geoserver/rest/workspaces', workspace,
+                                  'datastores', datastore])
+        if content is None:
+            return None
+        return content.get('dataStore')
+
+    def get_feature_type(self, workspace, datastore, view):
+        """
+        Return the feature type as a dict (the parsed JSON representation),
+        or None if it does not exist.
+
+        """
+        content = self._get_json(['/geoserver/rest/workspaces', workspace,
+                                  'datastores', datastore, 'featuretypes',
+                                  view])
+        if content is None:
+            return None
+        return content.get('featureType')
+
+    def get_layer(self, layer):
+        """
+        Return the layer ('ws:name') as a dict (the parsed JSON
+        representation), or None if it does not exist.
+
+        """
+        content = self._get_json(['/geoserver/rest/layers', layer])
+        if content is None:
+            return None
+        return content.get('layer')
+
     def recalculate_bounding_boxes(self, workspace, datastore, view):
         """
         Request for recalculating native and lat/lon bounding boxes.
@@ -279,8 +1118,8 @@ curl -v -u admin:geoserver -XPUT -H "Content-type: text/plain" -d "file:///var/l
         xml = '<featureType><name>%s</name><enabled>true</enabled></featureType>' % view
         # WARNING: GeoServer recalculate bug - delimiter is ' in 2.2 rc1, not ,
         request_url = request_url + '?recalculate=nativebbox,latlonbbox'
-        response = requests.put(request_url, data=xml,
-                                headers=headers, auth=self.auth)
+        response = self._request('PUT', request_url, data=xml,
+                                 headers=headers)
         success_msg = "recalculated bounding boxes for '%s' layer" % view
         process_response(response, success_msg)
         return response
@@ -292,23 +1131,33 @@ curl -v -u admin:geoserver -XPUT -H "Content-type: text/plain" -d "file:///var/l
 
         """
         request_url = url(self.base_url, ['/geoserver/rest/layers', layer])
-        response = requests.delete(request_url, auth=self.auth)
+        response = self._request('DELETE', request_url)
         success_msg = "deleted '%s' layer" % layer
         process_response(response, success_msg)
+        if response.ok:
+            self._remember(('layers', layer), False)
         return response
 
-    def delete_feature_type(self, workspace, datastore, layer):
+    def delete_feature_type(self, workspace, datastore, layer,
+                            recurse=False):
         """
         cURL example:
         curl -u admin:geoserver -XDELETE -H 'Content-type: text/xml' http://localhost:${GEOSERVER_PORT}/geoserver/rest/workspaces/deltaportaal/datastores/deltaportaal/featuretypes/deltaportaalview
 
+        With recurse, the layer of the feature type is deleted as well.
+
         """
+        params = {'recurse': str(recurse).lower()}
         request_url = url(self.base_url, ['/geoserver/rest/workspaces',
                                           workspace, 'datastores', datastore,
                                           'featuretypes', layer])
-        response = requests.delete(request_url, auth=self.auth)
+        response = self._request('DELETE', request_url, params=params)
         success_msg = "deleted '%s' feature type" % layer
         process_response(response, success_msg)
+        if response.ok:
+            self._forget_layers(workspace, datastore, layer)
+            self._remember(('workspaces', workspace, 'datastores', datastore,
+                            'featuretypes', layer), False)
         return response
 
     def create_style(self, style_name, style_filename=None, style_data=None):
@@ -331,8 +1180,8 @@ curl -v -u admin:geoserver -XPUT -H "Content-type: text/plain" -d "file:///var/l
                 'filename': filename
             }
         }
-        response = requests.post(request_url, data=json.dumps(payload),
-                                 headers=headers, auth=self.auth)
+        response = self._request('POST', request_url,
+                                 data=json.dumps(payload), headers=headers)
         if response.ok:
             request_url = url(self.base_url, ['/geoserver/rest/styles',
                                               style_name])
@@ -341,14 +1190,79 @@ curl -v -u admin:geoserver -XPUT -H "Content-type: text/plain" -d "file:///var/l
             else:
                 xml = open(style_filename, 'r').read()
             headers = {'content-type': 'application/vnd.ogc.sld+xml'}
-            response = requests.put(request_url, data=xml, headers=headers,
-                                    auth=self.auth)
+            response = self._request('PUT', request_url, data=xml,
+                                     headers=headers)
             success_msg = "style '%s' created successfully" % style_name
             process_response(response, success_msg)
+            if response.ok:
+                self._remember(('styles', style_name), True)
         else:
             logger.error(response.text)
         return response
 
+    def upload_style(self, style_name, style_filename=None, style_data=None):
+        """
+        Create a style with its SLD in a single request, so no style without
+        SLD is left behind on failure.
+
+        cURL example:
+        curl -u admin:geoserver -XPOST -H 'Content-type: application/vnd.ogc.sld+xml' -d @xml/deltaportaal.sld http://localhost:${GEOSERVER_PORT}/geoserver/rest/styles?name=deltaportaal
+
+        """
+        request_url = url(self.base_url, ['/geoserver/rest/styles'],
+                          {'name': style_name})
+        if style_data:
+            xml = style_data
+        else:
+            xml = open(style_filename, 'r').read()
+        headers = {'content-type': 'application/vnd.ogc.sld+xml'}
+        response = self._request('POST', request_url, data=xml,
+                                 headers=headers)
+        success_msg = "style '%s' created successfully" % style_name
+        process_response(response, success_msg)
+        if response.ok:
+            self._remember(('styles', style_name), True)
+        return response
+
+    def get_style_body(self, style_name):
+        """
+        Return the SLD of a style, or None if the style does not exist.
+
+        Example URL:
+        http://localhost:8123/geoserver/rest/styles/deltaportaal.sld
+
+        """
+        request_url = url(self.base_url, ['/geoserver/rest/styles',
+                                          '%s.sld' % style_name])
+        response = self._request('GET', request_url)
+        if response.ok:
+            return response.content
+        if response.status_code != 404:
+            logger.error("unexpected status code: %s (%s)" % (
+                response.status_code, response.text))
+        return None
+
+    def update_style(self, style_name, style_filename=None, style_data=None):
+        """
+        Replace the SLD of an existing style.
+
+        cURL example:
+        curl -u admin:geoserver -XPUT -H 'Content-type: application/vnd.ogc.sld+xml' -d @xml/deltaportaal.sld http://localhost:${GEOSERVER_PORT}/geoserver/rest/styles/deltaportaal
+
+        """
+        request_url = url(self.base_url, ['/geoserver/rest/styles',
+                                          style_name])
+        if style_data:
+            xml = style_data
+        else:
+            xml = open(style_filename, 'r').read()
+        headers = {'content-type': 'application/vnd.ogc.sld+xml'}
+        response = self._request('PUT', request_url, data=xml,
+                                 headers=headers)
+        success_msg = "style '%s' updated successfully" % style_name
+        process_response(response, success_msg)
+        return response
+
     def delete_style(self, style_name):
         """
         cURL example:
@@ -357,9 +1271,11 @@ curl -v -u admin:geoserver -XPUT -H "Content-type: text/plain" -d "file:///var/l
         """
         request_url = url(self.base_url, ['/geoserver/rest/styles',
                                           style_name])
-        response = requests.delete(request_url, auth=self.auth)
+        response = self._request('DELETE', request_url)
         success_msg = "deleted style '%s'" % style_name
         process_response(response, success_msg)
+        if response.ok:
+            self._remember(('styles', style_name), False)
         return response
 
     def set_default_style(self, workspace, datastore, view, style_name):
@@ -379,8 +1295,8 @@ curl -v -u admin:geoserver -XPUT -H "Content-type: text/plain" -d "file:///var/l
                 }
             }
         }
-        response = requests.put(request_url, data=json.dumps(payload),
-                                headers=headers, auth=self.auth)
+        response = self._request('PUT', request_url,
+                                 data=json.dumps(payload), headers=headers)
         success_msg = "made '%s' the default style" % style_name
         process_response(response, success_msg)
         return response
@@ -395,5 +1311,43 @@ curl -v -u admin:geoserver -XPUT -H "Content-type: text/plain" -d "file:///var/l
         segments = ['/geoserver/rest/workspaces/%s/datastores/%s/featuretypes'
                     % (workspace, datastore), '%s.%s' % (view, output)]
         request_url = url(self.base_url, segments)
-        response = requests.get(request_url, auth=self.auth)
+        response = self._request('GET', request_url)
         print response.text
+
+    def reload(self):
+        """
+        Reload the catalog and configuration from disk, e.g. after another
+        node of a cluster changed the shared data directory.
+
+        cURL example:
+        curl -u admin:geoserver -XPOST http://localhost:${GEOSERVER_PORT}/geoserver/rest/reload
+
+        """
+        request_url = url(self.base_url, ['/geoserver/rest/reload'])
+        response = self._request('POST', request_url)
+        process_response(response, "catalog and configuration reloaded")
+        self._forget_catalog()
+        return response
+
+    def reset(self):
+        """
+        Reset all store, raster and schema caches of the GeoServer.
+
+        cURL example:
+        curl -u admin:geoserver -XPOST http://localhost:${GEOSERVER_PORT}/geoserver/rest/reset
+
+        """
+        request_url = url(self.base_url, ['/geoserver/rest/reset'])
+        response = self._request('POST', request_url)
+        process_response(response, "resource caches reset")
+        self._forget_catalog()
+        return response
+
+    def _forget_catalog(self):
+        """Drop everything cached about the catalog of this GeoServer."""
+        if self.catalog_cache is not None:
+            self.catalog_cache.clear()
+        if self.response_cache is not None:
+            self.response_cache.clear()
+        if self.catalog_index is not None:
+            self.catalog_index.clear()
@@ -0,0 +1,310 @@
+"""
+Client for a cluster of GeoServer nodes that are provisioned separately.
+
+ClusterClient offers the methods of GeoserverClient. Writes are applied to
+all nodes concurrently and return a ClusterResult; reads go to one healthy
+node, in turn::
+
+    cluster = ClusterClient([GeoserverClient(host, 8080, user, password)
+                             for host in ('gs1', 'gs2', 'gs3')])
+    result = cluster.create_workspace('ws')
+    if result.diverged:
+        print result.failed
+    cluster.reload()
+    cluster.divergence()
+
+"""
+import logging
+import threading
+import time
+
+import requests
+
+from concurrent.futures import ThreadPoolExecutor
+
+from geoserverlib.client import GeoserverClient
+from geoserverlib.client import GeoserverClientException
+from geoserverlib.metrics import EndpointStats
+from geoserverlib.provision import _succeeded
+
+
+logger = logging.getLogger('geoserverlib.cluster')
+
+# GeoserverClient methods that only read, and go to a single node.
+READ_PREFIXES = ('get_', 'list_', 'show_')
+READ_SUFFIXES = ('_exists',)
+
+# Exceptions after which a node is considered down.
+CONNECTION_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+
+class Node(object):
+    """A GeoserverClient with its health and request statistics."""
+    def __init__(self, client, max_samples=1000):
+        self.client = client
+        self.name = client.base_url
+        self.healthy = True
+        self.down_since = None
+        self.stats = EndpointStats(max_samples)
+        self._lock = threading.Lock()
+        client.add_hook(self.record)
+
+    def record(self, event):
+        with self._lock:
+            self.stats.add(event)
+
+    def mark_down(self, error):
+        if self.healthy:
+            logger.warning("node %s is down: %s" % (self.name, error))
+        self.healthy = False
+        self.down_since = time.time()
+
+    def mark_up(self):
+        if not self.healthy:
+            logger.info("node %s is up again" % self.name)
+        self.healthy = True
+        self.down_since = None
+
+    def summary(self):
+        with self._lock:
+            percentiles = self.stats.percentiles()
+            count = self.stats.count
+            return {
+                'node': self.name,
+                'healthy': self.healthy,
+                'count': count,
+                'errors': self.stats.errors,
+                'mean': self.stats.total_latency / count if count else None,
+                'p50': percentiles[0.5],
+                'p90': percentiles[0.9],
+                'p99': percentiles[0.99],
+            }
+
+    def __repr__(self):
+        return '<Node %s %s>' % (self.name,
+                                 'healthy' if self.healthy else 'down')
+
+
+class ClusterResult(object):
+    """
+    Outcome of a write on all nodes: results maps node names to the return
+    value of the method, or to the exception it raised.
+
+    """
+    def __init__(self, method, results):
+        self.method = method
+        self.results = results
+
+    @property
+    def failed(self):
+        """Names of the nodes on which the write failed."""
+        return sorted(name for name, result in self.results.items()
+                      if isinstance(result, Exception) or
+                      not _succeeded(result))
+
+    @property
+    def ok(self):
+        return not self.failed
+
+    @property
+    def diverged(self):
+        """Whether the write succeeded on some nodes and failed on others."""
+        return 0 < len(self.failed) < len(self.results)
+
+    def __repr__(self):
+        return '<ClusterResult %s %d/%d ok>' % (
+            self.method, len(self.results) - len(self.failed),
+            len(self.results))
+
+
+def _write_method(name):
+    def method(self, *args, **kwargs):
+        return self.write(name, *args, **kwargs)
+    method.__name__ = name
+    method.__doc__ = ("GeoserverClient.%s on all nodes concurrently, returns "
+                      "a ClusterResult." % name)
+    return method
+
+
+def _read_method(name):
+    def method(self, *args, **kwargs):
+        return self.read(name, *args, **kwargs)
+    method.__name__ = name
+    method.__doc__ = "GeoserverClient.%s on one healthy node." % name
+    return method
+
+
+class ClusterClient(object):
+    """
+    Geoserver client for several nodes.
+
+    Params:
+    - clients, a GeoserverClient per node
+    - max_workers, number of concurrent requests (default one per node)
+    - retry_after, seconds after which a node that was down gets read
+      requests again
+
+    """
+    def __init__(self, clients, max_workers=None, retry_after=30):
+        if not clients:
+            raise ValueError("a cluster needs at least one node")
+        self.nodes = [Node(client) for client in clients]
+        self.retry_after = retry_after
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or len(self.nodes))
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        for node in self.nodes:
+            node.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _map(self, function):
+        """Run function(node) for all nodes, return {name: result}."""
+        def call(node):
+            try:
+                return function(node)
+            except Exception as e:
+                if isinstance(e, CONNECTION_ERRORS):
+                    node.mark_down(e)
+                return e
+
+        futures = [(node.name, self.executor.submit(call, node))
+                   for node in self.nodes]
+        return dict((name, future.result()) for name, future in futures)
+
+    def write(self, name, *args, **kwargs):
+        """Call a GeoserverClient method on all nodes concurrently."""
+        results = self._map(
+            lambda node: getattr(node.client, name)(*args, **kwargs))
+        result = ClusterResult(name, results)
+        if result.diverged:
+            logger.error("%s diverged, failed on %s" % (
+                name, ', '.join(result.failed)))
+        return result
+
+    def _read_order(self):
+        """Nodes to try for a read: healthy ones first, in turn."""
+        now = time.time()
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % len(self.nodes)
+        nodes = self.nodes[start:] + self.nodes[:start]
+        available = [node for node in nodes if node.healthy or
+                     now - node.down_since > self.retry_after]
+        return available + [node for node in nodes if node not in available]
+
+    def read(self, name, *args, **kwargs):
+        """
+        Call a GeoserverClient method on one node, failing over to the next
+        when the node can not be reached.
+
+        """
+        error = None
+        for node in self._read_order():
+            try:
+                result = getattr(node.client, name)(*args, **kwargs)
+            except CONNECTION_ERRORS as e:
+                node.mark_down(e)
+                error = e
+                continue
+            node.mark_up()
+            return result
+        raise error
+
+    def check_health(self):
+        """
+        Request the version of every node; returns {name: latency in
+        seconds}, or an exception for nodes that are down.
+
+        """
+        def check(node):
+            start = time.time()
+            response = node.client.request(
+                'GET', ['/geoserver/rest/about', 'version.json'])
+            if not response.ok:
+                raise GeoserverClientException("status %s" %
+                                               response.status_code)
+            node.mark_up()
+            return time.time() - start
+
+        results = self._map(check)
+        for node in self.nodes:
+            if isinstance(results[node.name], Exception):
+                node.mark_down(results[node.name])
+        return results
+
+    def stats(self):
+        """Health, request counts and latencies per node."""
+        return [node.summary() for node in self.nodes]
+
+    def inventory(self, client):
+        """
+        The set of catalog keys of one node. Raises GeoserverClientException
+        when a listing fails, rather than reporting a partial catalog.
+
+        """
+        def listing(method, *args):
+            names = getattr(client, method)(*args)
+            if names is None:
+                raise GeoserverClientException("%s%r failed on %s" % (
+                    method, args, client.base_url))
+            return names
+
+        keys = set()
+        for style in listing('list_styles'):
+            keys.add(('styles', style))
+        for layer in listing('list_layers'):
+            keys.add(('layers', layer))
+        for workspace in listing('list_workspaces'):
+            keys.add(('workspaces', workspace))
+            for datastore in listing('list_datastores', workspace):
+                key = ('workspaces', workspace, 'datastores', datastore)
+                keys.add(key)
+                for view in listing('list_feature_types', workspace,
+                                    datastore):
+                    keys.add(key + ('featuretypes', view))
+        return keys
+
+    def divergence(self):
+        """
+        Compare the catalogs of the nodes. Returns {key: [names of nodes
+        lacking it]} for every catalog key that not all nodes have; empty
+        when the nodes are in sync. Nodes that could not be read are left
+        out.
+
+        """
+        inventories = self._map(lambda node: self.inventory(node.client))
+        inventories = dict((name, keys) for name, keys in inventories.items()
+                           if not isinstance(keys, Exception))
+        all_keys = set()
+        for keys in inventories.values():
+            all_keys |= keys
+        differences = {}
+        for key in sorted(all_keys):
+            missing = sorted(name for name, keys in inventories.items()
+                             if key not in keys)
+            if missing:
+                differences[key] = missing
+        return differences
+
+
+# Mirror the public GeoserverClient methods: reads go to one node, writes
+# to all of them.
+_NOT_MIRRORED = ('prefetched', 'add_hook')
+for _name, _value in sorted(vars(GeoserverClient).items()):
+    if (_name.startswith('_') or not callable(_value) or
+            _name in _NOT_MIRRORED or hasattr(ClusterClient, _name)):
+        continue
+    if _name.startswith(READ_PREFIXES) or _name.endswith(READ_SUFFIXES):
+        setattr(ClusterClient, _name, _read_method(_name))
+    else:
+        setattr(ClusterClient, _name, _write_method(_name))
+del _name, _value
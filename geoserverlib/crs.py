@@ -0,0 +1,156 @@
+"""
+Native CRS definitions (WKT) for feature type payloads.
+
+Definitions are looked up in a bundled table of commonly used EPSG codes,
+then (if installed) computed with pyproj, and cached in memory per code, so
+building payloads for thousands of feature types formats every CRS only
+once::
+
+    native_crs_xml(28992)  # '<nativeCRS class="projected">PROJCS[...'
+
+Codes that can not be resolved give no nativeCRS element; GeoServer then
+derives the native CRS from the srs of the feature type.
+
+"""
+import threading
+
+from xml.sax.saxutils import escape
+
+
+_PRIMEM = 'PRIMEM["Greenwich", 0.0, AUTHORITY["EPSG","8901"]]'
+_DEGREE = 'UNIT["degree", 0.017453292519943295]'
+_LONLAT_AXES = ('AXIS["Geodetic longitude", EAST], '
+                'AXIS["Geodetic latitude", NORTH]')
+_METRE_AXES = 'UNIT["m", 1.0], AXIS["Easting", EAST], AXIS["Northing", NORTH]'
+
+WGS84 = (
+    'GEOGCS["WGS 84", DATUM["World Geodetic System 1984", '
+    'SPHEROID["WGS 84", 6378137.0, 298.257223563, '
+    'AUTHORITY["EPSG","7030"]], '
+    'AUTHORITY["EPSG","6326"]], %s, %s, %s, AUTHORITY["EPSG","4326"]]' % (
+        _PRIMEM, _DEGREE, _LONLAT_AXES))
+
+ETRS89 = (
+    'GEOGCS["ETRS89", DATUM["European Terrestrial Reference System 1989", '
+    'SPHEROID["GRS 1980", 6378137.0, 298.257222101, '
+    'AUTHORITY["EPSG","7019"]], '
+    'TOWGS84[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0], AUTHORITY["EPSG","6258"]], '
+    '%s, %s, %s, AUTHORITY["EPSG","4258"]]' % (
+        _PRIMEM, _DEGREE, _LONLAT_AXES))
+
+AMERSFOORT_RD_NEW = (
+    'PROJCS["Amersfoort / RD New", GEOGCS["Amersfoort", DATUM["Amersfoort", '
+    'SPHEROID["Bessel 1841", 6377397.155, 299.1528128, '
+    'AUTHORITY["EPSG","7004"]], TOWGS84[565.2369, 50.0087, 465.658, '
+    '-0.40685733032239757, -0.3507326765425626, 1.8703473836067959, '
+    '4.0812], AUTHORITY["EPSG","6289"]], %s, %s, %s, '
+    'AUTHORITY["EPSG","4289"]], PROJECTION["Oblique_Stereographic", '
+    'AUTHORITY["EPSG","9809"]], PARAMETER["central_meridian", '
+    '5.387638888888891], PARAMETER["latitude_of_origin", 52.15616055555556], '
+    'PARAMETER["scale_factor", 0.9999079], PARAMETER["false_easting", '
+    '155000.0], PARAMETER["false_northing", 463000.0], %s, '
+    'AUTHORITY["EPSG","28992"]]' % (
+        _PRIMEM, _DEGREE, _LONLAT_AXES, _METRE_AXES))
+
+PSEUDO_MERCATOR = (
+    'PROJCS["WGS 84 / Pseudo-Mercator", %s, PROJECTION["Popular '
+    'Visualisation Pseudo Mercator", AUTHORITY["EPSG","1024"]], '
+    'PARAMETER["semi_minor", 6378137.0], PARAMETER["latitude_of_origin", '
+    '0.0], PARAMETER["central_meridian", 0.0], PARAMETER["scale_factor", '
+    '1.0], PARAMETER["false_easting", 0.0], PARAMETER["false_northing", '
+    '0.0], %s, AUTHORITY["EPSG","3857"]]' % (WGS84, _METRE_AXES))
+
+# The unofficial code that GeoServer and GeoWebCache still use for web
+# mercator; it declares its own authority, so a feature type with srid
+# 900913 does not claim to be EPSG:3857.
+GOOGLE_MERCATOR = (
+    'PROJCS["WGS84 / Google Mercator", %s, PROJECTION["Mercator_1SP"], '
+    'PARAMETER["semi_minor", 6378137.0], PARAMETER["latitude_of_origin", '
+    '0.0], PARAMETER["central_meridian", 0.0], PARAMETER["scale_factor", '
+    '1.0], PARAMETER["false_easting", 0.0], PARAMETER["false_northing", '
+    '0.0], %s, AUTHORITY["EPSG","900913"]]' % (WGS84, _METRE_AXES))
+
+
+def utm_wkt(name, geogcs, zone, srid):
+    """WKT of a northern UTM zone on the given geographic CRS."""
+    return (
+        'PROJCS["%s / UTM zone %dN", %s, PROJECTION["Transverse_Mercator", '
+        'AUTHORITY["EPSG","9807"]], PARAMETER["central_meridian", %r], '
+        'PARAMETER["latitude_of_origin", 0.0], PARAMETER["scale_factor", '
+        '0.9996], PARAMETER["false_easting", 500000.0], '
+        'PARAMETER["false_northing", 0.0], %s, AUTHORITY["EPSG","%d"]]' % (
+            name, zone, geogcs, float(zone * 6 - 183), _METRE_AXES, srid))
+
+
+# Bundled definitions, in the WKT flavour GeoServer itself produces.
+EPSG_WKT = {
+    4326: WGS84,
+    4258: ETRS89,
+    3857: PSEUDO_MERCATOR,
+    900913: GOOGLE_MERCATOR,
+    28992: AMERSFOORT_RD_NEW,
+}
+for _zone in range(28, 39):
+    EPSG_WKT[25800 + _zone] = utm_wkt('ETRS89', ETRS89, _zone, 25800 + _zone)
+for _zone in range(1, 61):
+    EPSG_WKT[32600 + _zone] = utm_wkt('WGS 84', WGS84, _zone, 32600 + _zone)
+del _zone
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def _pyproj_wkt(srid):
+    try:
+        import pyproj
+    except ImportError:
+        return None
+    if not hasattr(pyproj, 'CRS'):
+        return None
+    try:
+        return pyproj.CRS.from_epsg(srid).to_wkt('WKT1_GDAL')
+    except Exception:
+        return None
+
+
+def register_crs(srid, wkt):
+    """Add or replace the definition of an EPSG code."""
+    srid = int(srid)
+    with _lock:
+        EPSG_WKT[srid] = wkt
+        _cache.pop(srid, None)
+
+
+def native_crs(srid):
+    """Return the WKT of an EPSG code, or None when it is unknown."""
+    return _lookup(srid)[0]
+
+
+def native_crs_xml(srid):
+    """
+    Return the nativeCRS element for an EPSG code, or '' when the code is
+    unknown.
+
+    """
+    return _lookup(srid)[1]
+
+
+def _lookup(srid):
+    srid = int(srid)
+    cached = _cache.get(srid)
+    if cached is not None:
+        return cached
+    wkt = EPSG_WKT.get(srid) or _pyproj_wkt(srid)
+    if wkt is None:
+        element = ''
+    else:
+        kind = 'projected' if wkt.startswith('PROJCS') else 'geographic'
+        element = '<nativeCRS class="%s">%s</nativeCRS>' % (kind, escape(wkt))
+    with _lock:
+        _cache[srid] = (wkt, element)
+    return wkt, element
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
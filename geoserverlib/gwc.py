@@ -0,0 +1,319 @@
+"""
+Client for the GeoWebCache REST API embedded in GeoServer.
+
+Enable tile caching for layers, then warm their caches right after
+publishing, for example::
+
+    tile_cache = TileCache(client)
+    tile_cache.enable_caching('ws:layer', gridsets=['EPSG:28992'])
+    tile_cache.seed_many([
+        {'layer': 'ws:layer', 'gridset': 'EPSG:28992', 'zoom_stop': 12},
+        {'layer': 'ws:other', 'gridset': 'EPSG:28992', 'zoom_stop': 12}])
+    tile_cache.wait(['ws:layer', 'ws:other'])
+
+"""
+import json
+import logging
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import escape
+import xml.etree.ElementTree as ElementTree
+
+from geoserverlib.client import GeoserverClientException
+
+
+logger = logging.getLogger('geoserverlib.gwc')
+
+SEED_TYPES = ('seed', 'reseed', 'truncate')
+
+# Task status codes in the seed status arrays.
+TASK_STATES = {-1: 'ABORTED', 0: 'PENDING', 1: 'RUNNING', 2: 'DONE'}
+
+TILE_LAYER_TEMPLATE = """<GeoServerLayer>
+    <enabled>%(enabled)s</enabled>
+    <name>%(name)s</name>
+    <mimeFormats>%(formats)s</mimeFormats>
+    <gridSubsets>%(gridsets)s</gridSubsets>
+    <metaWidthHeight>
+        <int>%(meta_width)d</int><int>%(meta_height)d</int>
+    </metaWidthHeight>
+    <expireCache>%(expire_cache)d</expireCache>
+    <expireClients>%(expire_clients)d</expireClients>
+    <gutter>%(gutter)d</gutter>
+</GeoServerLayer>"""
+
+
+class SeedTask(object):
+    """A running or pending seed, reseed or truncate task of a layer."""
+    def __init__(self, layer, tiles_done, tiles_total, time_remaining,
+                 task_id, status):
+        self.layer = layer
+        self.tiles_done = tiles_done
+        self.tiles_total = tiles_total
+        self.time_remaining = time_remaining
+        self.task_id = task_id
+        self.status = TASK_STATES.get(status, status)
+
+    @property
+    def progress(self):
+        """Fraction of the tiles done, or None when unknown."""
+        if self.tiles_total <= 0:
+            return None
+        return float(self.tiles_done) / self.tiles_total
+
+    def __repr__(self):
+        return '<SeedTask %s %s %s %d/%d>' % (
+            self.task_id, self.layer, self.status, self.tiles_done,
+            self.tiles_total)
+
+
+class SeedResult(object):
+    """Outcome of submitting one seed request with seed_many."""
+    def __init__(self, request, ok, response=None, error=None):
+        self.request = request
+        self.ok = ok
+        self.response = response
+        self.error = error
+
+    def __repr__(self):
+        return '<SeedResult %s %s>' % (self.request.get('layer'),
+                                       'ok' if self.ok else 'failed')
+
+
+class TileCache(object):
+    """Drives the GeoWebCache REST API through a GeoserverClient."""
+    def __init__(self, client):
+        self.client = client
+
+    def _path(self, *segments):
+        return ['/geoserver/gwc/rest'] + list(segments)
+
+    def _check(self, response, what):
+        if not response.ok:
+            raise GeoserverClientException("%s failed: %s (%s)" % (
+                what, response.status_code, response.text))
+        return response
+
+    # Tile layers.
+
+    def enable_caching(self, layer, formats=('image/png',),
+                       gridsets=('EPSG:4326', 'EPSG:900913'),
+                       meta_tiling=(4, 4), expire_cache=0, expire_clients=0,
+                       gutter=0, enabled=True):
+        """
+        Create or replace the tile layer configuration of a layer
+        ('ws:name').
+
+        Params:
+        - formats, image formats to cache
+        - gridsets, names of the gridsets to cache tiles for
+        - meta_tiling, (width, height) of the metatiles rendered at once
+        - expire_cache, expire_clients, seconds; 0 means never
+        - enabled, False keeps the configuration but stops caching
+
+        """
+        xml = TILE_LAYER_TEMPLATE % {
+            'enabled': str(bool(enabled)).lower(),
+            'name': escape(layer),
+            'formats': ''.join('<string>%s</string>' % escape(mime_type)
+                               for mime_type in formats),
+            'gridsets': ''.join(
+                '<gridSubset><gridSetName>%s</gridSetName></gridSubset>' %
+                escape(gridset) for gridset in gridsets),
+            'meta_width': meta_tiling[0],
+            'meta_height': meta_tiling[1],
+            'expire_cache': expire_cache,
+            'expire_clients': expire_clients,
+            'gutter': gutter,
+        }
+        headers = {'content-type': 'text/xml'}
+        response = self.client.request(
+            'PUT', self._path('layers', '%s.xml' % layer), data=xml,
+            headers=headers)
+        self._check(response, "configuring tile layer %s" % layer)
+        logger.info("tile caching %s for %s" % (
+            'enabled' if enabled else 'disabled', layer))
+        return response
+
+    def disable_caching(self, layer):
+        """Remove the tile layer of a layer, including its cached tiles."""
+        response = self.client.request(
+            'DELETE', self._path('layers', '%s.xml' % layer))
+        if response.status_code == 404:
+            return response
+        return self._check(response, "removing tile layer %s" % layer)
+
+    def caching_enabled(self, layer):
+        """Whether the layer has an enabled tile layer."""
+        response = self.client.request(
+            'GET', self._path('layers', '%s.xml' % layer))
+        if response.status_code == 404:
+            return False
+        self._check(response, "getting tile layer %s" % layer)
+        root = ElementTree.fromstring(response.content)
+        return root.findtext('enabled', 'true').strip() == 'true'
+
+    def enable_caching_many(self, layers, max_workers=8, **kwargs):
+        """
+        Enable caching for many layers in parallel with the same options;
+        returns {layer: error} for the layers that failed.
+
+        """
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = dict((layer, executor.submit(
+                self.enable_caching, layer, **kwargs)) for layer in layers)
+        finally:
+            executor.shutdown(wait=True)
+        return dict((layer, future.exception())
+                    for layer, future in futures.items()
+                    if future.exception() is not None)
+
+    # Seeding.
+
+    def seed(self, layer, type='seed', gridset='EPSG:900913', zoom_start=0,
+             zoom_stop=10, format='image/png', bbox=None, srid=None,
+             threads=1, parameters=None):
+        """
+        Submit a seed, reseed or truncate task for a layer.
+
+        Params:
+        - type, one of 'seed', 'reseed' and 'truncate'
+        - gridset, zoom_start, zoom_stop, format, what to (re)generate
+        - bbox, optional (minx, miny, maxx, maxy) to limit the task to, in
+          the CRS of srid
+        - threads, number of GeoWebCache threads for this task
+        - parameters, optional dict of parameter filter values
+
+        """
+        if type not in SEED_TYPES:
+            raise ValueError("type must be one of %s" % ', '.join(SEED_TYPES))
+        seed_request = {
+            'name': layer,
+            'type': type,
+            'gridSetId': gridset,
+            'zoomStart': zoom_start,
+            'zoomStop': zoom_stop,
+            'format': format,
+            'threadCount': threads,
+        }
+        if bbox is not None:
+            seed_request['bounds'] = {'coords': {
+                'double': [float(value) for value in bbox]}}
+            if srid is not None:
+                seed_request['srs'] = {'number': int(srid)}
+        if parameters:
+            seed_request['parameters'] = {'entry': [
+                {'string': [key, value]}
+                for key, value in sorted(parameters.items())]}
+        headers = {'content-type': 'application/json'}
+        response = self.client.request(
+            'POST', self._path('seed', '%s.json' % layer),
+            data=json.dumps({'seedRequest': seed_request}), headers=headers)
+        self._check(response, "%s of %s" % (type, layer))
+        logger.info("%s of %s submitted (zoom %d-%d, %s)" % (
+            type, layer, zoom_start, zoom_stop, gridset))
+        return response
+
+    def reseed(self, layer, **kwargs):
+        return self.seed(layer, type='reseed', **kwargs)
+
+    def truncate(self, layer, **kwargs):
+        return self.seed(layer, type='truncate', **kwargs)
+
+    def truncate_layer(self, layer):
+        """Remove all cached tiles of a layer, in every gridset and format."""
+        xml = '<truncateLayer><layerName>%s</layerName></truncateLayer>' % (
+            escape(layer))
+        headers = {'content-type': 'text/xml'}
+        response = self.client.request(
+            'POST', self._path('masstruncate'), data=xml, headers=headers)
+        return self._check(response, "truncating %s" % layer)
+
+    def seed_many(self, requests, max_workers=8):
+        """
+        Submit many tasks in parallel. Every request is a dict with a
+        'layer' key and optionally the other arguments of seed. Returns a
+        SeedResult per request, in the same order.
+
+        """
+        def submit(request):
+            options = dict(request)
+            layer = options.pop('layer')
+            try:
+                return SeedResult(request, True,
+                                  response=self.seed(layer, **options))
+            except Exception as e:
+                logger.error("seeding %s failed: %s" % (layer, e))
+                return SeedResult(request, False, error=e)
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            return list(executor.map(submit, requests))
+        finally:
+            executor.shutdown(wait=True)
+
+    def tasks(self, layer=None):
+        """
+        Return the running and pending tasks of a layer, or of all layers,
+        as SeedTask objects.
+
+        """
+        if layer is None:
+            path = self._path('seed.json')
+        else:
+            path = self._path('seed', '%s.json' % layer)
+        response = self.client.request('GET', path)
+        self._check(response, "getting seed status")
+        arrays = response.json().get('long-array-array') or []
+        return [SeedTask(layer, *array[:5]) for array in arrays]
+
+    def kill(self, layer=None, which='all'):
+        """Stop the 'all', 'running' or 'pending' tasks of one or all layers."""
+        segments = ['seed'] if layer is None else ['seed', layer]
+        headers = {'content-type': 'application/x-www-form-urlencoded'}
+        response = self.client.request(
+            'POST', self._path(*segments), data={'kill_all': which},
+            headers=headers)
+        return self._check(response, "killing tasks")
+
+    def iter_progress(self, layers, interval=5.0, timeout=None,
+                      max_workers=8):
+        """
+        Poll the tasks of the layers in parallel every interval seconds and
+        yield {layer: [SeedTask, ...]} for the layers that still have
+        tasks, until no tasks are left.
+
+        """
+        layers = list(layers)
+        start = time.time()
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            while layers:
+                status = dict(zip(layers, executor.map(self.tasks, layers)))
+                status = dict((layer, tasks)
+                              for layer, tasks in status.items()
+                              if any(task.status in ('PENDING', 'RUNNING')
+                                     for task in tasks))
+                if not status:
+                    return
+                yield status
+                layers = [layer for layer in layers if layer in status]
+                if timeout is not None and time.time() - start > timeout:
+                    raise GeoserverClientException(
+                        "seeding not done after %s seconds" % timeout)
+                time.sleep(interval)
+        finally:
+            executor.shutdown(wait=True)
+
+    def wait(self, layers, interval=5.0, timeout=None, callback=None):
+        """
+        Wait until the layers have no running or pending tasks. Callback, if
+        given, is called with every status dict of iter_progress.
+
+        """
+        for status in self.iter_progress(layers, interval=interval,
+                                         timeout=timeout):
+            if callback is not None:
+                callback(status)
@@ -0,0 +1,220 @@
+"""
+Cache for catalog GET responses, revalidated with conditional requests.
+
+Responses carrying an ETag or Last-Modified header are stored. Later GETs
+of the same url send If-None-Match / If-Modified-Since, and a 304 answer is
+turned back into the full stored response, so unchanged resources are not
+downloaded again::
+
+    client = GeoserverClient(host, port, username, password,
+                             response_cache=ResponseCache(directory='cache'))
+
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from collections import OrderedDict
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+class ResponseCache(object):
+    """
+    LRU cache of GET responses with an optional on-disk backing store.
+
+    Params:
+    - max_entries, number of responses kept in memory
+    - directory, optional directory where responses are also stored, so
+      they survive restarts; looked up when not in memory
+    - max_disk_entries, number of responses kept in the directory; the
+      least recently used ones are removed
+    - max_age, seconds during which a stored response is used without
+      revalidating it. With the default of 0 every use is revalidated;
+      with a positive max_age, writes through the client invalidate the
+      affected urls.
+
+    Counters: hits (served from cache, with or without revalidation),
+    misses and revalidations (conditional requests sent).
+
+    """
+    def __init__(self, max_entries=1000, directory=None, max_age=0,
+                 max_disk_entries=10000):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.directory = directory
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._entries = OrderedDict()
+        # Key -> file path (without extension) of the entries on disk, in
+        # least recently used order, so lookups and invalidation don't
+        # need to list and read the directory.
+        self._files = OrderedDict()
+        self._lock = threading.Lock()
+        if directory is not None:
+            if os.path.isdir(directory):
+                self._load_files()
+            else:
+                os.makedirs(directory)
+
+    def _path(self, key):
+        return os.path.join(self.directory,
+                            hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def _load_files(self):
+        """Index the entries stored by earlier runs, oldest first."""
+        found = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                with open(path, 'r') as meta_file:
+                    key = json.load(meta_file)['key']
+                found.append((os.path.getmtime(path), key,
+                              path[:-len('.json')]))
+            except (IOError, OSError, ValueError, KeyError):
+                continue
+        for _, key, path in sorted(found):
+            self._files[key] = path
+        self._evict_files()
+
+    def _evict_files(self):
+        with self._lock:
+            evicted = []
+            while len(self._files) > self.max_disk_entries:
+                evicted.append(self._files.popitem(last=False)[1])
+        for path in evicted:
+            self._remove_file(path)
+
+    def _remove_file(self, path):
+        for extension in ('.json', '.body'):
+            try:
+                os.remove(path + extension)
+            except OSError:
+                pass
+
+    def get(self, key):
+        """Return the stored entry (a dict) for the key, or None."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._entries[key] = entry
+                return entry
+        if self.directory is None:
+            return None
+        with self._lock:
+            path = self._files.pop(key, None)
+            if path is None:
+                return None
+            self._files[key] = path
+        try:
+            with open(path + '.json', 'r') as meta_file:
+                entry = json.load(meta_file)
+            with open(path + '.body', 'rb') as body_file:
+                entry['content'] = body_file.read()
+        except (IOError, ValueError):
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def store(self, key, response):
+        """Store a response if it has an ETag or Last-Modified header."""
+        headers = response.headers
+        if not (headers.get('ETag') or headers.get('Last-Modified')):
+            return
+        entry = {
+            'url': response.url,
+            'status': response.status_code,
+            'headers': dict(headers),
+            'encoding': response.encoding,
+            'stored': time.time(),
+            'content': response.content,
+        }
+        self._remember(key, entry)
+        if self.directory is not None:
+            path = self._path(key)
+            meta = dict(entry)
+            del meta['content']
+            meta['key'] = key
+            with open(path + '.body', 'wb') as body_file:
+                body_file.write(entry['content'])
+            with open(path + '.json', 'w') as meta_file:
+                json.dump(meta, meta_file)
+            with self._lock:
+                self._files.pop(key, None)
+                self._files[key] = path
+            self._evict_files()
+
+    def touch(self, key):
+        """Mark a revalidated entry as fresh again."""
+        entry = self.get(key)
+        if entry is not None:
+            entry['stored'] = time.time()
+
+    def fresh(self, entry):
+        return bool(self.max_age) and \
+            time.time() - entry['stored'] < self.max_age
+
+    def invalidate_prefix(self, prefix):
+        """Forget all entries whose key starts with prefix."""
+        with self._lock:
+            for key in list(self._entries):
+                if key.startswith(prefix):
+                    del self._entries[key]
+            removed = [self._files.pop(key) for key in list(self._files)
+                       if key.startswith(prefix)]
+        for path in removed:
+            self._remove_file(path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._files.clear()
+        if self.directory is not None:
+            for filename in os.listdir(self.directory):
+                if filename.endswith(('.json', '.body')):
+                    os.remove(os.path.join(self.directory, filename))
+
+    def count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self):
+        return {'size': len(self._entries), 'disk_size': len(self._files),
+                'hits': self.hits, 'misses': self.misses,
+                'revalidations': self.revalidations}
+
+    def conditional_headers(self, entry):
+        """Headers for revalidating a stored entry."""
+        headers = {}
+        stored = CaseInsensitiveDict(entry['headers'])
+        if stored.get('ETag'):
+            headers['If-None-Match'] = stored['ETag']
+        if stored.get('Last-Modified'):
+            headers['If-Modified-Since'] = stored['Last-Modified']
+        return headers
+
+    def build_response(self, entry, request=None):
+        """Recreate a requests.Response from a stored entry."""
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = entry['content']
+        response.encoding = entry['encoding']
+        response.url = entry['url']
+        response.reason = 'OK'
+        response.request = request
+        return response
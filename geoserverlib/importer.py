@@ -0,0 +1,178 @@
+"""
+Client for the GeoServer Importer extension REST API.
+
+An import bundles any number of tasks (one per file or table) into one
+job that GeoServer configures and runs server-side, for example::
+
+    importer = Importer(client)
+    import_id = importer.create_import(
+        workspace, data={'type': 'directory', 'location': '/data/shapes'})
+    importer.run(import_id)
+    state = importer.wait(import_id)
+
+"""
+import json
+import logging
+import time
+
+from geoserverlib.client import GeoserverClientException
+from geoserverlib.upload import open_upload
+
+
+logger = logging.getLogger('geoserverlib.importer')
+
+# Import states after which nothing will happen without user action.
+FINAL_STATES = ('COMPLETE', 'COMPLETE_ERROR', 'INCOMPLETE')
+
+
+class Importer(object):
+    """Drives the Importer REST API through a GeoserverClient."""
+    def __init__(self, client):
+        self.client = client
+
+    def _path(self, *segments):
+        return ['/geoserver/rest/imports'] + [str(segment)
+                                              for segment in segments]
+
+    def _json(self, response, what):
+        if not response.ok:
+            raise GeoserverClientException("%s failed: %s (%s)" % (
+                what, response.status_code, response.text))
+        if not response.content:
+            return {}
+        return response.json()
+
+    def create_import(self, workspace, datastore=None, data=None):
+        """
+        Create an import targeting the workspace (and optionally an
+        existing datastore) and return its id.
+
+        Data optionally describes the source, e.g.
+        {'type': 'directory', 'location': '/path/on/geoserver'}; GeoServer
+        then creates a task for every file in one request. Without data,
+        add tasks with add_file_task or upload_task.
+
+        """
+        payload = {'targetWorkspace': {'workspace': {'name': workspace}}}
+        if datastore is not None:
+            payload['targetStore'] = {'dataStore': {'name': datastore}}
+        if data is not None:
+            payload['data'] = data
+        headers = {'content-type': 'application/json'}
+        response = self.client.request(
+            'POST', self._path(), data=json.dumps({'import': payload}),
+            headers=headers)
+        import_id = self._json(response, "creating import")['import']['id']
+        logger.info("import %s created" % import_id)
+        return import_id
+
+    def add_file_task(self, import_id, path):
+        """
+        Add a task for a file or directory that is already on the GeoServer
+        machine. Returns the created tasks.
+
+        """
+        headers = {'content-type': 'application/x-www-form-urlencoded'}
+        response = self.client.request(
+            'POST', self._path(import_id, 'tasks'), headers=headers,
+            data={'url': 'file://%s' % path})
+        return self._tasks(self._json(response, "adding task"))
+
+    def upload_task(self, import_id, path, filename=None, progress=None):
+        """
+        Stream a local file (e.g. a zipped shapefile) to the import as a new
+        task. Returns the created tasks.
+
+        """
+        if filename is None:
+            filename = path.replace('\\', '/').split('/')[-1]
+        headers = {'content-type': 'application/octet-stream'}
+        with open_upload(path, progress=progress) as body:
+            response = self.client.request(
+                'PUT', self._path(import_id, 'tasks', filename),
+                headers=headers, data=body)
+        return self._tasks(self._json(response, "uploading task"))
+
+    def _tasks(self, content):
+        if 'tasks' in content:
+            return content['tasks']
+        if 'task' in content:
+            return [content['task']]
+        return []
+
+    def run(self, import_id, asynchronous=True):
+        """
+        Start the import. With asynchronous (the default) GeoServer returns
+        immediately; use wait or iter_progress to follow the import.
+
+        """
+        params = {'async': 'true'} if asynchronous else {}
+        response = self.client.request('POST', self._path(import_id),
+                                       params=params)
+        self._json(response, "running import")
+        logger.info("import %s started" % import_id)
+        return response
+
+    def get_import(self, import_id):
+        response = self.client.request('GET', self._path(import_id))
+        return self._json(response, "getting import")['import']
+
+    def get_tasks(self, import_id):
+        response = self.client.request('GET', self._path(import_id, 'tasks'))
+        return self._tasks(self._json(response, "getting tasks"))
+
+    def task_progress(self, import_id, task_id):
+        """
+        Return the progress of a running task, a dict with (depending on the
+        state) 'progress', 'total' and 'state' keys.
+
+        """
+        response = self.client.request(
+            'GET', self._path(import_id, 'tasks', task_id, 'progress'))
+        return self._json(response, "getting task progress")
+
+    def delete_import(self, import_id):
+        response = self.client.request('DELETE', self._path(import_id))
+        self._json(response, "deleting import")
+        return response
+
+    def iter_progress(self, import_id, interval=2.0, timeout=None):
+        """
+        Poll the import every interval seconds until it reaches a final
+        state, yielding the import state and a dict of task id to task
+        progress after every poll.
+
+        """
+        start = time.time()
+        while True:
+            state = self.get_import(import_id)['state']
+            progress = {}
+            for task in self.get_tasks(import_id):
+                if task.get('state') == 'RUNNING':
+                    progress[task['id']] = self.task_progress(import_id,
+                                                              task['id'])
+                else:
+                    progress[task['id']] = {'state': task.get('state')}
+            yield state, progress
+            if state in FINAL_STATES:
+                return
+            if timeout is not None and time.time() - start > timeout:
+                raise GeoserverClientException(
+                    "import %s did not finish within %s seconds" % (
+                        import_id, timeout))
+            time.sleep(interval)
+
+    def wait(self, import_id, interval=2.0, timeout=None, callback=None):
+        """
+        Block until the import reaches a final state and return that state.
+        Callback, if given, is called as callback(state, progress) after
+        every poll.
+
+        """
+        state = None
+        for state, progress in self.iter_progress(import_id, interval,
+                                                  timeout):
+            if callback is not None:
+                callback(state, progress)
+        logger.info("import %s finished: %s" % (import_id, state))
+        return state
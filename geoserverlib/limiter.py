@@ -0,0 +1,197 @@
+"""
+Adaptive concurrency limiting and retries for requests to a GeoServer.
+
+GeoServer serializes catalog writes behind a lock, so firing many requests
+at once mostly makes them slower or makes them fail. An AdaptiveLimiter
+passed to GeoserverClient caps the number of requests in flight and adapts
+that cap to the server: it grows by one per round of fast, successful
+requests and is halved when requests fail or get slow (AIMD). A
+RetryPolicy retries transient failures with exponential backoff::
+
+    client = GeoserverClient(host, port, username, password,
+                             limiter=AdaptiveLimiter(target_latency=0.5),
+                             retry=RetryPolicy(retries=4))
+
+Every bulk operation running through the client (provisioning, uploads,
+style sync, migrations, seeding) then runs at the rate the server
+tolerates, regardless of the number of worker threads.
+
+"""
+import logging
+import random
+import threading
+import time
+
+from contextlib import contextmanager
+
+import requests
+
+try:
+    from requests.packages.urllib3.exceptions import NewConnectionError
+except ImportError:
+    # Older urllib3 versions don't tell refused connections apart.
+    NewConnectionError = ()
+
+
+logger = logging.getLogger('geoserverlib.limiter')
+
+# Status codes that are worth retrying.
+TRANSIENT_STATUSES = (500, 502, 503, 504)
+
+# Exceptions that are worth retrying.
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+# Methods that can be sent again when the server may have applied them.
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE')
+
+
+class AdaptiveLimiter(object):
+    """
+    Limit on the number of concurrent requests, adjusted AIMD style.
+
+    Params:
+    - initial, minimum, maximum, bounds of the concurrency limit
+    - target_latency, seconds; a successful request slower than this
+      counts as congestion. None only reacts to errors.
+    - decrease, factor applied to the limit on congestion
+
+    The limit is increased by one after a limit's worth of successful
+    requests, and decreased at most once per limit's worth of completed
+    requests, so one burst of failures halves it only once.
+
+    """
+    def __init__(self, initial=4, minimum=1, maximum=64,
+                 target_latency=None, decrease=0.5):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.target_latency = target_latency
+        self.decrease = decrease
+        self.in_flight = 0
+        self.successes = 0
+        self.congested = 0
+        self.waits = 0
+        self._since_decrease = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            if self.in_flight >= int(self.limit):
+                self.waits += 1
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency, ok):
+        """Give back a slot, with the outcome of the request that used it."""
+        with self._condition:
+            self.in_flight -= 1
+            self._since_decrease += 1
+            slow = (self.target_latency is not None and
+                    latency > self.target_latency)
+            if ok and not slow:
+                self.successes += 1
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            else:
+                self.congested += 1
+                if self._since_decrease >= self.limit:
+                    self.limit = max(self.minimum,
+                                     self.limit * self.decrease)
+                    self._since_decrease = 0
+                    logger.info("%s, concurrency limit now %d" % (
+                        'slow response' if ok else 'failed request',
+                        self.limit))
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold a slot for the duration of the block. Call report(ok) on the
+        yielded object when the request failed; otherwise it counts as a
+        success.
+
+        """
+        outcome = Outcome()
+        self.acquire()
+        start = time.time()
+        try:
+            yield outcome
+        except Exception:
+            outcome.ok = False
+            raise
+        finally:
+            self.release(time.time() - start, outcome.ok)
+
+    def stats(self):
+        with self._condition:
+            return {'limit': int(self.limit), 'in_flight': self.in_flight,
+                    'successes': self.successes,
+                    'congested': self.congested, 'waits': self.waits}
+
+
+class Outcome(object):
+    """Outcome of a request holding a limiter slot."""
+    def __init__(self):
+        self.ok = True
+
+    def report(self, ok):
+        self.ok = ok
+
+
+class RetryPolicy(object):
+    """
+    When and how long to wait before retrying a request.
+
+    Params:
+    - retries, maximum number of retries per request
+    - backoff, delay in seconds before the first retry; it doubles with
+      every next retry, up to max_backoff, with random jitter
+    - statuses, status codes to retry
+    - methods, HTTP methods to retry after a response or a timeout
+      (default the idempotent ones). Other methods, like POST, are only
+      retried when the connection could not be made, so the server never
+      got the request; a POST the server applied is not sent twice.
+
+    Requests with a streamed body (a file or generator) are not retried,
+    because the body can not be sent again.
+
+    """
+    def __init__(self, retries=3, backoff=0.5, max_backoff=30.0,
+                 statuses=TRANSIENT_STATUSES, methods=IDEMPOTENT_METHODS):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = statuses
+        self.methods = methods
+        self.retried = 0
+
+    def delay(self, attempt):
+        """Seconds to wait before retry number attempt (starting at 0)."""
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return random.uniform(delay / 2, delay)
+
+    def should_retry(self, method, attempt, response=None, error=None):
+        if attempt >= self.retries:
+            return False
+        if method not in self.methods:
+            return error is not None and not_sent(error)
+        if error is not None:
+            return isinstance(error, TRANSIENT_ERRORS)
+        return response.status_code in self.statuses
+
+
+def not_sent(error):
+    """Whether a request failed before it reached the server."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.ConnectionError) or not error.args:
+        return False
+    # Connection errors wrap a urllib3 MaxRetryError with the cause.
+    reason = getattr(error.args[0], 'reason', None)
+    return isinstance(reason, NewConnectionError)
+
+
+def replayable(kwargs):
+    """Whether the body of a request can be sent more than once."""
+    data = kwargs.get('data')
+    return data is None or isinstance(data, (basestring, dict, list, tuple))
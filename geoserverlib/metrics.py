@@ -0,0 +1,256 @@
+"""
+Request instrumentation.
+
+GeoserverClient calls every hook in client.hooks with a RequestEvent after
+each request. MetricsCollector is a hook that aggregates the events per
+endpoint::
+
+    metrics = MetricsCollector()
+    client.add_hook(metrics)
+    ...
+    print metrics.to_prometheus()
+
+"""
+import logging
+import re
+import socket
+import threading
+import urlparse
+
+from collections import deque
+
+
+logger = logging.getLogger('geoserverlib.metrics')
+
+# Collections in REST paths whose next segment is a resource name.
+TEMPLATE_NAMES = {
+    'workspaces': '{ws}',
+    'namespaces': '{ns}',
+    'datastores': '{ds}',
+    'coveragestores': '{cs}',
+    'featuretypes': '{ft}',
+    'coverages': '{coverage}',
+    'layers': '{layer}',
+    'layergroups': '{layergroup}',
+    'styles': '{style}',
+    'imports': '{import}',
+    'tasks': '{task}',
+    'seed': '{layer}',
+}
+
+EXTENSION_RE = re.compile(r'^(.*?)(\.(?:json|xml|sld|html))$')
+
+
+def url_template(request_url):
+    """
+    Return the path of a request url with resource names replaced by
+    placeholders, e.g. /geoserver/rest/workspaces/{ws}/datastores.json.
+
+    """
+    path = urlparse.urlparse(request_url).path
+    segments = path.split('/')
+    for i in range(1, len(segments)):
+        placeholder = TEMPLATE_NAMES.get(segments[i - 1])
+        if placeholder is None or not segments[i]:
+            continue
+        match = EXTENSION_RE.match(segments[i])
+        extension = match.group(2) if match else ''
+        segments[i] = placeholder + extension
+    return '/'.join(segments)
+
+
+class RequestEvent(object):
+    """
+    Details of a single request: method, url, url_template, status (None
+    when the request raised an exception), bytes_sent, bytes_received (None
+    when unknown), latency in seconds and error (the exception, if any).
+
+    """
+    def __init__(self, method, url, status=None, bytes_sent=None,
+                 bytes_received=None, latency=0.0, error=None):
+        self.method = method
+        self.url = url
+        self.url_template = url_template(url)
+        self.status = status
+        self.bytes_sent = bytes_sent
+        self.bytes_received = bytes_received
+        self.latency = latency
+        self.error = error
+
+    def __repr__(self):
+        return '<RequestEvent %s %s %s %.3fs>' % (
+            self.method, self.url_template, self.status, self.latency)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list, fraction in [0, 1]."""
+    if not values:
+        return None
+    index = int(round(fraction * (len(values) - 1)))
+    return values[index]
+
+
+class EndpointStats(object):
+    """Aggregated events of one method and url template."""
+    def __init__(self, max_samples):
+        self.count = 0
+        self.errors = 0
+        self.statuses = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.total_latency = 0.0
+        self.latencies = deque(maxlen=max_samples)
+
+    def add(self, event):
+        self.count += 1
+        status = event.status if event.status is not None else 'error'
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if event.status is None or event.status >= 400:
+            self.errors += 1
+        self.bytes_sent += event.bytes_sent or 0
+        self.bytes_received += event.bytes_received or 0
+        self.total_latency += event.latency
+        self.latencies.append(event.latency)
+
+    def percentiles(self, fractions=(0.5, 0.9, 0.99)):
+        latencies = sorted(self.latencies)
+        return dict((fraction, percentile(latencies, fraction))
+                    for fraction in fractions)
+
+
+class MetricsCollector(object):
+    """
+    Hook aggregating request events per (method, url template): counts per
+    status, errors, bytes and latency percentiles (over the last
+    max_samples requests of each endpoint).
+
+    """
+    def __init__(self, max_samples=10000):
+        self.max_samples = max_samples
+        self.endpoints = {}
+        # Counts per endpoint at the previous to_statsd call.
+        self._flushed = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        key = (event.method, event.url_template)
+        with self._lock:
+            stats = self.endpoints.get(key)
+            if stats is None:
+                stats = self.endpoints[key] = EndpointStats(self.max_samples)
+            stats.add(event)
+
+    def reset(self):
+        with self._lock:
+            self.endpoints.clear()
+            self._flushed.clear()
+
+    def summary(self):
+        """Return a list of dicts with the statistics per endpoint."""
+        with self._lock:
+            rows = []
+            for (method, template), stats in sorted(self.endpoints.items()):
+                percentiles = stats.percentiles()
+                rows.append({
+                    'method': method,
+                    'endpoint': template,
+                    'count': stats.count,
+                    'errors': stats.errors,
+                    'bytes_sent': stats.bytes_sent,
+                    'bytes_received': stats.bytes_received,
+                    'mean': stats.total_latency / stats.count,
+                    'p50': percentiles[0.5],
+                    'p90': percentiles[0.9],
+                    'p99': percentiles[0.99],
+                })
+            return rows
+
+    def to_prometheus(self, prefix='geoserverlib'):
+        """Return the statistics in the Prometheus text exposition format."""
+        lines = [
+            '# TYPE %s_requests_total counter' % prefix,
+        ]
+        summary_lines = []
+        sent_lines = []
+        received_lines = []
+        with self._lock:
+            for (method, template), stats in sorted(self.endpoints.items()):
+                labels = 'method="%s",endpoint="%s"' % (method, template)
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append('%s_requests_total{%s,status="%s"} %d' % (
+                        prefix, labels, status, count))
+                for fraction, value in sorted(stats.percentiles().items()):
+                    summary_lines.append(
+                        '%s_request_latency_seconds{%s,quantile="%s"} %f' % (
+                            prefix, labels, fraction, value))
+                summary_lines.append(
+                    '%s_request_latency_seconds_sum{%s} %f' % (
+                        prefix, labels, stats.total_latency))
+                summary_lines.append(
+                    '%s_request_latency_seconds_count{%s} %d' % (
+                        prefix, labels, stats.count))
+                sent_lines.append('%s_bytes_sent_total{%s} %d' % (
+                    prefix, labels, stats.bytes_sent))
+                received_lines.append('%s_bytes_received_total{%s} %d' % (
+                    prefix, labels, stats.bytes_received))
+        lines.append('# TYPE %s_request_latency_seconds summary' % prefix)
+        lines.extend(summary_lines)
+        lines.append('# TYPE %s_bytes_sent_total counter' % prefix)
+        lines.extend(sent_lines)
+        lines.append('# TYPE %s_bytes_received_total counter' % prefix)
+        lines.extend(received_lines)
+        return '\n'.join(lines) + '\n'
+
+    def to_statsd(self, prefix='geoserverlib'):
+        """
+        Return the aggregated statistics as StatsD lines: counters for the
+        number of requests and errors and gauges for the percentiles in
+        milliseconds.
+
+        StatsD adds up the counters it receives, so they hold the requests
+        and errors since the previous call, not the totals.
+
+        """
+        lines = []
+        rows = self.summary()
+        with self._lock:
+            for row in rows:
+                endpoint = (row['method'], row['endpoint'])
+                count, errors = self._flushed.get(endpoint, (0, 0))
+                self._flushed[endpoint] = (row['count'], row['errors'])
+                name = statsd_name(prefix, row['method'], row['endpoint'])
+                lines.append('%s.count:%d|c' % (name, row['count'] - count))
+                lines.append('%s.errors:%d|c' % (name,
+                                                 row['errors'] - errors))
+                for key in ('p50', 'p90', 'p99'):
+                    lines.append('%s.%s:%d|g' % (name, key, row[key] * 1000))
+        return lines
+
+
+def statsd_name(prefix, method, template):
+    """StatsD-safe metric name for an endpoint."""
+    endpoint = re.sub(r'[{}]', '', template.strip('/'))
+    endpoint = re.sub(r'[^A-Za-z0-9_]+', '_', endpoint)
+    return '%s.%s.%s' % (prefix, method.lower(), endpoint)
+
+
+class StatsdHook(object):
+    """
+    Hook sending a timing and a counter per request to a StatsD server over
+    UDP.
+
+    """
+    def __init__(self, host='localhost', port=8125, prefix='geoserverlib'):
+        self.address = (host, port)
+        self.prefix = prefix
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def __call__(self, event):
+        name = statsd_name(self.prefix, event.method, event.url_template)
+        status = event.status if event.status is not None else 'error'
+        packet = '%s.time:%d|ms\n%s.status_%s:1|c' % (
+            name, event.latency * 1000, name, status)
+        try:
+            self.socket.sendto(packet, self.address)
+        except socket.error:
+            logger.debug("could not send metrics to statsd")
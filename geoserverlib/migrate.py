@@ -0,0 +1,426 @@
+"""
+Copy workspaces, datastores, feature types, styles and default styles from
+one GeoServer to another.
+
+Reading from the source and writing to the target overlap: a pool of
+readers walks the source catalog and puts every resource on a bounded
+queue as soon as it is read, while writer threads create it on the
+target::
+
+    report = migrate(source, target, workspaces=['ws'],
+                     journal='migration.journal')
+
+Every completed write is appended to the journal; running the same
+migration again with the same journal skips what was already done, so an
+interrupted migration can be resumed.
+
+"""
+import json
+import logging
+import threading
+import time
+
+from Queue import Queue
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import escape
+
+from geoserverlib.client import GeoserverClientException
+from geoserverlib.provision import _succeeded
+from geoserverlib.reconcile import view_options
+from geoserverlib.reconcile import virtual_table
+
+
+logger = logging.getLogger('geoserverlib.migrate')
+
+# Put on the write queue to stop a writer.
+STOP = object()
+
+
+class MigrationReport(object):
+    """
+    Outcome of a migration: numbers of reads and writes, writes skipped
+    because the journal has them, failed writes as (key, error) tuples,
+    time spent reading and writing (summed over threads) and the duration.
+
+    """
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+        self.resumed = 0
+        self.failed = []
+        self.read_time = 0.0
+        self.write_time = 0.0
+        self.duration = None
+        self._lock = threading.Lock()
+
+    def add(self, counter, seconds=None, timer=None):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+            if timer is not None:
+                setattr(self, timer, getattr(self, timer) + seconds)
+
+    @property
+    def ok(self):
+        return not self.failed
+
+    @property
+    def rate(self):
+        """Writes per second."""
+        if not self.duration:
+            return None
+        return self.writes / self.duration
+
+    def __repr__(self):
+        return ('<MigrationReport %d reads, %d writes, %d resumed, '
+                '%d failed>' % (self.reads, self.writes, self.resumed,
+                                len(self.failed)))
+
+
+class Journal(object):
+    """Append-only file with the keys of completed writes."""
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        self._lock = threading.Lock()
+        self._file = None
+        if path is None:
+            return
+        try:
+            with open(path, 'r') as journal_file:
+                for line in journal_file:
+                    if line.strip():
+                        self.done.add(tuple(json.loads(line)))
+        except IOError:
+            pass
+        self._file = open(path, 'a')
+
+    def __contains__(self, key):
+        return key in self.done
+
+    def add(self, key):
+        with self._lock:
+            self.done.add(key)
+            if self._file is not None:
+                self._file.write(json.dumps(list(key)) + '\n')
+                self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def connection_parameters(datastore):
+    """Connection parameters of a datastore dict as a plain dict."""
+    entries = (datastore.get('connectionParameters') or {}).get('entry', [])
+    if isinstance(entries, dict):
+        entries = [entries]
+    return dict((entry['@key'], entry.get('$')) for entry in entries)
+
+
+def bbox(box):
+    """(minx, miny, maxx, maxy) of a bounding box dict, or None."""
+    if not box:
+        return None
+    return (box['minx'], box['miny'], box['maxx'], box['maxy'])
+
+
+def srid(srs):
+    """28992 for 'EPSG:28992', None for anything else."""
+    prefix, _, code = (srs or '').partition(':')
+    if prefix.upper() == 'EPSG' and code.isdigit():
+        return int(code)
+    return None
+
+
+def create_table_feature_type(client, workspace, datastore, feature_type):
+    """Publish an existing table (a feature type without virtual table)."""
+    xml = ('<featureType><name>%s</name><nativeName>%s</nativeName>'
+           '<srs>%s</srs><enabled>true</enabled></featureType>') % (
+        escape(feature_type['name']),
+        escape(feature_type.get('nativeName') or feature_type['name']),
+        escape(feature_type.get('srs') or 'EPSG:4326'))
+    return client.request('POST', ['/geoserver/rest/workspaces', workspace,
+                                   'datastores', datastore, 'featuretypes'],
+                          data=xml, headers={'content-type': 'text/xml'})
+
+
+def _read(value, what):
+    """
+    Return what the source client returned. The client returns None when
+    a request failed; migrating as if the resource or listing were empty
+    would silently leave it out of the target.
+
+    """
+    if value is None:
+        raise GeoserverClientException("reading %s failed" % what)
+    return value
+
+
+class Migration(object):
+    """A single migration run; use migrate."""
+    def __init__(self, source, target, workspaces=None, styles=True,
+                 datastore_parameters=None, journal=None, readers=4,
+                 writers=4, queue_size=100):
+        self.source = source
+        self.target = target
+        self.workspaces = workspaces
+        self.styles = styles
+        self.datastore_parameters = datastore_parameters
+        self.journal = Journal(journal)
+        self.writers = writers
+        self.report = MigrationReport()
+        self.queue = Queue(maxsize=queue_size)
+        self.reader_pool = ThreadPoolExecutor(max_workers=readers)
+        self.layer_styles = []
+        self._done = {}
+        self._status = {}
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._idle = threading.Condition(self._lock)
+
+    # Bookkeeping of writes, so children wait for their parents.
+
+    def _event(self, key):
+        with self._lock:
+            event = self._done.get(key)
+            if event is None:
+                event = self._done[key] = threading.Event()
+            return event
+
+    def _finish(self, key, ok):
+        self._status[key] = ok
+        self._event(key).set()
+
+    def _parent_ok(self, parent):
+        if parent is None:
+            return True
+        self._event(parent).wait()
+        return self._status[parent]
+
+    def resume(self, key):
+        """Mark a write that the journal has as done."""
+        self.report.add('resumed')
+        self._finish(key, True)
+
+    def write(self, key, parent, function, *args, **kwargs):
+        """Queue a write, unless the journal has it."""
+        if key in self.journal:
+            self.resume(key)
+            return
+        self.queue.put((key, parent, function, args, kwargs))
+
+    # Readers. Reads of children are submitted after the write of their
+    # parent is queued, so a writer never waits for a write behind it.
+
+    def read(self, function, *args):
+        with self._lock:
+            self._pending += 1
+        self.reader_pool.submit(self._read, function, *args)
+
+    def _read(self, function, *args):
+        start = time.time()
+        try:
+            function(*args)
+        except Exception as e:
+            logger.exception("reading %s%r failed", function.__name__, args)
+            self.report.failed.append((('read', function.__name__) + args,
+                                       e))
+        finally:
+            self.report.add('reads', time.time() - start, 'read_time')
+            with self._lock:
+                self._pending -= 1
+                if not self._pending:
+                    self._idle.notify_all()
+
+    def read_workspaces(self):
+        names = _read(self.source.list_workspaces(), 'workspaces')
+        if self.workspaces is not None:
+            names = [name for name in names if name in self.workspaces]
+        for workspace in names:
+            self.write(('workspace', workspace), None,
+                       self.target.create_workspace, workspace)
+            self.read(self.read_datastores, workspace)
+
+    def read_datastores(self, workspace):
+        for datastore in _read(self.source.list_datastores(workspace),
+                               'datastores of %s' % workspace):
+            self.read(self.read_datastore, workspace, datastore)
+
+    def read_datastore(self, workspace, datastore):
+        key = ('datastore', workspace, datastore)
+        if key in self.journal:
+            self.resume(key)
+        else:
+            content = _read(self.source.get_datastore(workspace, datastore),
+                            'datastore %s:%s' % (workspace, datastore))
+            parameters = connection_parameters(content)
+            if self.datastore_parameters is not None:
+                parameters = self.datastore_parameters(workspace, datastore,
+                                                       parameters)
+            self.write(key, ('workspace', workspace),
+                       self.target.create_datastore, workspace, datastore,
+                       parameters)
+        views = _read(self.source.list_feature_types(workspace, datastore),
+                      'feature types of %s:%s' % (workspace, datastore))
+        for view in views:
+            self.read(self.read_feature_type, workspace, datastore, view)
+
+    def read_feature_type(self, workspace, datastore, view):
+        key = ('feature_type', workspace, datastore, view)
+        if key in self.journal:
+            self.resume(key)
+        else:
+            feature_type = _read(
+                self.source.get_feature_type(workspace, datastore, view),
+                'feature type %s:%s' % (workspace, view))
+            self.write(key, ('datastore', workspace, datastore),
+                       self.write_feature_type, workspace, datastore,
+                       feature_type)
+        style_key = ('layer_style', workspace, view)
+        if style_key in self.journal:
+            self.resume(style_key)
+            return
+        layer = self.source.get_layer('%s:%s' % (workspace, view)) or {}
+        style_name = (layer.get('defaultStyle') or {}).get('name')
+        if style_name is not None:
+            with self._lock:
+                self.layer_styles.append((style_key, key, (
+                    workspace, datastore, view, style_name)))
+
+    def read_styles(self):
+        for style_name in _read(self.source.list_styles(), 'styles'):
+            self.read(self.read_style, style_name)
+
+    def read_style(self, style_name):
+        key = ('style', style_name)
+        if key in self.journal:
+            self.resume(key)
+            return
+        style_data = _read(self.source.get_style_body(style_name),
+                           'style %s' % style_name)
+        self.write(key, None, self.write_style, style_name, style_data)
+
+    # Writers.
+
+    def write_feature_type(self, workspace, datastore, feature_type):
+        table = virtual_table(feature_type)
+        if table is None:
+            return create_table_feature_type(self.target, workspace,
+                                             datastore, feature_type)
+        name = feature_type['name']
+        native_bbox = bbox(feature_type.get('nativeBoundingBox'))
+        latlon_bbox = bbox(feature_type.get('latLonBoundingBox'))
+        srs = feature_type.get('srs') or 'EPSG:28992'
+        response = self.target.create_feature_type(
+            workspace, datastore, name, table['sql'], srs=srs,
+            srid=srid(srs) or 28992, native_bbox=native_bbox,
+            latlon_bbox=latlon_bbox,
+            enabled=feature_type.get('enabled', True), **view_options(table))
+        if response.ok and (native_bbox is None or latlon_bbox is None):
+            response = self.target.recalculate_bounding_boxes(
+                workspace, datastore, name)
+        return response
+
+    def write_style(self, style_name, style_data):
+        if self.target.style_exists(style_name):
+            return self.target.update_style(style_name,
+                                            style_data=style_data)
+        return self.target.upload_style(style_name, style_data=style_data)
+
+    def _run_write(self, key, function, args, kwargs):
+        start = time.time()
+        try:
+            ok = _succeeded(function(*args, **kwargs))
+            error = None if ok else "write failed"
+        except Exception as e:
+            logger.exception("writing %s failed", key)
+            ok, error = False, e
+        self.report.add('writes', time.time() - start, 'write_time')
+        if ok:
+            self.journal.add(key)
+        else:
+            self.report.failed.append((key, error))
+        return ok
+
+    def writer(self):
+        while True:
+            item = self.queue.get()
+            if item is STOP:
+                return
+            key, parent, function, args, kwargs = item
+            if not self._parent_ok(parent):
+                self.report.failed.append((key, "%s failed" % (parent,)))
+                self._finish(key, False)
+            else:
+                self._finish(key, self._run_write(key, function, args,
+                                                  kwargs))
+
+    def run(self):
+        start = time.time()
+        threads = [threading.Thread(target=self.writer)
+                   for _ in range(self.writers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        try:
+            if self.styles:
+                self.read(self.read_styles)
+            self.read(self.read_workspaces)
+            with self._lock:
+                while self._pending:
+                    self._idle.wait(1)
+            for _ in threads:
+                self.queue.put(STOP)
+            for thread in threads:
+                thread.join()
+            # Default styles last: by now all styles and layers exist.
+            executor = ThreadPoolExecutor(max_workers=self.writers)
+            for key, layer_key, args in self.layer_styles:
+                if not self._status.get(layer_key):
+                    self.report.failed.append((key, "%s failed" % (
+                        layer_key,)))
+                    continue
+                executor.submit(self._run_write, key,
+                                self.target.set_default_style, args, {})
+            executor.shutdown(wait=True)
+        finally:
+            self.reader_pool.shutdown(wait=True)
+            self.journal.close()
+        self.report.duration = time.time() - start
+        logger.info("migration: %r in %.1fs" % (self.report,
+                                                self.report.duration))
+        return self.report
+
+
+def migrate(source, target, workspaces=None, styles=True,
+            datastore_parameters=None, journal=None, readers=4, writers=4,
+            queue_size=100):
+    """
+    Copy the catalog of the source client to the target client and return
+    a MigrationReport.
+
+    Params:
+    - workspaces, names of the workspaces to copy (default all); their
+      datastores, feature types and layers' default styles are copied
+    - styles, whether to copy the global styles with their SLD
+    - datastore_parameters, function called with workspace, datastore and
+      the connection parameters read from the source, returning the
+      parameters for the target. GeoServer returns passwords encrypted,
+      so this is the place to put them back.
+    - journal, path of the journal file used for resuming
+    - readers, writers, number of reading and writing threads
+    - queue_size, maximum number of resources read but not yet written
+
+    SQL view feature types are recreated with their SQL, SRS and bounding
+    boxes; other feature types are published from the same table name.
+
+    Reads from the source that fail (including listings) are recorded in
+    report.failed, and nothing below them is copied.
+
+    """
+    migration = Migration(source, target, workspaces=workspaces,
+                          styles=styles,
+                          datastore_parameters=datastore_parameters,
+                          journal=journal, readers=readers, writers=writers,
+                          queue_size=queue_size)
+    return migration.run()
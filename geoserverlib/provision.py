@@ -0,0 +1,342 @@
+"""
+Declarative bulk provisioning.
+
+A manifest describes the workspaces, datastores, feature types, styles and
+layer-style bindings that should be created, for example::
+
+    {
+        "workspaces": ["my_workspace"],
+        "datastores": [
+            {"workspace": "my_workspace", "name": "my_datastore",
+             "connection_parameters": {"host": "localhost", ...}}
+        ],
+        "feature_types": [
+            {"workspace": "my_workspace", "datastore": "my_datastore",
+             "name": "my_layer", "sql": "SELECT * FROM my_table",
+             "srs": "EPSG:28992", "srid": 28992},
+            {"workspace": "my_workspace", "datastore": "my_datastore",
+             "name": "my_view",
+             "sql": "SELECT * FROM my_table WHERE region = '%region%'",
+             "parameters": [{"name": "region", "default": "north"}],
+             "key_column": "id", "geometry_type": "MultiPolygon"}
+        ],
+        "styles": [
+            {"name": "my_style", "filename": "path/to/my_style.sld"}
+        ],
+        "layer_styles": [
+            {"workspace": "my_workspace", "datastore": "my_datastore",
+             "layer": "my_layer", "style": "my_style"}
+        ]
+    }
+
+The manifest is turned into tasks with dependencies between them (a
+datastore needs its workspace, a layer style needs the feature type and the
+style, etc). Independent tasks are executed in parallel by a worker pool.
+
+"""
+import json
+import logging
+import os
+import time
+
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+
+from geoserverlib.client import GeoserverClientException
+
+
+logger = logging.getLogger('geoserverlib.provision')
+
+# Optional feature type keys that are passed on to create_feature_type.
+VIEW_OPTIONS = ('parameters', 'key_column', 'geometry_name', 'geometry_type')
+
+
+def load_manifest(source):
+    """
+    Load a manifest from a dict, a JSON or YAML file path or a JSON string.
+
+    YAML requires PyYAML to be installed.
+
+    """
+    if isinstance(source, dict):
+        return source
+    if os.path.isfile(source):
+        extension = os.path.splitext(source)[1].lower()
+        with open(source, 'r') as manifest_file:
+            content = manifest_file.read()
+        if extension in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise GeoserverClientException(
+                    "PyYAML is required for reading YAML manifests")
+            return yaml.safe_load(content)
+        return json.loads(content)
+    return json.loads(source)
+
+
+class Task(object):
+    """
+    A single client call in a task graph.
+
+    Params:
+    - key, unique tuple identifying the task, e.g. ('workspace', 'ws')
+    - method, name of the GeoserverClient method to call, or a function
+      that is called with the client as first argument
+    - args, kwargs, arguments for the method
+    - depends, keys of the tasks that have to succeed first
+
+    """
+    def __init__(self, key, method, args=(), kwargs=None, depends=()):
+        self.key = key
+        self.method = method
+        self.args = tuple(args)
+        self.kwargs = kwargs or {}
+        self.depends = tuple(depends)
+
+    def __repr__(self):
+        return '<Task %s>' % (self.key,)
+
+
+class TaskResult(object):
+    """Outcome of a task: response or error, and duration in seconds."""
+    def __init__(self, task, ok, response=None, error=None, duration=0.0,
+                 skipped=False):
+        self.task = task
+        self.ok = ok
+        self.response = response
+        self.error = error
+        self.duration = duration
+        self.skipped = skipped
+
+    @property
+    def key(self):
+        return self.task.key
+
+    def __repr__(self):
+        if self.skipped:
+            state = 'skipped'
+        else:
+            state = 'ok' if self.ok else 'failed'
+        return '<TaskResult %s %s %.3fs>' % (self.key, state, self.duration)
+
+
+class ProvisionReport(object):
+    """All task results of a run, in order of completion."""
+    def __init__(self, results, duration):
+        self.results = results
+        self.duration = duration
+
+    @property
+    def ok(self):
+        return all(result.ok for result in self.results)
+
+    @property
+    def failed(self):
+        return [result for result in self.results
+                if not result.ok and not result.skipped]
+
+    @property
+    def skipped(self):
+        return [result for result in self.results if result.skipped]
+
+    def summary(self):
+        return "%d tasks, %d failed, %d skipped in %.2fs" % (
+            len(self.results), len(self.failed), len(self.skipped),
+            self.duration)
+
+
+def _item_name(item):
+    if isinstance(item, dict):
+        return item['name']
+    return item
+
+
+def _create_feature_type(client, workspace, datastore, view, sql_query,
+                         **kwargs):
+    """Create a feature type unless it exists; return False if it does."""
+    if client.feature_type_exists(workspace, datastore, view):
+        logger.info("feature type '%s' already exists" % view)
+        return False
+    return client.create_feature_type(workspace, datastore, view, sql_query,
+                                      **kwargs)
+
+
+def _create_style(client, style_name, **kwargs):
+    """
+    Create a style with its SLD in one request, unless it exists; like the
+    create methods of the client, return False for an existing style.
+
+    """
+    if client.style_exists(style_name):
+        logger.info("style '%s' already exists" % style_name)
+        return False
+    return client.upload_style(style_name, **kwargs)
+
+
+def build_tasks(manifest):
+    """Convert a manifest into a list of tasks with their dependencies."""
+    manifest = load_manifest(manifest)
+    tasks = []
+    for workspace in manifest.get('workspaces', []):
+        workspace = _item_name(workspace)
+        tasks.append(Task(('workspace', workspace), 'create_workspace',
+                          args=[workspace]))
+    for item in manifest.get('datastores', []):
+        workspace, datastore = item['workspace'], item['name']
+        tasks.append(Task(
+            ('datastore', workspace, datastore), 'create_datastore',
+            args=[workspace, datastore, item['connection_parameters']],
+            depends=[('workspace', workspace)]))
+    for item in manifest.get('feature_types', []):
+        workspace, datastore = item['workspace'], item['datastore']
+        view = item['name']
+        kwargs = {}
+        for option in ('srs', 'srid') + VIEW_OPTIONS:
+            if option in item:
+                kwargs[option] = item[option]
+        feature_type_key = ('feature_type', workspace, datastore, view)
+        tasks.append(Task(
+            feature_type_key, _create_feature_type,
+            args=[workspace, datastore, view, item['sql']], kwargs=kwargs,
+            depends=[('datastore', workspace, datastore)]))
+        if item.get('recalculate', True):
+            tasks.append(Task(
+                ('bounding_boxes', workspace, datastore, view),
+                'recalculate_bounding_boxes',
+                args=[workspace, datastore, view],
+                depends=[feature_type_key]))
+    for item in manifest.get('styles', []):
+        kwargs = {}
+        if 'filename' in item:
+            kwargs['style_filename'] = item['filename']
+        if 'data' in item:
+            kwargs['style_data'] = item['data']
+        tasks.append(Task(('style', item['name']), _create_style,
+                          args=[item['name']], kwargs=kwargs))
+    keys = set(task.key for task in tasks)
+    for item in manifest.get('layer_styles', []):
+        workspace, datastore = item['workspace'], item['datastore']
+        layer, style = item['layer'], item['style']
+        layer_key = ('bounding_boxes', workspace, datastore, layer)
+        if layer_key not in keys:
+            layer_key = ('feature_type', workspace, datastore, layer)
+        tasks.append(Task(
+            ('layer_style', workspace, layer), 'set_default_style',
+            args=[workspace, datastore, layer, style],
+            depends=[layer_key, ('style', style)]))
+    return tasks
+
+
+def _succeeded(response):
+    # Client methods return False when the resource already exists.
+    if response is None or response is False:
+        return True
+    return getattr(response, 'ok', True)
+
+
+def _run_task(client, task):
+    start = time.time()
+    try:
+        if callable(task.method):
+            response = task.method(client, *task.args, **task.kwargs)
+        else:
+            response = getattr(client, task.method)(*task.args,
+                                                    **task.kwargs)
+    except Exception as e:
+        logger.exception("task %s failed", task.key)
+        return TaskResult(task, False, error=e,
+                          duration=time.time() - start)
+    ok = _succeeded(response)
+    error = None
+    if not ok:
+        error = getattr(response, 'text', None)
+    return TaskResult(task, ok, response=response, error=error,
+                      duration=time.time() - start)
+
+
+def run_tasks(client, tasks, max_workers=8):
+    """
+    Execute tasks on the client, running independent tasks in parallel.
+
+    A task is started as soon as all tasks it depends on have succeeded.
+    Dependencies on tasks that are not in the list are assumed to be
+    fulfilled already. Tasks whose dependencies failed are skipped.
+
+    Returns a ProvisionReport.
+
+    """
+    start = time.time()
+    tasks_by_key = dict((task.key, task) for task in tasks)
+    if len(tasks_by_key) != len(tasks):
+        raise GeoserverClientException("duplicate task keys")
+    waiting_on = {}
+    dependents = dict((key, []) for key in tasks_by_key)
+    for task in tasks:
+        depends = [key for key in task.depends if key in tasks_by_key]
+        waiting_on[task.key] = set(depends)
+        for key in depends:
+            dependents[key].append(task.key)
+
+    results = []
+
+    def skip(key, reason):
+        task = tasks_by_key[key]
+        results.append(TaskResult(task, False, error=reason, skipped=True))
+        for dependent in dependents[key]:
+            if dependent in waiting_on:
+                del waiting_on[dependent]
+                skip(dependent, "dependency %s skipped" % (key,))
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        running = {}
+
+        def start_ready():
+            ready = [key for key, depends in waiting_on.items()
+                     if not depends]
+            for key in ready:
+                del waiting_on[key]
+                future = executor.submit(_run_task, client, tasks_by_key[key])
+                running[future] = key
+
+        start_ready()
+        while running:
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                key = running.pop(future)
+                result = future.result()
+                results.append(result)
+                for dependent in dependents[key]:
+                    if dependent not in waiting_on:
+                        continue
+                    if result.ok:
+                        waiting_on[dependent].discard(key)
+                    else:
+                        del waiting_on[dependent]
+                        skip(dependent, "dependency %s failed" % (key,))
+            start_ready()
+    finally:
+        executor.shutdown(wait=True)
+
+    # Anything left is part of a dependency cycle.
+    for key in list(waiting_on):
+        if key in waiting_on:
+            del waiting_on[key]
+            skip(key, "dependency cycle")
+
+    report = ProvisionReport(results, time.time() - start)
+    logger.info(report.summary())
+    return report
+
+
+def provision(client, manifest, max_workers=8):
+    """
+    Create everything described in the manifest (see load_manifest) on
+    the client, running independent branches in parallel.
+
+    Returns a ProvisionReport with a TaskResult per task.
+
+    """
+    return run_tasks(client, build_tasks(manifest), max_workers=max_workers)
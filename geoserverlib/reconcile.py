@@ -0,0 +1,334 @@
+"""
+Plan and apply the changes needed to bring a live GeoServer catalog in line
+with a desired state.
+
+The desired state uses the manifest format of geoserverlib.provision. The
+live catalog is read, compared with it, and only the missing, changed or
+(optionally) superfluous resources are created, updated or deleted::
+
+    changes = plan(client, manifest, prune=True)
+    print '\\n'.join(changes.describe())
+    report = apply(client, changes)
+
+"""
+import logging
+import re
+
+from concurrent.futures import ThreadPoolExecutor
+
+from geoserverlib.client import GeoserverClientException
+from geoserverlib.client import view_parameters
+from geoserverlib.provision import Task
+from geoserverlib.provision import VIEW_OPTIONS
+from geoserverlib.provision import build_tasks
+from geoserverlib.provision import load_manifest
+from geoserverlib.provision import run_tasks
+from geoserverlib.styles import style_hash
+
+
+logger = logging.getLogger('geoserverlib.reconcile')
+
+
+class Plan(object):
+    """The tasks needed to reach the desired state."""
+    def __init__(self, tasks):
+        self.tasks = tasks
+
+    @property
+    def empty(self):
+        return not self.tasks
+
+    def describe(self):
+        """Return a human readable line per task."""
+        return ['%s %s' % (task.method, ' '.join(
+            str(arg) for arg in task.args if not isinstance(arg, dict)))
+            for task in self.tasks]
+
+    def __len__(self):
+        return len(self.tasks)
+
+
+def virtual_table(feature_type):
+    """
+    Return the virtualTable dict of a feature type (as returned by
+    GeoserverClient.get_feature_type), or None.
+
+    """
+    entries = (feature_type.get('metadata') or {}).get('entry', [])
+    if isinstance(entries, dict):
+        entries = [entries]
+    for entry in entries:
+        if entry.get('@key') == 'JDBC_VIRTUAL_TABLE':
+            return entry.get('virtualTable')
+    return None
+
+
+def _as_list(value):
+    if value is None or value == '':
+        return []
+    if isinstance(value, dict):
+        return [value]
+    return value
+
+
+def view_options(table):
+    """
+    Return the create_feature_type keyword arguments (parameters,
+    key_column, geometry_name and geometry_type) that describe a
+    virtualTable dict as returned by virtual_table.
+
+    """
+    options = {}
+    parameters = [(parameter['name'], parameter.get('defaultValue'),
+                   parameter.get('regexpValidator'))
+                  for parameter in _as_list(table.get('parameter'))]
+    if parameters:
+        options['parameters'] = parameters
+    if table.get('keyColumn'):
+        options['key_column'] = table['keyColumn']
+    geometries = _as_list(table.get('geometry'))
+    if geometries:
+        if geometries[0].get('name'):
+            options['geometry_name'] = geometries[0]['name']
+        if geometries[0].get('type'):
+            options['geometry_type'] = geometries[0]['type']
+    return options
+
+
+def geometry_srid(table):
+    """
+    Return the srid of the geometry column of a virtualTable dict, as an
+    int, or None when it is not given.
+
+    """
+    geometries = _as_list(table.get('geometry'))
+    if not geometries or geometries[0].get('srid') in (None, ''):
+        return None
+    return int(geometries[0]['srid'])
+
+
+def _normalize_sql(sql):
+    return re.sub(r'\s+', ' ', sql or '').strip()
+
+
+def _same_view_options(live, desired):
+    """Whether the view options given in the manifest match the live ones."""
+    for option in VIEW_OPTIONS:
+        if option not in desired:
+            continue
+        if option == 'parameters':
+            same = (view_parameters(live.get(option)) ==
+                    view_parameters(desired[option]))
+        else:
+            same = live.get(option) == desired[option]
+        if not same:
+            return False
+    return True
+
+
+def _style_data(item):
+    if 'data' in item:
+        return item['data']
+    with open(item['filename'], 'rb') as style_file:
+        return style_file.read()
+
+
+def _fetch(executor, calls):
+    """Run {key: (function, args)} in parallel, return {key: result}."""
+    futures = dict((key, executor.submit(function, *args))
+                   for key, (function, args) in calls.items())
+    return dict((key, future.result()) for key, future in futures.items())
+
+
+def _listing(live, key):
+    """
+    Return a fetched listing. The client returns None when listing failed;
+    planning against it as if it were empty would create (or with prune,
+    delete) everything in it.
+
+    """
+    names = live[key]
+    if names is None:
+        raise GeoserverClientException("listing %s failed" % (key,))
+    return names
+
+
+def plan(client, desired, prune=False, max_workers=8):
+    """
+    Compare the desired state (a manifest, see geoserverlib.provision) with
+    the live catalog and return a Plan.
+
+    Missing resources are created; feature types whose SQL, SRS, srid (of
+    the geometry column, which also sets the native CRS) or view options
+    differ, styles whose SLD differs and layers whose default style
+    differs are updated. Datastores are only created: their connection
+    parameters can not be compared, because GeoServer does not return
+    passwords.
+
+    With prune, datastores and feature types that exist in the workspaces
+    and datastores of the manifest but are not in the manifest themselves
+    are deleted. Workspaces and styles are never deleted.
+
+    Raises GeoserverClientException when a listing fails.
+
+    """
+    manifest = load_manifest(desired)
+    missing = {'workspaces': [], 'datastores': [], 'feature_types': [],
+               'layer_styles': []}
+    tasks = []
+
+    workspaces = [item['name'] if isinstance(item, dict) else item
+                  for item in manifest.get('workspaces', [])]
+    datastores = manifest.get('datastores', [])
+    feature_types = manifest.get('feature_types', [])
+    styles = manifest.get('styles', [])
+    layer_styles = manifest.get('layer_styles', [])
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        live = _fetch(executor, {
+            'workspaces': (client.list_workspaces, ()),
+            'styles': (client.list_styles, ())})
+        live_workspaces = set(_listing(live, 'workspaces'))
+        live_styles = set(_listing(live, 'styles'))
+        managed_workspaces = set(workspaces) | set(
+            item['workspace'] for item in datastores)
+        existing_workspaces = managed_workspaces & live_workspaces
+        missing['workspaces'] = [workspace for workspace in workspaces
+                                 if workspace not in live_workspaces]
+
+        # Datastores per workspace, and the SLDs of existing styles.
+        calls = dict((('datastores', workspace),
+                      (client.list_datastores, (workspace,)))
+                     for workspace in existing_workspaces)
+        for item in styles:
+            if item['name'] in live_styles:
+                calls[('style', item['name'])] = (client.get_style_body,
+                                                  (item['name'],))
+        live.update(_fetch(executor, calls))
+
+        desired_datastores = set((item['workspace'], item['name'])
+                                 for item in datastores)
+        existing_datastores = set()
+        for workspace in existing_workspaces:
+            for datastore in _listing(live, ('datastores', workspace)):
+                if (workspace, datastore) in desired_datastores:
+                    existing_datastores.add((workspace, datastore))
+                elif prune and workspace in set(workspaces):
+                    tasks.append(Task(
+                        ('delete_datastore', workspace, datastore),
+                        'delete_datastore', args=[workspace, datastore],
+                        kwargs={'recurse': True}))
+        missing['datastores'] = [
+            item for item in datastores
+            if (item['workspace'], item['name']) not in existing_datastores]
+
+        for item in styles:
+            name = item['name']
+            data = _style_data(item)
+            if name not in live_styles:
+                tasks.append(Task(('style', name), 'upload_style',
+                                  args=[name], kwargs={'style_data': data}))
+            elif (live[('style', name)] is None or
+                    style_hash(live[('style', name)]) != style_hash(data)):
+                tasks.append(Task(('style', name), 'update_style',
+                                  args=[name], kwargs={'style_data': data}))
+
+        # Feature types per existing datastore.
+        live.update(_fetch(executor, dict(
+            (('feature_types',) + key,
+             (client.list_feature_types, key))
+            for key in existing_datastores)))
+        desired_feature_types = set(
+            (item['workspace'], item['datastore'], item['name'])
+            for item in feature_types)
+        existing_feature_types = set()
+        for workspace, datastore in existing_datastores:
+            names = _listing(live, ('feature_types', workspace, datastore))
+            for view in names:
+                key = (workspace, datastore, view)
+                if key in desired_feature_types:
+                    existing_feature_types.add(key)
+                elif prune:
+                    layer = '%s:%s' % (workspace, view)
+                    tasks.append(Task(('delete_layer', workspace, view),
+                                      'delete_layer', args=[layer]))
+                    tasks.append(Task(
+                        ('delete_feature_type',) + key, 'delete_feature_type',
+                        args=list(key),
+                        depends=[('delete_layer', workspace, view)]))
+
+        # Definitions of existing feature types and their layers.
+        calls = dict((('feature_type',) + key,
+                      (client.get_feature_type, key))
+                     for key in existing_feature_types)
+        for item in layer_styles:
+            key = (item['workspace'], item['datastore'], item['layer'])
+            if key in existing_feature_types:
+                layer = '%s:%s' % (item['workspace'], item['layer'])
+                calls[('layer', layer)] = (client.get_layer, (layer,))
+        live.update(_fetch(executor, calls))
+    finally:
+        executor.shutdown(wait=True)
+
+    for item in feature_types:
+        key = (item['workspace'], item['datastore'], item['name'])
+        if key not in existing_feature_types:
+            missing['feature_types'].append(item)
+            continue
+        feature_type = live[('feature_type',) + key] or {}
+        table = virtual_table(feature_type) or {}
+        srs = item.get('srs', 'EPSG:28992')
+        live_srid = geometry_srid(table)
+        kwargs = {}
+        for option in ('srs', 'srid') + VIEW_OPTIONS:
+            if option in item:
+                kwargs[option] = item[option]
+        live_options = view_options(table)
+        if (_normalize_sql(table.get('sql')) == _normalize_sql(item['sql'])
+                and feature_type.get('srs') == srs and
+                live_srid in (None, int(item.get('srid', 28992))) and
+                _same_view_options(live_options, kwargs)):
+            continue
+        tasks.append(Task(('feature_type',) + key, 'update_feature_type',
+                          args=list(key) + [item['sql']], kwargs=kwargs))
+        if item.get('recalculate', True):
+            tasks.append(Task(('bounding_boxes',) + key,
+                              'recalculate_bounding_boxes', args=list(key),
+                              depends=[('feature_type',) + key]))
+
+    for item in layer_styles:
+        key = (item['workspace'], item['datastore'], item['layer'])
+        if key not in existing_feature_types:
+            missing['layer_styles'].append(item)
+            continue
+        layer = live[('layer', '%s:%s' % (item['workspace'],
+                                          item['layer']))] or {}
+        default_style = (layer.get('defaultStyle') or {}).get('name')
+        if default_style == item['style']:
+            continue
+        tasks.append(Task(
+            ('layer_style', item['workspace'], item['layer']),
+            'set_default_style', args=list(key) + [item['style']],
+            depends=[('feature_type',) + key, ('style', item['style'])]))
+
+    tasks = build_tasks(missing) + tasks
+    result = Plan(tasks)
+    logger.info("plan: %d tasks" % len(result))
+    return result
+
+
+def apply(client, changes, max_workers=8):
+    """
+    Execute a Plan, running independent tasks in parallel. Returns a
+    geoserverlib.provision.ProvisionReport.
+
+    """
+    return run_tasks(client, changes.tasks, max_workers=max_workers)
+
+
+def reconcile(client, desired, prune=False, max_workers=8):
+    """Plan and apply in one go; returns a ProvisionReport."""
+    return apply(client, plan(client, desired, prune=prune,
+                              max_workers=max_workers),
+                 max_workers=max_workers)
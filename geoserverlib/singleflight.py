@@ -0,0 +1,115 @@
+"""
+Coalescing of identical concurrent calls ("single flight").
+
+When several threads ask for the same thing at the same time, only the
+first call is executed; the others wait for it and share its result (or its
+exception). Passed to GeoserverClient, identical concurrent GETs go over
+the wire once::
+
+    client = GeoserverClient(host, port, username, password,
+                             single_flight=SingleFlight())
+
+FutureSingleFlight does the same for calls returning futures, as used by
+AsyncGeoserverClient(coalesce=True): identical calls return the same future
+while it is pending. Futures can be awaited from asyncio with
+asyncio.wrap_future.
+
+"""
+import sys
+import threading
+
+
+class Call(object):
+    """A call in flight, with the outcome shared by all its callers."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exc_info = None
+
+
+class SingleFlight(object):
+    """
+    Thread-safe single flight. Counters: calls, executed (calls that did
+    the work) and saved (calls that shared the outcome of another).
+
+    """
+    def __init__(self):
+        self.calls = 0
+        self.executed = 0
+        self.saved = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function, *args, **kwargs):
+        """
+        Return function(*args, **kwargs), or the outcome of the call with
+        the same key that is already in flight.
+
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._in_flight.get(key)
+            if call is not None:
+                self.saved += 1
+                leader = False
+            else:
+                call = self._in_flight[key] = Call()
+                self.executed += 1
+                leader = True
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = function(*args, **kwargs)
+            except BaseException:
+                call.exc_info = sys.exc_info()
+            finally:
+                with self._lock:
+                    del self._in_flight[key]
+                call.done.set()
+        if call.exc_info is not None:
+            raise call.exc_info[0], call.exc_info[1], call.exc_info[2]
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {'calls': self.calls, 'executed': self.executed,
+                    'saved': self.saved, 'in_flight': len(self._in_flight)}
+
+
+class FutureSingleFlight(object):
+    """
+    Single flight for functions returning a concurrent.futures.Future:
+    while the future of a key is pending, calls with that key return it
+    instead of starting a new one.
+
+    """
+    def __init__(self):
+        self.calls = 0
+        self.executed = 0
+        self.saved = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, function, *args, **kwargs):
+        with self._lock:
+            self.calls += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.saved += 1
+                return future
+            future = function(*args, **kwargs)
+            self._in_flight[key] = future
+            self.executed += 1
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def stats(self):
+        with self._lock:
+            return {'calls': self.calls, 'executed': self.executed,
+                    'saved': self.saved, 'in_flight': len(self._in_flight)}
@@ -0,0 +1,309 @@
+"""
+Export the whole REST catalog to a JSON-lines snapshot file.
+
+The catalog is crawled breadth first by a bounded pool of workers and every
+resource is written to the file as soon as it arrives, one JSON object per
+line, so memory use does not grow with the size of the catalog::
+
+    report = export_snapshot(client, 'catalog.jsonl')
+
+A line looks like {"kind": "feature_type", "key": ["workspaces", "ws",
+"datastores", "ds", "featuretypes", "ft"], "etag": ..., "hash": ...,
+"data": {...}}. Kinds are workspace, datastore, feature_type, layer, style
+and sld (the SLD body of a style, as a string).
+
+Passing the previous snapshot makes the export incremental: resources are
+requested conditionally with the ETag they had, and unchanged ones are
+copied from the previous file. With workspaces, only those workspaces (and
+their layers) are crawled again and the rest of the previous snapshot is
+copied as is::
+
+    report = export_snapshot(client, 'catalog.jsonl',
+                             previous='catalog.jsonl', workspaces=['ws'])
+
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+
+from geoserverlib.client import GeoserverClientException
+
+
+logger = logging.getLogger('geoserverlib.snapshot')
+
+# Extension of the REST url per kind of record.
+EXTENSIONS = {
+    'workspace': '.json',
+    'datastore': '.json',
+    'feature_type': '.json',
+    'layer': '.json',
+    'style': '.json',
+    'sld': '.sld',
+}
+
+
+class SnapshotReport(object):
+    """Counts of an export: records written, and how they were obtained."""
+    def __init__(self, path):
+        self.path = path
+        self.fetched = 0
+        self.unchanged = 0
+        self.copied = 0
+        self.missing = 0
+        self.failed = []
+        self.duration = None
+
+    @property
+    def records(self):
+        return self.fetched + self.unchanged + self.copied
+
+    @property
+    def ok(self):
+        return not self.failed
+
+    def __repr__(self):
+        return ('<SnapshotReport %d records: %d fetched, %d unchanged, '
+                '%d copied, %d failed>' % (
+                    self.records, self.fetched, self.unchanged, self.copied,
+                    len(self.failed)))
+
+
+class PreviousSnapshot(object):
+    """
+    Index of an earlier snapshot file: (kind, key) to the offset of its
+    line and its ETag and hash. Records are read back from the file when
+    needed, so only the index is kept in memory.
+
+    """
+    def __init__(self, path):
+        self.path = path
+        self.index = {}
+        self._file = open(path, 'rb')
+        offset = 0
+        for line in self._file:
+            if line.strip():
+                record = json.loads(line)
+                key = (record['kind'],) + tuple(record['key'])
+                self.index[key] = (offset, record.get('etag'),
+                                   record.get('hash'))
+            offset += len(line)
+
+    def get(self, kind, key):
+        """Return (offset, etag, hash) of a record, or None."""
+        return self.index.get((kind,) + tuple(key))
+
+    def line(self, offset):
+        self._file.seek(offset)
+        return self._file.readline()
+
+    def lines(self):
+        """Iterate over the (kind, key) and raw line of every record."""
+        for index_key, (offset, _, _) in sorted(self.index.items(),
+                                                key=lambda item: item[1][0]):
+            yield index_key, self.line(offset)
+
+    def close(self):
+        self._file.close()
+
+
+def in_workspaces(key, workspaces):
+    """Whether the record with this key belongs to one of the workspaces."""
+    if key[0] == 'workspaces':
+        return key[1] in workspaces
+    if key[0] == 'layers':
+        return key[1].split(':')[0] in workspaces
+    return False
+
+
+class SnapshotExporter(object):
+    """
+    Crawls the catalog of a client; use export_snapshot.
+
+    Jobs are (kind, key) tuples. Listing jobs return new jobs, resource
+    jobs return a record to write.
+
+    """
+    def __init__(self, client, previous=None, workspaces=None):
+        self.client = client
+        self.previous = previous
+        self.workspaces = set(workspaces) if workspaces is not None else None
+
+    def root_jobs(self):
+        return [('listing', ('workspaces',)), ('listing', ('layers',)),
+                ('listing', ('styles',))]
+
+    def run(self, job):
+        kind, key = job
+        if kind == 'listing':
+            return self.listing(key)
+        return self.resource(kind, key)
+
+    def listing(self, key):
+        client = self.client
+        if key == ('workspaces',):
+            names = client.list_workspaces()
+            if names is not None and self.workspaces is not None:
+                names = [name for name in names if name in self.workspaces]
+            jobs = [('workspace', ('workspaces', name))
+                    for name in names or []]
+            jobs += [('listing', ('datastores', name))
+                     for name in names or []]
+        elif key[0] == 'datastores':
+            workspace = key[1]
+            names = client.list_datastores(workspace)
+            jobs = [('datastore', ('workspaces', workspace,
+                                   'datastores', name))
+                    for name in names or []]
+            jobs += [('listing', ('featuretypes', workspace, name))
+                     for name in names or []]
+        elif key[0] == 'featuretypes':
+            workspace, datastore = key[1:]
+            names = client.list_feature_types(workspace, datastore)
+            jobs = [('feature_type', ('workspaces', workspace, 'datastores',
+                                      datastore, 'featuretypes', name))
+                    for name in names or []]
+        elif key[0] == 'layers':
+            names = client.list_layers()
+            if names is not None and self.workspaces is not None:
+                names = [name for name in names
+                         if in_workspaces(('layers', name), self.workspaces)]
+            jobs = [('layer', ('layers', name)) for name in names or []]
+        elif key[0] == 'styles':
+            names = client.list_styles()
+            jobs = [('style', ('styles', name)) for name in names or []]
+            jobs += [('sld', ('styles', name)) for name in names or []]
+        else:
+            raise ValueError("unknown listing %r" % (key,))
+        if names is None:
+            raise GeoserverClientException("listing %s failed" % '/'.join(key))
+        return jobs
+
+    def resource(self, kind, key):
+        """
+        Fetch a resource. Returns a record dict, the offset of the
+        unchanged record in the previous snapshot, or None when the
+        resource disappeared.
+
+        """
+        previous = self.previous.get(kind, key) if self.previous else None
+        headers = {}
+        if previous is not None and previous[1]:
+            headers['If-None-Match'] = previous[1]
+        segments = ['/geoserver/rest'] + list(key)
+        segments[-1] += EXTENSIONS[kind]
+        response = self.client.request('GET', segments, headers=headers)
+        if response.status_code == 304 and previous is not None:
+            return previous[0]
+        if response.status_code == 404:
+            return None
+        if not response.ok:
+            raise GeoserverClientException("GET %s failed: %s (%s)" % (
+                response.url, response.status_code, response.text))
+        content_hash = hashlib.sha1(response.content).hexdigest()
+        if previous is not None and previous[2] == content_hash:
+            return previous[0]
+        if kind == 'sld':
+            data = response.text
+        else:
+            data = response.json()
+        return {'kind': kind, 'key': list(key),
+                'etag': response.headers.get('ETag'),
+                'hash': content_hash, 'data': data}
+
+
+def export_snapshot(client, path, previous=None, workspaces=None,
+                    max_workers=8, max_pending=None):
+    """
+    Crawl the catalog and write it to path as JSON lines; returns a
+    SnapshotReport.
+
+    Params:
+    - previous, path of an earlier snapshot (may be the same as path) for
+      an incremental export
+    - workspaces, only crawl these workspaces and their layers; the other
+      records are copied from previous
+    - max_workers, number of concurrent requests
+    - max_pending, maximum number of jobs submitted to the pool at once
+      (default 4 * max_workers); jobs waiting for a slot are kept as
+      (kind, key) tuples only
+
+    The file is written to path + '.tmp' and renamed when the export is
+    complete, so an interrupted export leaves the previous snapshot intact.
+    When requests failed, the file is not renamed either: report.path is
+    then the '.tmp' file, with the records that could be exported.
+
+    """
+    if max_pending is None:
+        max_pending = 4 * max_workers
+    start = time.time()
+    report = SnapshotReport(path)
+    previous_snapshot = PreviousSnapshot(previous) if previous else None
+    if workspaces is not None and previous_snapshot is None:
+        raise ValueError("exporting some workspaces needs a previous "
+                         "snapshot to copy the rest from")
+    exporter = SnapshotExporter(client, previous_snapshot, workspaces)
+    tmp_path = path + '.tmp'
+    queue = deque(exporter.root_jobs())
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        with open(tmp_path, 'wb') as output:
+            running = {}
+            while queue or running:
+                while queue and len(running) < max_pending:
+                    job = queue.popleft()
+                    running[executor.submit(exporter.run, job)] = job
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error("snapshot of %s %s failed: %s" % (
+                            job[0], '/'.join(job[1]), e))
+                        report.failed.append((job, e))
+                        continue
+                    if job[0] == 'listing':
+                        queue.extend(result)
+                    elif result is None:
+                        report.missing += 1
+                    elif isinstance(result, dict):
+                        output.write(json.dumps(result) + '\n')
+                        report.fetched += 1
+                    else:
+                        output.write(previous_snapshot.line(result))
+                        report.unchanged += 1
+            if workspaces is not None:
+                for index_key, line in previous_snapshot.lines():
+                    key = index_key[1:]
+                    if key[0] in ('workspaces', 'layers') and not \
+                            in_workspaces(key, exporter.workspaces):
+                        output.write(line)
+                        report.copied += 1
+    finally:
+        executor.shutdown(wait=True)
+        if previous_snapshot is not None:
+            previous_snapshot.close()
+    report.duration = time.time() - start
+    if report.failed:
+        report.path = tmp_path
+        logger.error("snapshot %s incomplete, %d requests failed; kept %s" % (
+            path, len(report.failed), tmp_path))
+        return report
+    os.rename(tmp_path, path)
+    logger.info("snapshot %s: %r in %.1fs" % (path, report, report.duration))
+    return report
+
+
+def read_snapshot(path):
+    """Iterate over the records of a snapshot file."""
+    with open(path, 'rb') as snapshot_file:
+        for line in snapshot_file:
+            if line.strip():
+                yield json.loads(line)
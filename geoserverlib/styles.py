@@ -0,0 +1,201 @@
+"""
+Style synchronisation: upload only the SLDs that differ from the server.
+
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from geoserverlib.client import GeoserverClientException
+
+
+logger = logging.getLogger('geoserverlib.styles')
+
+
+def load_styles(source):
+    """
+    Return a dict of style name to SLD data.
+
+    Source is either a dict of style name to SLD data or a directory; every
+    .sld file in the directory becomes a style named after the file.
+
+    """
+    if isinstance(source, dict):
+        return dict(source)
+    styles = {}
+    for filename in sorted(os.listdir(source)):
+        name, extension = os.path.splitext(filename)
+        if extension.lower() != '.sld':
+            continue
+        with open(os.path.join(source, filename), 'rb') as style_file:
+            styles[name] = style_file.read()
+    return styles
+
+
+def style_hash(style_data):
+    """
+    Hash of an SLD, ignoring differences in line endings and in leading and
+    trailing whitespace of lines.
+
+    """
+    if isinstance(style_data, unicode):
+        style_data = style_data.encode('utf-8')
+    lines = style_data.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    normalized = '\n'.join(line.strip() for line in lines).strip()
+    return hashlib.sha1(normalized).hexdigest()
+
+
+def load_hash_manifest(path):
+    """Return the style name to hash dict stored at path, or {}."""
+    if path is None or not os.path.exists(path):
+        return {}
+    with open(path, 'r') as manifest_file:
+        return json.load(manifest_file)
+
+
+def save_hash_manifest(path, hashes):
+    with open(path, 'w') as manifest_file:
+        json.dump(hashes, manifest_file, indent=2, sort_keys=True)
+
+
+class SyncReport(object):
+    """Names of the created, updated, unchanged and failed styles."""
+    def __init__(self):
+        self.created = []
+        self.updated = []
+        self.unchanged = []
+        self.failed = []
+        self.duration = 0.0
+
+    @property
+    def ok(self):
+        return not self.failed
+
+    def summary(self):
+        return "%d created, %d updated, %d unchanged, %d failed in %.2fs" % (
+            len(self.created), len(self.updated), len(self.unchanged),
+            len(self.failed), self.duration)
+
+
+def _upload(client, name, data, exists):
+    if exists:
+        response = client.update_style(name, style_data=data)
+    else:
+        response = client.upload_style(name, style_data=data)
+    return response
+
+
+def upload_styles(client, styles, max_workers=8):
+    """
+    Create many styles concurrently, each with a single request.
+
+    Styles is a dict of style name to SLD data or a directory of .sld
+    files. Returns a dict of style name to response; when a request raised
+    an exception, the exception is stored instead.
+
+    """
+    styles = load_styles(styles)
+    results = {}
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = dict(
+            (name, executor.submit(client.upload_style, name,
+                                   style_data=data))
+            for name, data in styles.items())
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.exception("uploading style '%s' failed", name)
+                results[name] = e
+    finally:
+        executor.shutdown(wait=True)
+    return results
+
+
+def sync_styles(client, styles, manifest_path=None, max_workers=8):
+    """
+    Make the global styles on the server match the given SLDs, uploading
+    only the styles that are missing or differ.
+
+    Params:
+    - styles, dict of style name to SLD data or a directory of .sld files
+    - manifest_path, optional JSON file with the hashes of the SLDs on the
+      server from a previous sync. Styles whose hash matches are not
+      downloaded for comparison. The file is updated after the sync.
+    - max_workers, number of downloads and uploads done in parallel
+
+    Returns a SyncReport. Raises GeoserverClientException when the styles
+    on the server can not be listed.
+
+    """
+    start = time.time()
+    styles = load_styles(styles)
+    known_hashes = load_hash_manifest(manifest_path)
+    report = SyncReport()
+
+    server_styles = client.list_styles()
+    if server_styles is None:
+        # Don't upload everything as new because listing failed.
+        raise GeoserverClientException("listing the styles failed")
+    server_styles = set(server_styles)
+    local_hashes = dict((name, style_hash(data))
+                        for name, data in styles.items())
+
+    to_compare = []
+    to_upload = []
+    for name in sorted(styles):
+        if name not in server_styles:
+            to_upload.append(name)
+        elif known_hashes.get(name) == local_hashes[name]:
+            report.unchanged.append(name)
+        else:
+            to_compare.append(name)
+
+    server_hashes = dict((name, known_hashes[name])
+                         for name in report.unchanged)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        bodies = dict((name, executor.submit(client.get_style_body, name))
+                      for name in to_compare)
+        for name in to_compare:
+            body = bodies[name].result()
+            if body is not None:
+                server_hashes[name] = style_hash(body)
+            if server_hashes.get(name) == local_hashes[name]:
+                report.unchanged.append(name)
+            else:
+                to_upload.append(name)
+
+        uploads = dict(
+            (name, executor.submit(_upload, client, name, styles[name],
+                                   name in server_styles))
+            for name in to_upload)
+        for name in to_upload:
+            try:
+                response = uploads[name].result()
+            except Exception:
+                logger.exception("uploading style '%s' failed", name)
+                report.failed.append(name)
+                continue
+            if not response.ok:
+                report.failed.append(name)
+                continue
+            server_hashes[name] = local_hashes[name]
+            if name in server_styles:
+                report.updated.append(name)
+            else:
+                report.created.append(name)
+    finally:
+        executor.shutdown(wait=True)
+
+    if manifest_path is not None:
+        known_hashes.update(server_hashes)
+        save_hash_manifest(manifest_path, known_hashes)
+    report.duration = time.time() - start
+    logger.info("style sync: %s" % report.summary())
+    return report
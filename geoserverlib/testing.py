@@ -0,0 +1,655 @@
+"""
+In-process stand-in for the GeoServer REST API, for benchmarks and tests.
+
+FakeGeoServer keeps an in-memory catalog of workspaces, datastores,
+feature types, layers and styles and serves the endpoints used by
+GeoserverClient, with configurable latency, jitter and error rate. Features
+added with add_features are served by WFS GetFeature::
+
+    with FakeGeoServer(latency=0.01, jitter=0.005) as server:
+        client = GeoserverClient('localhost', server.port, 'admin', 'pw')
+        client.create_workspace('ws')
+
+"""
+import BaseHTTPServer
+import SocketServer
+import hashlib
+import json
+import random
+import socket
+import sys
+import threading
+import time
+import urlparse
+import xml.etree.ElementTree as ElementTree
+
+
+REST_PREFIX = '/geoserver/rest/'
+GWC_PREFIX = '/geoserver/gwc/rest/'
+WFS_PATHS = ('/geoserver/wfs', '/geoserver/ows')
+
+
+class Catalog(object):
+    """In-memory GeoServer catalog."""
+    def __init__(self):
+        self.workspaces = {}
+        self.layers = {}
+        self.styles = {}
+        self.tile_layers = {}
+        self.seed_tasks = {}
+        self.features = {}
+        self.imports = {}
+        self.lock = threading.RLock()
+
+
+def _names(collection, item, names):
+    names = sorted(names)
+    if not names:
+        return {collection: ''}
+    return {collection: {item: [{'name': name} for name in names]}}
+
+
+def _split_extension(name):
+    for extension in ('.json', '.xml', '.sld', '.html'):
+        if name.endswith(extension):
+            return name[:-len(extension)], extension
+    return name, ''
+
+
+class NotFound(Exception):
+    pass
+
+
+class Response(Exception):
+    """Raised by handlers to return a status with an optional body."""
+    def __init__(self, status, body='', content_type='text/plain'):
+        Exception.__init__(self, status)
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+
+
+def _json(content, status=200):
+    return Response(status, json.dumps(content), 'application/json')
+
+
+def _feature_type_from_xml(data):
+    root = ElementTree.fromstring(data.strip())
+    feature_type = {'name': root.findtext('name'),
+                    'srs': root.findtext('srs'),
+                    'enabled': root.findtext('enabled') != 'false'}
+    table = root.find('metadata/entry/virtualTable')
+    if table is not None:
+        feature_type['sql'] = table.findtext('sql')
+        feature_type['virtual_table'] = {
+            'keyColumn': table.findtext('keyColumn'),
+            'geometry': {'name': table.findtext('geometry/name'),
+                         'type': table.findtext('geometry/type'),
+                         'srid': table.findtext('geometry/srid')},
+            'parameter': [{'name': parameter.findtext('name'),
+                           'defaultValue': parameter.findtext('defaultValue'),
+                           'regexpValidator': parameter.findtext(
+                               'regexpValidator')}
+                          for parameter in table.findall('parameter')]}
+    return feature_type
+
+
+class FakeGeoServerHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; don't let Nagle delay them.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_body(self):
+        if self.headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(';')[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            return ''.join(chunks)
+        length = int(self.headers.get('content-length') or 0)
+        return self.rfile.read(length) if length else ''
+
+    def handle_any(self, method):
+        server = self.server.fake
+        body = self.read_body()
+        server.count_request()
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay:
+            time.sleep(delay)
+        if server.error_rate and random.random() < server.error_rate:
+            return self.respond(Response(503, 'injected error'))
+        parsed = urlparse.urlparse(self.path)
+        if parsed.path.startswith(REST_PREFIX):
+            prefix, dispatch = REST_PREFIX, server.dispatch
+        elif parsed.path.startswith(GWC_PREFIX):
+            prefix, dispatch = GWC_PREFIX, server.dispatch_gwc
+        elif parsed.path.rstrip('/') in WFS_PATHS:
+            prefix, dispatch = parsed.path, server.dispatch_wfs
+        else:
+            return self.respond(Response(404, 'not found'))
+        segments = [urlparse.unquote(segment) for segment in
+                    parsed.path[len(prefix):].strip('/').split('/')]
+        query = dict(urlparse.parse_qsl(parsed.query))
+        try:
+            with server.catalog.lock:
+                result = dispatch(method, segments, query, body,
+                                  self.headers)
+        except NotFound:
+            result = Response(404, 'not found')
+        except Response as response:
+            result = response
+        except Exception as e:
+            result = Response(500, str(e))
+        if method == 'GET' and result.status == 200:
+            body = result.body
+            if isinstance(body, unicode):
+                body = body.encode('utf-8')
+            result.etag = '"%s"' % hashlib.md5(body).hexdigest()
+            if self.headers.get('if-none-match') == result.etag:
+                result = Response(304)
+                result.etag = self.headers.get('if-none-match')
+        self.respond(result)
+
+    def respond(self, response):
+        body = response.body
+        if isinstance(body, unicode):
+            body = body.encode('utf-8')
+        self.send_response(response.status)
+        self.send_header('Content-Type', response.content_type)
+        if getattr(response, 'etag', None):
+            self.send_header('ETag', response.etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.handle_any('GET')
+
+    def do_POST(self):
+        self.handle_any('POST')
+
+    def do_PUT(self):
+        self.handle_any('PUT')
+
+    def do_DELETE(self):
+        self.handle_any('DELETE')
+
+
+class ThreadedHTTPServer(SocketServer.ThreadingMixIn,
+                         BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        # Clients that go away (timeouts, closed pools) are not errors here.
+        if isinstance(sys.exc_info()[1], socket.error):
+            return
+        BaseHTTPServer.HTTPServer.handle_error(self, request, client_address)
+
+
+class FakeGeoServer(object):
+    """
+    Fake GeoServer REST API on localhost.
+
+    Params:
+    - latency, seconds added to every request
+    - jitter, maximum random seconds added on top of latency
+    - error_rate, fraction of requests answered with a 503 error
+    - port, port to listen on; a free port is chosen when 0
+
+    """
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, port=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.catalog = Catalog()
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+        self.httpd = ThreadedHTTPServer(('127.0.0.1', port),
+                                        FakeGeoServerHandler)
+        self.httpd.fake = self
+        self.port = self.httpd.server_address[1]
+        self._thread = None
+
+    def count_request(self):
+        with self._count_lock:
+            self.request_count += 1
+
+    def start(self):
+        # A short poll interval makes stop() quick, for per-test servers.
+        self._thread = threading.Thread(target=self.httpd.serve_forever,
+                                        kwargs={'poll_interval': 0.05})
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def add_features(self, layer, features):
+        """Serve a list of GeoJSON features as layer ('ws:layer')."""
+        with self.catalog.lock:
+            self.catalog.features[layer] = list(features)
+
+    # Request dispatching.
+
+    def dispatch(self, method, segments, query, body, headers):
+        head, _ = _split_extension(segments[0])
+        if head in ('reload', 'reset') and method == 'POST':
+            raise Response(200)
+        if segments == ['about', 'version.json'] and method == 'GET':
+            raise _json({'about': {'resource': [
+                {'@name': 'GeoServer', 'Version': 'fake'}]}})
+        if head == 'workspaces':
+            return self.workspaces(method, segments[1:], query, body)
+        if head == 'layers':
+            return self.layers(method, segments[1:], body)
+        if head == 'styles':
+            return self.styles(method, segments[1:], query, body, headers)
+        if head == 'imports':
+            return self.imports(method, segments[1:], body)
+        raise NotFound()
+
+    def dispatch_gwc(self, method, segments, query, body, headers):
+        """
+        GeoWebCache endpoints. Seed tasks are reported as running for two
+        status requests and are done after that.
+
+        """
+        catalog = self.catalog
+        head, _ = _split_extension(segments[0])
+        if head == 'masstruncate' and method == 'POST':
+            raise Response(200)
+        if head == 'layers' and len(segments) == 2:
+            name, _ = _split_extension(segments[1])
+            if method == 'PUT':
+                root = ElementTree.fromstring(body.strip())
+                catalog.tile_layers[name] = {
+                    'enabled': root.findtext('enabled', 'true')}
+                raise Response(200)
+            if name not in catalog.tile_layers:
+                raise NotFound()
+            if method == 'GET':
+                raise Response(200, '<GeoServerLayer><name>%s</name>'
+                               '<enabled>%s</enabled></GeoServerLayer>' % (
+                                   name, catalog.tile_layers[name]['enabled']),
+                               'text/xml')
+            if method == 'DELETE':
+                del catalog.tile_layers[name]
+                raise Response(200)
+            raise Response(405)
+        if head == 'seed':
+            if len(segments) == 1:
+                layers = list(catalog.seed_tasks)
+            else:
+                layers = [_split_extension(segments[1])[0]]
+            if method == 'GET':
+                arrays = []
+                for layer in layers:
+                    tasks = catalog.seed_tasks.get(layer, [])
+                    for task in tasks:
+                        task['polls'] -= 1
+                        if task['polls'] > 0:
+                            arrays.append([2 - task['polls'], 2,
+                                           task['polls'], task['id'], 1])
+                    catalog.seed_tasks[layer] = [
+                        task for task in tasks if task['polls'] > 0]
+                raise _json({'long-array-array': arrays})
+            if method == 'POST' and 'kill_all' in body:
+                for layer in layers:
+                    catalog.seed_tasks.pop(layer, None)
+                raise Response(200)
+            if method == 'POST' and len(layers) == 1:
+                if layers[0] not in catalog.tile_layers:
+                    raise Response(400, "unknown layer %s" % layers[0])
+                json.loads(body)['seedRequest']
+                task_id = sum(len(tasks) for tasks in
+                              catalog.seed_tasks.values()) + 1
+                catalog.seed_tasks.setdefault(layers[0], []).append(
+                    {'id': task_id, 'polls': 2})
+                raise Response(200)
+            raise Response(405)
+        raise NotFound()
+
+    def dispatch_wfs(self, method, segments, query, body, headers):
+        """
+        WFS GetFeature with paging (startIndex and count) and
+        resultType=hits. Other filters are ignored.
+
+        """
+        query = dict((key.lower(), value) for key, value in query.items())
+        if method != 'GET' or query.get('request', '').lower() != 'getfeature':
+            raise Response(400, 'only GetFeature is supported')
+        layer = query.get('typenames') or query.get('typename')
+        if layer not in self.catalog.features:
+            raise Response(400, '<ows:ExceptionReport><ows:Exception '
+                           'exceptionCode="InvalidParameterValue"/>'
+                           '</ows:ExceptionReport>', 'application/xml')
+        features = self.catalog.features[layer]
+        if query.get('resulttype') == 'hits':
+            raise Response(200, '<wfs:FeatureCollection numberMatched="%d" '
+                           'numberReturned="0"/>' % len(features), 'text/xml')
+        start = int(query.get('startindex', 0))
+        end = len(features)
+        if 'count' in query:
+            end = min(end, start + int(query['count']))
+        page = features[start:end]
+        raise _json({'type': 'FeatureCollection', 'features': page,
+                     'totalFeatures': len(features),
+                     'numberMatched': len(features),
+                     'numberReturned': len(page)})
+
+    def workspaces(self, method, segments, query, body):
+        catalog = self.catalog
+        if not segments:
+            if method == 'GET':
+                raise _json(_names('workspaces', 'workspace',
+                                   catalog.workspaces))
+            if method == 'POST':
+                name = json.loads(body)['workspace']['name']
+                if name in catalog.workspaces:
+                    raise Response(409, "workspace '%s' exists" % name)
+                catalog.workspaces[name] = {'datastores': {}}
+                raise Response(201, name)
+            raise Response(405)
+        name, _ = _split_extension(segments[0])
+        workspace = catalog.workspaces.get(name)
+        if workspace is None:
+            raise NotFound()
+        if len(segments) > 1:
+            collection, _ = _split_extension(segments[1])
+            if collection == 'styles':
+                raise _json(_names('styles', 'style', []))
+            if collection != 'datastores':
+                raise NotFound()
+            return self.datastores(method, name, workspace, segments[2:],
+                                   query, body)
+        if method == 'GET':
+            raise _json({'workspace': {'name': name}})
+        if method == 'DELETE':
+            if workspace['datastores'] and query.get('recurse') != 'true':
+                raise Response(403, "workspace '%s' is not empty" % name)
+            for datastore in workspace['datastores'].values():
+                for feature_type in datastore['featuretypes']:
+                    catalog.layers.pop('%s:%s' % (name, feature_type), None)
+            del catalog.workspaces[name]
+            raise Response(200)
+        raise Response(405)
+
+    def datastores(self, method, workspace_name, workspace, segments, query,
+                   body):
+        datastores = workspace['datastores']
+        if not segments:
+            if method == 'GET':
+                raise _json(_names('dataStores', 'dataStore', datastores))
+            if method == 'POST':
+                content = json.loads(body)['dataStore']
+                name = content['name']
+                if name in datastores:
+                    raise Response(409, "datastore '%s' exists" % name)
+                datastores[name] = {
+                    'connectionParameters': content.get(
+                        'connectionParameters', {}),
+                    'featuretypes': {}}
+                raise Response(201, name)
+            raise Response(405)
+        name, _ = _split_extension(segments[0])
+        rest = segments[1:]
+        if rest and rest[0] in ('file.shp', 'external.shp') and \
+                method == 'PUT':
+            datastore = datastores.setdefault(
+                name, {'connectionParameters': {}, 'featuretypes': {}})
+            datastore['featuretypes'][name] = {'name': name,
+                                               'srs': 'EPSG:4326',
+                                               'size': len(body)}
+            self.catalog.layers['%s:%s' % (workspace_name, name)] = {
+                'defaultStyle': 'polygon'}
+            raise Response(201)
+        datastore = datastores.get(name)
+        if datastore is None:
+            raise NotFound()
+        if rest:
+            collection, _ = _split_extension(rest[0])
+            if collection != 'featuretypes':
+                raise NotFound()
+            return self.feature_types(method, workspace_name, datastore,
+                                      rest[1:], query, body)
+        if method == 'GET':
+            raise _json({'dataStore': {
+                'name': name,
+                'connectionParameters': datastore['connectionParameters']}})
+        if method == 'DELETE':
+            if datastore['featuretypes'] and query.get('recurse') != 'true':
+                raise Response(403, "datastore '%s' is not empty" % name)
+            for feature_type in datastore['featuretypes']:
+                self.catalog.layers.pop(
+                    '%s:%s' % (workspace_name, feature_type), None)
+            del datastores[name]
+            raise Response(200)
+        raise Response(405)
+
+    def feature_types(self, method, workspace_name, datastore, segments,
+                      query, body):
+        feature_types = datastore['featuretypes']
+        if not segments:
+            if method == 'GET':
+                raise _json(_names('featureTypes', 'featureType',
+                                   feature_types))
+            if method == 'POST':
+                feature_type = _feature_type_from_xml(body)
+                name = feature_type['name']
+                if name in feature_types:
+                    raise Response(500, "feature type '%s' exists" % name)
+                feature_types[name] = feature_type
+                self.catalog.layers['%s:%s' % (workspace_name, name)] = {
+                    'defaultStyle': 'polygon'}
+                raise Response(201, name)
+            raise Response(405)
+        name, _ = _split_extension(segments[0])
+        feature_type = feature_types.get(name)
+        if feature_type is None:
+            raise NotFound()
+        if method == 'GET':
+            content = {'name': name, 'srs': feature_type.get('srs'),
+                       'enabled': feature_type.get('enabled', True)}
+            if 'sql' in feature_type:
+                table = {'name': name, 'sql': feature_type['sql']}
+                table.update(feature_type.get('virtual_table') or {})
+                content['metadata'] = {'entry': [{
+                    '@key': 'JDBC_VIRTUAL_TABLE', 'virtualTable': table}]}
+            raise _json({'featureType': content})
+        if method == 'PUT':
+            update = _feature_type_from_xml(body)
+            for key in ('srs', 'sql', 'virtual_table'):
+                if update.get(key) is not None:
+                    feature_type[key] = update[key]
+            feature_type['enabled'] = update['enabled']
+            raise Response(200)
+        if method == 'DELETE':
+            layer = '%s:%s' % (workspace_name, name)
+            if layer in self.catalog.layers and \
+                    query.get('recurse') != 'true':
+                raise Response(403, "feature type '%s' has a layer" % name)
+            self.catalog.layers.pop(layer, None)
+            del feature_types[name]
+            raise Response(200)
+        raise Response(405)
+
+    def layers(self, method, segments, body):
+        layers = self.catalog.layers
+        if not segments:
+            if method == 'GET':
+                raise _json(_names('layers', 'layer', layers))
+            raise Response(405)
+        name, _ = _split_extension(segments[0])
+        layer = layers.get(name)
+        if layer is None:
+            raise NotFound()
+        if method == 'GET':
+            raise _json({'layer': {'name': name, 'defaultStyle': {
+                'name': layer['defaultStyle']}}})
+        if method == 'PUT':
+            content = json.loads(body)['layer']
+            if 'defaultStyle' in content:
+                layer['defaultStyle'] = content['defaultStyle']['name']
+            raise Response(200)
+        if method == 'DELETE':
+            del layers[name]
+            raise Response(200)
+        raise Response(405)
+
+    def styles(self, method, segments, query, body, headers):
+        styles = self.catalog.styles
+        content_type = headers.get('content-type', '')
+        if not segments:
+            if method == 'GET':
+                raise _json(_names('styles', 'style', styles))
+            if method == 'POST':
+                if 'sld' in content_type:
+                    name = query.get('name')
+                    sld = body
+                else:
+                    name = json.loads(body)['style']['name']
+                    sld = ''
+                if not name:
+                    raise Response(400, "style name missing")
+                if name in styles:
+                    raise Response(403, "style '%s' exists" % name)
+                styles[name] = sld
+                raise Response(201, name)
+            raise Response(405)
+        name, extension = _split_extension(segments[0])
+        if name not in styles:
+            raise NotFound()
+        if method == 'GET':
+            if extension == '.sld':
+                raise Response(200, styles[name],
+                               'application/vnd.ogc.sld+xml')
+            raise _json({'style': {'name': name,
+                                   'filename': '%s.sld' % name}})
+        if method == 'PUT':
+            styles[name] = body
+            raise Response(200)
+        if method == 'DELETE':
+            del styles[name]
+            raise Response(200)
+        raise Response(405)
+
+    def imports(self, method, segments, body):
+        """
+        Importer endpoints. A running import is reported as running for one
+        status request and is complete after that; completing it publishes
+        a layer for every task.
+
+        """
+        imports = self.catalog.imports
+        if not segments:
+            if method != 'POST':
+                raise Response(405)
+            content = json.loads(body)['import']
+            workspace = content['targetWorkspace']['workspace']['name']
+            if workspace not in self.catalog.workspaces:
+                raise Response(400, "unknown workspace '%s'" % workspace)
+            import_id = len(imports) + 1
+            store = content.get('targetStore', {}).get('dataStore', {})
+            imports[import_id] = {'id': import_id, 'state': 'PENDING',
+                                  'workspace': workspace,
+                                  'datastore': store.get('name'),
+                                  'tasks': [], 'polls': 0}
+            data = content.get('data')
+            if data is not None:
+                self.add_import_task(imports[import_id], data.get(
+                    'file') or data['location'].rstrip('/'))
+            raise _json({'import': self.import_json(imports[import_id])},
+                        201)
+        try:
+            import_ = imports[int(segments[0])]
+        except (KeyError, ValueError):
+            raise NotFound()
+        rest = segments[1:]
+        if not rest:
+            if method == 'GET':
+                if import_['state'] == 'RUNNING':
+                    import_['polls'] -= 1
+                    if import_['polls'] <= 0:
+                        self.complete_import(import_)
+                raise _json({'import': self.import_json(import_)})
+            if method == 'POST':
+                if import_['state'] != 'PENDING':
+                    raise Response(400, "import already ran")
+                import_['state'] = 'RUNNING'
+                import_['polls'] = 2
+                for task in import_['tasks']:
+                    task['state'] = 'RUNNING'
+                raise Response(204)
+            if method == 'DELETE':
+                del imports[import_['id']]
+                raise Response(204)
+            raise Response(405)
+        if rest[0] != 'tasks':
+            raise NotFound()
+        if len(rest) == 1:
+            if method == 'GET':
+                raise _json({'tasks': import_['tasks']})
+            if method == 'POST':
+                path = urlparse.parse_qs(body)['url'][0]
+                task = self.add_import_task(import_, path[len('file://'):])
+                raise _json({'task': task}, 201)
+            raise Response(405)
+        if len(rest) == 2 and method == 'PUT':
+            task = self.add_import_task(import_, rest[1])
+            task['data']['size'] = len(body)
+            raise _json({'task': task}, 201)
+        tasks = [task for task in import_['tasks']
+                 if str(task['id']) == rest[1]]
+        if not tasks:
+            raise NotFound()
+        if rest[2:] == ['progress'] and method == 'GET':
+            if tasks[0]['state'] != 'RUNNING':
+                raise _json({'state': tasks[0]['state']})
+            raise _json({'progress': 2 - import_['polls'], 'total': 2,
+                         'state': 'RUNNING'})
+        raise NotFound()
+
+    def add_import_task(self, import_, path):
+        task = {'id': len(import_['tasks']), 'state': 'READY',
+                'data': {'type': 'file', 'file': path.split('/')[-1]}}
+        import_['tasks'].append(task)
+        return task
+
+    def import_json(self, import_):
+        return {'id': import_['id'], 'state': import_['state'],
+                'targetWorkspace': {'workspace': {
+                    'name': import_['workspace']}},
+                'tasks': [{'id': task['id'], 'state': task['state']}
+                          for task in import_['tasks']]}
+
+    def complete_import(self, import_):
+        workspace = import_['workspace']
+        datastores = self.catalog.workspaces[workspace]['datastores']
+        for task in import_['tasks']:
+            name = task['data']['file'].rsplit('.', 1)[0]
+            datastore = datastores.setdefault(
+                import_['datastore'] or name,
+                {'connectionParameters': {}, 'featuretypes': {}})
+            datastore['featuretypes'][name] = {'name': name,
+                                               'srs': 'EPSG:4326'}
+            self.catalog.layers['%s:%s' % (workspace, name)] = {
+                'defaultStyle': 'polygon'}
+            task['state'] = 'COMPLETE'
+        import_['state'] = 'COMPLETE'
@@ -0,0 +1,360 @@
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger('geoserverlib.upload')
+
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+DEFAULT_MAX_BYTES_IN_FLIGHT = 256 * 1024 * 1024
+
+SHAPEFILE_EXTENSIONS = ('.shp', '.shx', '.dbf', '.prj', '.cpg')
+
+# Largest size that fits a zip entry without ZIP64 extensions.
+ZIP_MAX_SIZE = 0xffffffff
+
+
+class ProgressFile(object):
+    """
+    File-like request body that is read in chunks and reports progress.
+
+    Only one chunk is held in memory at a time, so arbitrarily large files
+    can be uploaded. The length is known up front, so requests sends a
+    Content-Length header instead of using chunked transfer encoding.
+
+    Params:
+    - fileobj, object with a read method (a file or an mmap)
+    - total, number of bytes that will be read from fileobj
+    - progress, optional callable, called after every chunk as
+      progress(bytes_sent, total, bytes_per_second)
+    - chunk_size, number of bytes read per chunk
+
+    """
+    def __init__(self, fileobj, total, progress=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE):
+        self.fileobj = fileobj
+        self.total = total
+        self.progress = progress
+        self.chunk_size = chunk_size
+        self.bytes_sent = 0
+        self.start = None
+
+    def __len__(self):
+        return self.total - self.bytes_sent
+
+    @property
+    def elapsed(self):
+        if self.start is None:
+            return 0.0
+        return time.time() - self.start
+
+    @property
+    def throughput(self):
+        """Average number of bytes per second sent so far."""
+        elapsed = self.elapsed
+        if not elapsed:
+            return 0.0
+        return self.bytes_sent / elapsed
+
+    def read(self, size=-1):
+        # The requested size is ignored in favour of chunk_size; callers
+        # (httplib) send whatever is returned.
+        if self.start is None:
+            self.start = time.time()
+        chunk = self.fileobj.read(self.chunk_size)
+        if chunk:
+            self.bytes_sent += len(chunk)
+            if self.progress is not None:
+                self.progress(self.bytes_sent, self.total, self.throughput)
+        return chunk
+
+    def __iter__(self):
+        while True:
+            chunk = self.read()
+            if not chunk:
+                break
+            yield chunk
+
+
+class open_upload(object):
+    """
+    Context manager opening a file as a ProgressFile, optionally through a
+    read-only mmap so the pages are managed by the OS page cache.
+
+    """
+    def __init__(self, path, progress=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 use_mmap=False):
+        self.path = path
+        self.progress = progress
+        self.chunk_size = chunk_size
+        self.use_mmap = use_mmap
+        self._file = None
+        self._mmap = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'rb')
+        total = os.fstat(self._file.fileno()).st_size
+        source = self._file
+        # An empty file cannot be mapped.
+        if self.use_mmap and total:
+            self._mmap = mmap.mmap(self._file.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+            source = self._mmap
+        return ProgressFile(source, total, progress=self.progress,
+                            chunk_size=self.chunk_size)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+
+def report_progress(chunks, progress=None, total=None):
+    """
+    Yield the chunks of an iterable, calling
+    progress(bytes_sent, total, bytes_per_second) after each chunk.
+
+    """
+    start = time.time()
+    bytes_sent = 0
+    for chunk in chunks:
+        yield chunk
+        bytes_sent += len(chunk)
+        if progress is not None:
+            elapsed = time.time() - start
+            throughput = bytes_sent / elapsed if elapsed else 0.0
+            progress(bytes_sent, total, throughput)
+
+
+def shapefile_members(path):
+    """
+    Return a list of (arcname, path) tuples for the components (.shp,
+    .shx, .dbf, .prj, .cpg) of the shapefile at path.
+
+    """
+    directory, filename = os.path.split(os.path.abspath(path))
+    base = os.path.splitext(filename)[0]
+    members = []
+    for candidate in sorted(os.listdir(directory)):
+        name, extension = os.path.splitext(candidate)
+        if name == base and extension.lower() in SHAPEFILE_EXTENSIONS:
+            members.append((candidate, os.path.join(directory, candidate)))
+    if not any(name.lower().endswith('.shp') for name, _ in members):
+        raise IOError("no shapefile found at '%s'" % path)
+    return members
+
+
+def _dos_datetime(timestamp):
+    t = time.localtime(timestamp)
+    dos_date = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    return dos_time, dos_date
+
+
+def iter_zip(members, compresslevel=6, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Build a zip archive on the fly and yield it in chunks.
+
+    Members are (arcname, source) tuples where source is a path or a
+    file-like object. Sources are read chunk by chunk, so neither they nor
+    the archive are held in memory as a whole, and no temporary file is
+    needed.
+
+    Entries are always deflated and their sizes and checksums are written
+    in data descriptors after the data; Java's ZipInputStream (used by
+    GeoServer) only accepts data descriptors for deflated entries. Entries
+    and archives larger than 4 GB (ZIP64) are not supported.
+
+    """
+    offset = 0
+    central_directory = []
+    dos_time, dos_date = _dos_datetime(time.time())
+    for arcname, source in members:
+        # Bit 3: sizes and crc in data descriptor.
+        flags = 0x08
+        if isinstance(arcname, unicode):
+            arcname = arcname.encode('utf-8')
+            flags |= 0x800
+        header_offset = offset
+        header = struct.pack(
+            '<IHHHHHIIIHH', 0x04034b50, 20, flags, zlib.DEFLATED,
+            dos_time, dos_date, 0, 0, 0, len(arcname), 0) + arcname
+        yield header
+        offset += len(header)
+
+        crc = 0
+        size = 0
+        compressed_size = 0
+        compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+        fileobj = open(source, 'rb') if isinstance(source, basestring) \
+            else source
+        try:
+            while True:
+                data = fileobj.read(chunk_size)
+                if not data:
+                    break
+                crc = zlib.crc32(data, crc)
+                size += len(data)
+                compressed = compressor.compress(data)
+                if compressed:
+                    compressed_size += len(compressed)
+                    yield compressed
+        finally:
+            if fileobj is not source:
+                fileobj.close()
+        compressed = compressor.flush()
+        compressed_size += len(compressed)
+        if compressed:
+            yield compressed
+        if size > ZIP_MAX_SIZE or compressed_size > ZIP_MAX_SIZE:
+            raise IOError("zip entry '%s' is larger than 4 GB" % arcname)
+        crc &= 0xffffffff
+        descriptor = struct.pack('<IIII', 0x08074b50, crc, compressed_size,
+                                 size)
+        yield descriptor
+        offset += compressed_size + len(descriptor)
+        central_directory.append(struct.pack(
+            '<IHHHHHHIIIHHHHHII', 0x02014b50, 20, 20, flags, zlib.DEFLATED,
+            dos_time, dos_date, crc, compressed_size, size, len(arcname),
+            0, 0, 0, 0, 0o644 << 16, header_offset) + arcname)
+
+    directory = ''.join(central_directory)
+    if offset > ZIP_MAX_SIZE:
+        raise IOError("zip archive is larger than 4 GB")
+    yield directory
+    yield struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, len(central_directory),
+                      len(central_directory), len(directory), offset, 0)
+
+
+class ByteBudget(object):
+    """
+    Limits the number of bytes in flight. acquire blocks until enough of the
+    budget is available; a request larger than the whole budget is allowed
+    once nothing else is in flight.
+
+    """
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, size):
+        size = min(size, self.limit)
+        with self._condition:
+            while self.in_flight and self.in_flight + size > self.limit:
+                self._condition.wait()
+            self.in_flight += size
+        return size
+
+    def release(self, size):
+        with self._condition:
+            self.in_flight -= size
+            self._condition.notify_all()
+
+
+class IngestResult(object):
+    """Outcome of one shapefile upload of a batch ingest."""
+    def __init__(self, workspace, datastore, path, size):
+        self.workspace = workspace
+        self.datastore = datastore
+        self.path = path
+        self.size = size
+        self.status = None
+        self.status_code = None
+        self.error = None
+        self.duration = 0.0
+
+    @property
+    def ok(self):
+        return self.status in ('created', 'exists')
+
+    @property
+    def throughput(self):
+        """Bytes per second of the upload."""
+        if not self.duration:
+            return 0.0
+        return self.size / self.duration
+
+    def __repr__(self):
+        return '<IngestResult %s:%s %s %.2fs>' % (
+            self.workspace, self.datastore, self.status, self.duration)
+
+
+def _ingest(client, result, budget, reserved, upload_kwargs):
+    start = time.time()
+    try:
+        response = client.upload_shapefile(result.workspace, result.datastore,
+                                           result.path, **upload_kwargs)
+        if response is False:
+            result.status = 'exists'
+        else:
+            result.status_code = response.status_code
+            if response.ok:
+                result.status = 'created'
+            else:
+                result.status = 'failed'
+                result.error = response.text
+    except Exception as e:
+        logger.exception("upload of '%s' failed", result.path)
+        result.status = 'error'
+        result.error = e
+    finally:
+        result.duration = time.time() - start
+        budget.release(reserved)
+    return result
+
+
+def ingest_shapefiles(client, jobs, max_workers=4,
+                      max_bytes_in_flight=DEFAULT_MAX_BYTES_IN_FLIGHT,
+                      **upload_kwargs):
+    """
+    Upload many zipped shapefiles in parallel.
+
+    Jobs are (workspace, datastore, path) tuples. At most max_workers
+    uploads run at the same time and no new upload is started while the
+    sizes of the running uploads exceed max_bytes_in_flight. Other keyword
+    arguments are passed to client.upload_shapefile.
+
+    Returns a list of IngestResult in the order of the jobs.
+
+    """
+    budget = ByteBudget(max_bytes_in_flight)
+    results = []
+    futures = []
+    start = time.time()
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for workspace, datastore, path in jobs:
+            try:
+                size = os.path.getsize(path)
+            except OSError as e:
+                logger.error("can not upload '%s': %s" % (path, e))
+                result = IngestResult(workspace, datastore, path, 0)
+                result.status = 'error'
+                result.error = e
+                results.append(result)
+                continue
+            result = IngestResult(workspace, datastore, path, size)
+            results.append(result)
+            # Block submitting until the budget allows another upload.
+            reserved = budget.acquire(size)
+            futures.append(executor.submit(_ingest, client, result, budget,
+                                           reserved, upload_kwargs))
+        for future in futures:
+            future.result()
+    finally:
+        executor.shutdown(wait=True)
+    duration = time.time() - start
+    total = sum(result.size for result in results)
+    logger.info("ingested %d shapefiles (%d bytes) in %.2fs, %d failed" % (
+        len(results), total, duration,
+        len([result for result in results if not result.ok])))
+    return results
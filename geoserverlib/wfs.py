@@ -0,0 +1,262 @@
+"""
+Reading the features of published layers with WFS GetFeature.
+
+A FeatureReader pages through a layer with startIndex and count. It fetches
+several pages at the same time but yields their features in order, so
+layers with millions of features can be read with bounded memory::
+
+    reader = FeatureReader(client, 'ws:layer', page_size=5000,
+                           max_workers=4, srs='EPSG:4326')
+    for feature in reader:
+        print feature['id'], feature['properties']
+
+Pages are downloaded as GeoJSON into spooled temporary files. These stay in
+memory up to spool_size bytes and go to disk beyond that. Pages are parsed
+one at a time. When ijson is installed, features are parsed one by one;
+otherwise one page at a time is loaded with the json module.
+
+"""
+import json
+import logging
+import re
+import tempfile
+import threading
+
+from collections import deque
+
+from concurrent.futures import ThreadPoolExecutor
+
+from geoserverlib.client import GeoserverClientException
+from geoserverlib.client import view_params
+
+
+logger = logging.getLogger('geoserverlib.wfs')
+
+WFS_PATH = '/geoserver/wfs'
+
+WFS_VERSION = '2.0.0'
+
+OUTPUT_FORMAT = 'application/json'
+
+# Bytes of a downloaded page kept in memory before spooling it to disk.
+DEFAULT_SPOOL_SIZE = 8 * 1024 * 1024
+
+CHUNK_SIZE = 64 * 1024
+
+NUMBER_MATCHED = re.compile(r'numberMatched="(\d+)"')
+
+
+def iter_features(fileobj):
+    """
+    Yield the features of a GeoJSON FeatureCollection read from a file
+    object, incrementally if ijson is installed.
+
+    """
+    try:
+        import ijson
+    except ImportError:
+        for feature in json.load(fileobj).get('features') or []:
+            yield feature
+        return
+    try:
+        items = ijson.items(fileobj, 'features.item', use_float=True)
+    except TypeError:
+        # ijson before 3.1 parses all numbers as Decimal.
+        items = ijson.items(fileobj, 'features.item')
+    for feature in items:
+        yield feature
+
+
+def _discard_page(future):
+    """Close the spool of a page that was downloaded but not read."""
+    if future.exception() is None:
+        spool, _ = future.result()
+        if spool is not None:
+            spool.close()
+
+
+class FeatureReader(object):
+    """
+    Iterable over the features of a layer, read with WFS GetFeature
+    requests through a GeoserverClient, so its session, limiter, retry
+    policy and hooks apply.
+
+    Params:
+    - layer, the qualified name of the layer ('ws:layer')
+    - page_size, number of features per request
+    - max_workers, number of pages fetched at the same time
+    - srs, e.g. 'EPSG:4326'; default the srs of the layer
+    - bbox, (minx, miny, maxx, maxy) in the axis order of srs
+    - cql_filter, an ECQL filter; can not be combined with bbox
+    - properties, names of the attributes to return
+    - sort_by, e.g. 'id' or 'id DESC'. Paging needs a stable order, which
+      GeoServer only guarantees by itself for tables with a primary key.
+    - parameters, dict of SQL view parameter values
+    - max_features, stop after this many features
+    - spool_size, bytes of a page kept in memory before spooling it to disk
+
+    Without max_features the number of features is unknown, so up to
+    max_workers - 1 requests past the last page return no features. Pass
+    max_features=reader.number_matched() to avoid that.
+
+    Counters: pages, features and bytes (downloaded).
+
+    """
+    def __init__(self, client, layer, page_size=1000, max_workers=4,
+                 srs=None, bbox=None, cql_filter=None, properties=None,
+                 sort_by=None, parameters=None, max_features=None,
+                 spool_size=DEFAULT_SPOOL_SIZE):
+        if bbox is not None and cql_filter is not None:
+            raise GeoserverClientException(
+                "bbox and cql_filter can not be combined, use BBOX() in the "
+                "filter instead")
+        self.client = client
+        self.layer = layer
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.srs = srs
+        self.bbox = bbox
+        self.cql_filter = cql_filter
+        self.properties = properties
+        self.sort_by = sort_by
+        self.parameters = parameters
+        self.max_features = max_features
+        self.spool_size = spool_size
+        self.pages = 0
+        self.features = 0
+        self.bytes = 0
+
+    def params(self, start_index=None, count=None, hits=False):
+        """Query parameters of a GetFeature request."""
+        params = {'service': 'WFS', 'version': WFS_VERSION,
+                  'request': 'GetFeature', 'typeNames': self.layer}
+        if hits:
+            params['resultType'] = 'hits'
+        else:
+            params['outputFormat'] = OUTPUT_FORMAT
+        if start_index is not None:
+            params['startIndex'] = start_index
+        if count is not None:
+            params['count'] = count
+        if self.srs is not None:
+            params['srsName'] = self.srs
+        if self.bbox is not None:
+            bbox = ','.join(repr(float(value)) for value in self.bbox)
+            if self.srs is not None:
+                bbox += ',' + self.srs
+            params['bbox'] = bbox
+        if self.cql_filter is not None:
+            params['CQL_FILTER'] = self.cql_filter
+        if self.properties:
+            params['propertyName'] = ','.join(self.properties)
+        if self.sort_by is not None:
+            params['sortBy'] = self.sort_by
+        if self.parameters:
+            params['viewparams'] = view_params(self.parameters)
+        return params
+
+    def _check(self, response, what):
+        content_type = response.headers.get('content-type', '')
+        if not response.ok or (what == 'GetFeature' and
+                               'json' not in content_type):
+            # GeoServer may report WFS errors as XML with status 200.
+            raise GeoserverClientException("%s %s failed: %s (%s)" % (
+                what, self.layer, response.status_code, response.text))
+
+    def number_matched(self):
+        """Number of features of the layer that match the filters."""
+        response = self.client.request('GET', WFS_PATH,
+                                       params=self.params(hits=True))
+        self._check(response, 'GetFeature hits')
+        match = NUMBER_MATCHED.search(response.text)
+        if match is None:
+            raise GeoserverClientException(
+                "no numberMatched in GetFeature hits of %s" % self.layer)
+        return int(match.group(1))
+
+    def fetch_page(self, start_index, count, stop=None):
+        """
+        Download a page into a spooled temporary file. Returns the file,
+        positioned at the start, and its size, or (None, 0) when stop
+        (an Event) is set during the download.
+
+        """
+        response = self.client.request(
+            'GET', WFS_PATH, params=self.params(start_index, count),
+            stream=True)
+        try:
+            self._check(response, 'GetFeature')
+            spool = tempfile.SpooledTemporaryFile(max_size=self.spool_size)
+            size = 0
+            for chunk in response.iter_content(CHUNK_SIZE):
+                if stop is not None and stop.is_set():
+                    spool.close()
+                    return None, 0
+                spool.write(chunk)
+                size += len(chunk)
+        finally:
+            response.close()
+        spool.seek(0)
+        return spool, size
+
+    def _page_sizes(self):
+        """Yield (start_index, count) of the pages to request."""
+        start_index = 0
+        while self.max_features is None or start_index < self.max_features:
+            count = self.page_size
+            if self.max_features is not None:
+                count = min(count, self.max_features - start_index)
+            yield start_index, count
+            start_index += count
+
+    def __iter__(self):
+        pages = self._page_sizes()
+        pending = deque()
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while True:
+                while len(pending) < self.max_workers:
+                    page = next(pages, None)
+                    if page is None:
+                        break
+                    pending.append((page[1], executor.submit(
+                        self.fetch_page, page[0], page[1], stop)))
+                if not pending:
+                    return
+                count, future = pending.popleft()
+                spool, size = future.result()
+                returned = 0
+                try:
+                    for feature in iter_features(spool):
+                        returned += 1
+                        self.features += 1
+                        yield feature
+                finally:
+                    spool.close()
+                self.pages += 1
+                self.bytes += size
+                logger.debug("read page %d of %s, %d features" % (
+                    self.pages, self.layer, returned))
+                if returned < count:
+                    # A short page is the last one.
+                    return
+        finally:
+            stop.set()
+            for _, future in pending:
+                if not future.cancel():
+                    future.add_done_callback(_discard_page)
+            executor.shutdown(wait=False)
+
+    def __repr__(self):
+        return '<FeatureReader %s: %d features in %d pages>' % (
+            self.layer, self.features, self.pages)
+
+
+def read_features(client, layer, **kwargs):
+    """
+    Yield the features of a layer as GeoJSON dicts; keyword arguments are
+    passed to FeatureReader.
+
+    """
+    return iter(FeatureReader(client, layer, **kwargs))
@@ -10,7 +10,8 @@ long_description = '\n\n'.join([
 
 install_requires = [
     'setuptools',
-    'requests',
+    'requests >= 2.4',
+    'futures',
     ],
 
 tests_require = [
@@ -0,0 +1,45 @@
+import logging
+import unittest
+
+from geoserverlib.client import GeoserverClient
+from geoserverlib.testing import FakeGeoServer
+
+
+# The code under test logs failures it handles; keep test output clean.
+logging.getLogger('geoserverlib').addHandler(logging.NullHandler())
+
+
+SLD = '<StyledLayerDescriptor version="1.0.0"><Name>%s</Name>' \
+    '</StyledLayerDescriptor>'
+
+
+class FakeGeoServerTestCase(unittest.TestCase):
+    """Runs every test against a fresh FakeGeoServer."""
+    client_kwargs = {}
+
+    def setUp(self):
+        self.server = FakeGeoServer().start()
+        self.clients = []
+        self.client = self.make_client(**self.client_kwargs)
+
+    def tearDown(self):
+        for client in self.clients:
+            client.close()
+        self.server.stop()
+
+    def make_client(self, server=None, **kwargs):
+        server = server or self.server
+        client = GeoserverClient('127.0.0.1', server.port, 'admin',
+                                 'geoserver', **kwargs)
+        self.clients.append(client)
+        return client
+
+    def create_layer(self, client=None, workspace='ws', datastore='ds',
+                     view='v'):
+        """Create a workspace, datastore and feature type (and layer)."""
+        client = client or self.client
+        client.create_workspace(workspace)
+        client.create_datastore(workspace, datastore, {'dbtype': 'postgis'})
+        response = client.create_feature_type(workspace, datastore, view,
+                                              'SELECT * FROM %s' % view)
+        self.assertTrue(response.ok)
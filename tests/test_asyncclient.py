@@ -0,0 +1,38 @@
+from geoserverlib.asyncclient import AsyncGeoserverClient
+from tests.base import FakeGeoServerTestCase
+
+
+class AsyncGeoserverClientTest(FakeGeoServerTestCase):
+    def make_async_client(self, **kwargs):
+        client = AsyncGeoserverClient('127.0.0.1', self.server.port, 'admin',
+                                      'geoserver', **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def test_round_trip(self):
+        client = self.make_async_client(max_workers=2)
+        self.assertFalse(client.workspace_exists('ws').result())
+        self.assertTrue(client.create_workspace('ws').result().ok)
+        self.assertTrue(client.workspace_exists('ws').result())
+        self.assertEqual(self.client.list_workspaces(), ['ws'])
+
+    def test_many_calls(self):
+        self.server.latency = 0.01
+        client = self.make_async_client(max_workers=4)
+        futures = [client.create_workspace('ws_%d' % i) for i in range(10)]
+        self.assertTrue(all(future.result().ok for future in futures))
+        self.assertEqual(len(self.client.list_workspaces()), 10)
+
+    def test_wraps_a_client(self):
+        self.client.create_workspace('ws')
+        with AsyncGeoserverClient(client=self.make_client()) as client:
+            self.assertEqual(client.list_workspaces().result(), ['ws'])
+
+    def test_coalesce(self):
+        self.server.latency = 0.1
+        client = self.make_async_client(coalesce=True)
+        first = client.list_workspaces()
+        second = client.list_workspaces()
+        self.assertTrue(first is second)
+        self.assertEqual(first.result(), [])
+        self.assertEqual(self.server.request_count, 1)
@@ -0,0 +1,220 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from geoserverlib.cache import CatalogCache
+from geoserverlib.cache import CatalogIndex
+from geoserverlib.httpcache import ResponseCache
+from tests.base import FakeGeoServerTestCase
+
+
+class CatalogIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = CatalogIndex()
+        self.index.set_listing(('workspaces',), ['ws'])
+        self.index.set_listing(('workspaces', 'ws', 'datastores'), ['ds'])
+
+    def test_exists(self):
+        self.assertTrue(self.index.exists(('workspaces', 'ws')))
+        self.assertFalse(self.index.exists(('workspaces', 'other')))
+        self.assertTrue(self.index.exists(
+            ('workspaces', 'ws', 'datastores', 'ds')))
+        # Not in a listed workspace, so it can't exist either.
+        self.assertFalse(self.index.exists(
+            ('workspaces', 'other', 'datastores', 'ds')))
+        self.assertEqual(self.index.exists(('styles', 'style')), None)
+
+    def test_add_and_discard(self):
+        self.index.add(('workspaces', 'new'))
+        self.assertTrue(self.index.exists(('workspaces', 'new')))
+        self.index.discard(('workspaces', 'ws'))
+        self.assertFalse(self.index.exists(('workspaces', 'ws')))
+        self.assertEqual(
+            self.index.listing(('workspaces', 'ws', 'datastores')), None)
+
+    def test_forget_listing(self):
+        self.index.forget_listing(('workspaces',))
+        self.assertEqual(self.index.exists(('workspaces', 'ws')), None)
+
+
+class CatalogCacheTest(unittest.TestCase):
+    def test_invalidate_recursively(self):
+        cache = CatalogCache()
+        cache.set(('workspaces', 'ws'), True)
+        cache.set(('workspaces', 'ws', 'datastores', 'ds'), True)
+        cache.set(('workspaces', 'other'), True)
+        cache.invalidate(('workspaces', 'ws'), recurse=True)
+        self.assertEqual(cache.get(('workspaces', 'ws')), None)
+        self.assertEqual(
+            cache.get(('workspaces', 'ws', 'datastores', 'ds')), None)
+        self.assertTrue(cache.get(('workspaces', 'other')))
+
+    def test_lru(self):
+        cache = CatalogCache(max_size=2)
+        cache.set(('styles', 'a'), True)
+        cache.set(('styles', 'b'), True)
+        cache.get(('styles', 'a'))
+        cache.set(('styles', 'c'), True)
+        self.assertEqual(cache.get(('styles', 'b')), None)
+        self.assertTrue(cache.get(('styles', 'a')))
+
+
+class ExistenceCacheTest(FakeGeoServerTestCase):
+    def setUp(self):
+        self.client_kwargs = {'catalog_cache': CatalogCache()}
+        super(ExistenceCacheTest, self).setUp()
+
+    def test_checks_are_cached(self):
+        self.assertFalse(self.client.workspace_exists('ws'))
+        self.client.create_workspace('ws')
+        count = self.server.request_count
+        self.assertTrue(self.client.workspace_exists('ws'))
+        self.assertFalse(self.client.datastore_exists('ws', 'ds'))
+        self.assertFalse(self.client.datastore_exists('ws', 'ds'))
+        self.assertEqual(self.server.request_count, count + 1)
+
+    def assert_layer_forgotten(self, delete):
+        self.create_layer()
+        self.assertTrue(self.client.layer_exists('ws:v'))
+        self.assertTrue(delete().ok)
+        self.assertFalse(self.client.layer_exists('ws:v'))
+
+    def test_delete_workspace_forgets_layers(self):
+        self.assert_layer_forgotten(
+            lambda: self.client.delete_workspace('ws', recurse=True))
+
+    def test_delete_datastore_forgets_layers(self):
+        self.assert_layer_forgotten(
+            lambda: self.client.delete_datastore('ws', 'ds', recurse=True))
+
+    def test_delete_feature_type_forgets_layer(self):
+        self.assert_layer_forgotten(
+            lambda: self.client.delete_feature_type('ws', 'ds', 'v',
+                                                    recurse=True))
+
+
+class PrefetchTest(FakeGeoServerTestCase):
+    def test_answers_from_listings(self):
+        self.create_layer()
+        with self.client.prefetched():
+            count = self.server.request_count
+            self.assertTrue(self.client.workspace_exists('ws'))
+            self.assertTrue(self.client.datastore_exists('ws', 'ds'))
+            self.assertTrue(self.client.feature_type_exists('ws', 'ds', 'v'))
+            self.assertTrue(self.client.layer_exists('ws:v'))
+            self.assertFalse(self.client.workspace_exists('other'))
+            self.assertEqual(self.server.request_count, count)
+        self.assertEqual(self.client.catalog_index, None)
+
+    def test_kept_up_to_date(self):
+        with self.client.prefetched():
+            self.client.create_workspace('ws')
+            self.assertTrue(self.client.workspace_exists('ws'))
+            self.client.delete_workspace('ws')
+            self.assertFalse(self.client.workspace_exists('ws'))
+
+    def assert_layer_forgotten(self, delete):
+        self.create_layer()
+        with self.client.prefetched():
+            self.assertTrue(self.client.layer_exists('ws:v'))
+            self.assertTrue(delete().ok)
+            self.assertFalse(self.client.layer_exists('ws:v'))
+
+    def test_delete_workspace_forgets_layers(self):
+        self.assert_layer_forgotten(
+            lambda: self.client.delete_workspace('ws', recurse=True))
+
+    def test_delete_datastore_forgets_layers(self):
+        self.assert_layer_forgotten(
+            lambda: self.client.delete_datastore('ws', 'ds', recurse=True))
+
+
+class ResponseCacheTest(FakeGeoServerTestCase):
+    def setUp(self):
+        self.cache = ResponseCache(max_age=60)
+        self.client_kwargs = {'response_cache': self.cache}
+        super(ResponseCacheTest, self).setUp()
+
+    def test_fresh_responses_are_reused(self):
+        self.client.list_workspaces()
+        count = self.server.request_count
+        self.client.list_workspaces()
+        self.assertEqual(self.server.request_count, count)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_revalidates_without_max_age(self):
+        cache = ResponseCache()
+        client = self.make_client(response_cache=cache)
+        client.create_workspace('ws')
+        self.assertEqual(client.list_workspaces(), ['ws'])
+        self.assertEqual(client.list_workspaces(), ['ws'])
+        self.assertEqual(cache.revalidations, 1)
+        self.assertEqual(cache.hits, 1)
+
+    def test_writes_invalidate_their_collection(self):
+        self.assertEqual(self.client.list_workspaces(), [])
+        self.client.create_workspace('ws')
+        self.assertEqual(self.client.list_workspaces(), ['ws'])
+
+    def test_feature_types_invalidate_layers(self):
+        self.client.create_workspace('ws')
+        self.client.create_datastore('ws', 'ds', {})
+        self.assertEqual(self.client.list_layers(), [])
+        self.client.create_feature_type('ws', 'ds', 'v', 'SELECT 1')
+        self.assertEqual(self.client.list_layers(), ['ws:v'])
+
+    def test_recursive_delete_invalidates_layers(self):
+        self.create_layer()
+        self.assertNotEqual(self.client.get_layer('ws:v'), None)
+        self.client.delete_workspace('ws', recurse=True)
+        self.assertEqual(self.client.get_layer('ws:v'), None)
+        self.assertEqual(self.client.list_layers(), [])
+
+
+class DiskCacheTest(FakeGeoServerTestCase):
+    def setUp(self):
+        super(DiskCacheTest, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.client.create_workspace('ws')
+        self.client.create_workspace('other')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(DiskCacheTest, self).tearDown()
+
+    def fill(self, cache):
+        client = self.make_client(response_cache=cache)
+        client.list_workspaces()
+        client.list_datastores('ws')
+        client.list_datastores('other')
+        return client
+
+    def files(self):
+        return len([filename for filename in os.listdir(self.directory)
+                    if filename.endswith('.json')])
+
+    def test_survives_restarts(self):
+        self.fill(ResponseCache(directory=self.directory))
+        cache = ResponseCache(directory=self.directory)
+        client = self.make_client(response_cache=cache)
+        self.assertEqual(cache.stats()['disk_size'], 3)
+        self.assertEqual(client.list_workspaces(), ['other', 'ws'])
+        self.assertEqual(cache.revalidations, 1)
+
+    def test_invalidate_prefix(self):
+        cache = ResponseCache(directory=self.directory)
+        client = self.fill(cache)
+        cache.invalidate_prefix(client._cache_key(
+            client.base_url + '/geoserver/rest/workspaces/ws/'))
+        self.assertEqual(self.files(), 2)
+        cache = ResponseCache(directory=self.directory)
+        self.assertEqual(cache.stats()['disk_size'], 2)
+
+    def test_max_disk_entries(self):
+        cache = ResponseCache(directory=self.directory, max_disk_entries=2)
+        self.fill(cache)
+        self.assertEqual(self.files(), 2)
+        self.assertEqual(cache.stats()['disk_size'], 2)
+        cache = ResponseCache(directory=self.directory, max_disk_entries=1)
+        self.assertEqual(self.files(), 1)
@@ -0,0 +1,66 @@
+from tests.base import SLD
+from tests.base import FakeGeoServerTestCase
+
+
+class RequestTest(FakeGeoServerTestCase):
+    def test_segments_and_paths(self):
+        self.client.create_workspace('ws')
+        response = self.client.request(
+            'GET', ['/geoserver/rest/workspaces', 'ws.json'])
+        self.assertEqual(response.json()['workspace']['name'], 'ws')
+        response = self.client.request('GET',
+                                       '/geoserver/rest/workspaces.json')
+        self.assertTrue(response.ok)
+
+    def test_hooks_apply(self):
+        events = []
+        self.client.add_hook(events.append)
+        self.client.request('POST', '/geoserver/rest/reload')
+        self.assertEqual([(event.method, event.status) for event in events],
+                         [('POST', 200)])
+
+
+class PublishLayerTest(FakeGeoServerTestCase):
+    def setUp(self):
+        super(PublishLayerTest, self).setUp()
+        self.client.create_workspace('ws')
+        self.client.create_datastore('ws', 'ds', {})
+        self.client.upload_style('lines', style_data=SLD % 'lines')
+        self.count = self.server.request_count
+
+    def publish(self, **kwargs):
+        report = self.client.publish_layer('ws', 'ds', 'v', 'SELECT 1',
+                                           **kwargs)
+        self.assertEqual(report.calls, self.server.request_count - self.count)
+        return report
+
+    def test_with_bounding_boxes(self):
+        report = self.publish(native_bbox=(0, 300000, 280000, 625000),
+                              latlon_bbox=(3.2, 50.7, 7.3, 53.6),
+                              style_name='lines')
+        self.assertTrue(report.ok)
+        self.assertEqual([name for name, _ in report.responses],
+                         ['create_feature_type', 'set_default_style'])
+        self.assertTrue(self.client.get_feature_type('ws', 'ds',
+                                                     'v')['enabled'])
+        self.assertEqual(self.client.get_layer('ws:v')['defaultStyle'],
+                         {'name': 'lines'})
+
+    def test_latlon_bbox_of_wgs84(self):
+        report = self.publish(srs='EPSG:4326', srid=4326,
+                              native_bbox=(3.2, 50.7, 7.3, 53.6))
+        self.assertEqual(report.calls, 1)
+
+    def test_without_bounding_boxes(self):
+        report = self.publish(style_name='lines')
+        self.assertTrue(report.ok)
+        self.assertEqual([name for name, _ in report.responses],
+                         ['create_feature_type', 'recalculate_bounding_boxes',
+                          'set_default_style'])
+
+    def test_stops_when_creating_fails(self):
+        self.client.create_feature_type('ws', 'ds', 'v', 'SELECT 1')
+        self.count = self.server.request_count
+        report = self.publish(style_name='lines')
+        self.assertFalse(report.ok)
+        self.assertEqual(report.calls, 1)
@@ -0,0 +1,47 @@
+from geoserverlib.client import GeoserverClientException
+from geoserverlib.cluster import ClusterClient
+from geoserverlib.testing import FakeGeoServer
+from tests.base import FakeGeoServerTestCase
+
+
+class ClusterTest(FakeGeoServerTestCase):
+    def setUp(self):
+        super(ClusterTest, self).setUp()
+        self.other_server = FakeGeoServer().start()
+        self.other = self.make_client(self.other_server)
+        self.cluster = ClusterClient([self.client, self.other])
+
+    def tearDown(self):
+        self.cluster.close()
+        super(ClusterTest, self).tearDown()
+        self.other_server.stop()
+
+    def test_writes_go_to_all_nodes(self):
+        result = self.cluster.create_workspace('ws')
+        self.assertTrue(result.ok)
+        self.assertEqual(self.client.list_workspaces(), ['ws'])
+        self.assertEqual(self.other.list_workspaces(), ['ws'])
+        self.assertEqual(self.cluster.divergence(), {})
+
+    def test_divergence(self):
+        self.cluster.create_workspace('ws')
+        self.client.create_workspace('only_here')
+        differences = self.cluster.divergence()
+        self.assertEqual(differences.keys(), [('workspaces', 'only_here')])
+
+    def test_unreadable_nodes_are_left_out(self):
+        self.client.create_workspace('ws')
+        self.other_server.error_rate = 1.0
+        self.assertEqual(self.cluster.divergence(), {})
+        self.assertRaises(GeoserverClientException, self.cluster.inventory,
+                          self.other)
+
+
+    def test_check_health(self):
+        self.other_server.error_rate = 1.0
+        results = self.cluster.check_health()
+        self.assertTrue(results[self.client.base_url] >= 0)
+        self.assertTrue(isinstance(results[self.other.base_url],
+                                   GeoserverClientException))
+        self.assertEqual([node['healthy'] for node in self.cluster.stats()],
+                         [True, False])
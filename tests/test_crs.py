@@ -0,0 +1,49 @@
+import unittest
+
+from geoserverlib import crs
+from geoserverlib.client import feature_type_xml
+
+
+class NativeCrsTest(unittest.TestCase):
+    def tearDown(self):
+        crs.EPSG_WKT.pop(999999, None)
+        crs.clear_cache()
+
+    def test_bundled_codes(self):
+        element = crs.native_crs_xml(28992)
+        self.assertTrue(element.startswith(
+            '<nativeCRS class="projected">PROJCS["Amersfoort / RD New"'))
+        self.assertTrue(element.endswith('AUTHORITY["EPSG","28992"]]'
+                                         '</nativeCRS>'))
+        self.assertTrue(crs.native_crs_xml('4326').startswith(
+            '<nativeCRS class="geographic">GEOGCS["WGS 84"'))
+        self.assertTrue(crs.native_crs(32631).startswith(
+            'PROJCS["WGS 84 / UTM zone 31N"'))
+
+    def test_unknown_code(self):
+        self.assertEqual(crs.native_crs_xml(999999), '')
+        self.assertEqual(crs.native_crs(999999), None)
+
+    def test_register_crs(self):
+        crs.native_crs_xml(999999)
+        crs.register_crs(999999, 'GEOGCS["Test & test"]')
+        self.assertEqual(crs.native_crs_xml(999999),
+                         '<nativeCRS class="geographic">GEOGCS["Test &amp; '
+                         'test"]</nativeCRS>')
+
+    def test_cached(self):
+        self.assertTrue(crs.native_crs_xml(28992) is
+                        crs.native_crs_xml(28992))
+
+    def test_feature_type_xml(self):
+        xml = feature_type_xml('v', 'SELECT * FROM t WHERE a < 1', srid=25831,
+                               srs='EPSG:25831')
+        self.assertTrue(crs.native_crs_xml(25831) in xml)
+        self.assertTrue('<srs>EPSG:25831</srs>' in xml)
+        self.assertTrue('SELECT * FROM t WHERE a &lt; 1' in xml)
+
+    def test_google_mercator_keeps_its_code(self):
+        self.assertTrue(crs.native_crs(3857).endswith(
+            'AUTHORITY["EPSG","3857"]]'))
+        self.assertTrue(crs.native_crs(900913).endswith(
+            'AUTHORITY["EPSG","900913"]]'))
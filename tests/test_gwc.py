@@ -0,0 +1,58 @@
+from geoserverlib.client import GeoserverClientException
+from geoserverlib.gwc import TileCache
+from tests.base import FakeGeoServerTestCase
+
+
+class TileCacheTest(FakeGeoServerTestCase):
+    def setUp(self):
+        super(TileCacheTest, self).setUp()
+        self.tile_cache = TileCache(self.client)
+
+    def test_enable_and_disable(self):
+        self.assertFalse(self.tile_cache.caching_enabled('ws:a'))
+        self.tile_cache.enable_caching('ws:a', gridsets=['EPSG:28992'])
+        self.assertTrue(self.tile_cache.caching_enabled('ws:a'))
+        self.tile_cache.enable_caching('ws:a', enabled=False)
+        self.assertFalse(self.tile_cache.caching_enabled('ws:a'))
+        self.tile_cache.disable_caching('ws:a')
+        self.assertEqual(self.server.catalog.tile_layers, {})
+
+    def test_enable_many(self):
+        self.assertEqual(
+            self.tile_cache.enable_caching_many(['ws:a', 'ws:b']), {})
+        self.assertEqual(sorted(self.server.catalog.tile_layers),
+                         ['ws:a', 'ws:b'])
+
+    def test_seed_and_wait(self):
+        self.tile_cache.enable_caching_many(['ws:a', 'ws:b'])
+        results = self.tile_cache.seed_many([
+            {'layer': 'ws:a', 'zoom_stop': 12, 'bbox': (0, 0, 1, 1),
+             'srid': 28992},
+            {'layer': 'ws:b', 'type': 'truncate'}])
+        self.assertEqual([result.ok for result in results], [True, True])
+        statuses = []
+        self.tile_cache.wait(['ws:a', 'ws:b'], interval=0.01,
+                             callback=statuses.append)
+        self.assertEqual(len(statuses), 1)
+        self.assertEqual(sorted(statuses[0]), ['ws:a', 'ws:b'])
+        task = statuses[0]['ws:a'][0]
+        self.assertEqual((task.status, task.progress), ('RUNNING', 0.5))
+        self.assertEqual(self.tile_cache.tasks(), [])
+
+    def test_failed_seed(self):
+        self.tile_cache.enable_caching('ws:a')
+        results = self.tile_cache.seed_many([{'layer': 'ws:a'},
+                                             {'layer': 'ws:unknown'}])
+        self.assertEqual([result.ok for result in results], [True, False])
+        self.assertTrue(isinstance(results[1].error,
+                                   GeoserverClientException))
+        self.assertRaises(GeoserverClientException, self.tile_cache.seed,
+                          'ws:unknown')
+        self.assertRaises(ValueError, self.tile_cache.seed, 'ws:a',
+                          type='unknown')
+
+    def test_wait_timeout(self):
+        self.tile_cache.enable_caching('ws:a')
+        self.tile_cache.seed('ws:a')
+        self.assertRaises(GeoserverClientException, self.tile_cache.wait,
+                          ['ws:a'], interval=0.01, timeout=0)
@@ -0,0 +1,54 @@
+import os
+import shutil
+import tempfile
+
+from geoserverlib.client import GeoserverClientException
+from geoserverlib.importer import Importer
+from tests.base import FakeGeoServerTestCase
+
+
+class ImporterTest(FakeGeoServerTestCase):
+    def setUp(self):
+        super(ImporterTest, self).setUp()
+        self.client.create_workspace('ws')
+        self.importer = Importer(self.client)
+
+    def test_import_file_task(self):
+        import_id = self.importer.create_import('ws')
+        tasks = self.importer.add_file_task(import_id, '/data/roads.shp')
+        self.assertEqual([task['state'] for task in tasks], ['READY'])
+        self.importer.run(import_id)
+        polls = []
+        state = self.importer.wait(
+            import_id, interval=0.01,
+            callback=lambda state, progress: polls.append((state, progress)))
+        self.assertEqual(state, 'COMPLETE')
+        self.assertEqual(polls[0], ('RUNNING', {0: {
+            'progress': 1, 'total': 2, 'state': 'RUNNING'}}))
+        self.assertEqual(
+            [task['state'] for task in self.importer.get_tasks(import_id)],
+            ['COMPLETE'])
+        self.assertTrue(self.client.layer_exists('ws:roads'))
+
+    def test_import_uploaded_files(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'areas.zip')
+            with open(path, 'wb') as upload:
+                upload.write(os.urandom(1000))
+            import_id = self.importer.create_import('ws', datastore='ds')
+            self.importer.upload_task(import_id, path)
+        finally:
+            shutil.rmtree(directory)
+        self.importer.run(import_id)
+        self.assertEqual(self.importer.wait(import_id, interval=0.01),
+                         'COMPLETE')
+        self.assertEqual(self.client.list_feature_types('ws', 'ds'),
+                         ['areas'])
+        self.importer.delete_import(import_id)
+        self.assertRaises(GeoserverClientException, self.importer.get_import,
+                          import_id)
+
+    def test_unknown_workspace(self):
+        self.assertRaises(GeoserverClientException,
+                          self.importer.create_import, 'unknown')
@@ -0,0 +1,163 @@
+import socket
+import threading
+import time
+import unittest
+
+import requests
+
+from geoserverlib.client import GeoserverClient
+from geoserverlib.client import url
+from geoserverlib.limiter import AdaptiveLimiter
+from geoserverlib.limiter import RetryPolicy
+from geoserverlib.limiter import not_sent
+from geoserverlib.testing import FakeGeoServer
+from tests.base import FakeGeoServerTestCase
+
+
+class Response(object):
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class AdaptiveLimiterTest(unittest.TestCase):
+    def test_grows_on_success(self):
+        limiter = AdaptiveLimiter(initial=2, maximum=4)
+        for _ in range(10):
+            limiter.acquire()
+            limiter.release(0.01, True)
+        self.assertEqual(limiter.stats()['limit'], 4)
+
+    def test_halves_once_per_round_of_failures(self):
+        limiter = AdaptiveLimiter(initial=8)
+        for _ in range(8):
+            limiter.acquire()
+            limiter.release(0.01, False)
+        self.assertEqual(limiter.stats()['limit'], 4)
+        for _ in range(4):
+            limiter.acquire()
+            limiter.release(0.01, False)
+        self.assertEqual(limiter.stats()['limit'], 2)
+
+    def test_slow_responses_are_congestion(self):
+        limiter = AdaptiveLimiter(initial=1, target_latency=0.1)
+        limiter.acquire()
+        limiter.release(1.0, True)
+        self.assertEqual(limiter.stats()['congested'], 1)
+
+    def test_caps_concurrency(self):
+        limiter = AdaptiveLimiter(initial=3, maximum=3)
+        state = {'running': 0, 'peak': 0}
+        lock = threading.Lock()
+
+        def work():
+            with limiter.slot():
+                with lock:
+                    state['running'] += 1
+                    state['peak'] = max(state['peak'], state['running'])
+                time.sleep(0.01)
+                with lock:
+                    state['running'] -= 1
+
+        threads = [threading.Thread(target=work) for _ in range(12)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(state['peak'], 3)
+        self.assertEqual(limiter.stats()['in_flight'], 0)
+
+
+class RetryPolicyTest(unittest.TestCase):
+    def test_retries_transient_statuses_of_idempotent_methods(self):
+        retry = RetryPolicy(retries=2)
+        self.assertTrue(retry.should_retry('GET', 0, Response(503)))
+        self.assertTrue(retry.should_retry('PUT', 1, Response(502)))
+        self.assertFalse(retry.should_retry('GET', 2, Response(503)))
+        self.assertFalse(retry.should_retry('GET', 0, Response(404)))
+
+    def test_post_is_not_retried_once_sent(self):
+        retry = RetryPolicy()
+        self.assertFalse(retry.should_retry('POST', 0, Response(503)))
+        self.assertFalse(retry.should_retry(
+            'POST', 0, error=requests.ReadTimeout()))
+        self.assertTrue(retry.should_retry(
+            'POST', 0, error=requests.ConnectTimeout()))
+        self.assertTrue(retry.should_retry(
+            'GET', 0, error=requests.ReadTimeout()))
+
+    def test_refused_connection_was_not_sent(self):
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        port = listener.getsockname()[1]
+        listener.close()
+        try:
+            requests.post('http://127.0.0.1:%d/' % port)
+        except requests.ConnectionError as e:
+            self.assertTrue(not_sent(e))
+        self.assertFalse(not_sent(requests.ConnectionError(
+            'Connection aborted.')))
+
+    def test_delay_grows(self):
+        retry = RetryPolicy(backoff=1.0, max_backoff=4.0)
+        self.assertTrue(0.5 <= retry.delay(0) <= 1.0)
+        self.assertTrue(2.0 <= retry.delay(2) <= 4.0)
+        self.assertTrue(2.0 <= retry.delay(10) <= 4.0)
+
+
+class RetryClientTest(FakeGeoServerTestCase):
+    def test_get_is_retried(self):
+        retry = RetryPolicy(retries=2, backoff=0.001)
+        client = self.make_client(retry=retry)
+        self.server.error_rate = 1.0
+        self.assertEqual(client.list_workspaces(), None)
+        self.assertEqual(self.server.request_count, 3)
+        self.assertEqual(retry.retried, 2)
+
+    def test_post_is_sent_once(self):
+        retry = RetryPolicy(retries=2, backoff=0.001)
+        client = self.make_client(retry=retry)
+        self.server.error_rate = 1.0
+        response = client._request(
+            'POST', url(client.base_url, ['/geoserver/rest/workspaces']),
+            data='{"workspace": {"name": "ws"}}')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.server.request_count, 1)
+
+    def test_post_timing_out_is_not_sent_again(self):
+        server = FakeGeoServer(latency=0.2).start()
+        try:
+            client = self.make_client(server, timeout=0.05,
+                                      retry=RetryPolicy(backoff=0.001))
+            self.assertRaises(
+                requests.Timeout, client._request, 'POST',
+                url(client.base_url, ['/geoserver/rest/workspaces']),
+                data='{"workspace": {"name": "ws"}}',
+                headers={'content-type': 'application/json'})
+            time.sleep(0.3)
+            self.assertEqual(server.request_count, 1)
+            self.assertEqual(server.catalog.workspaces.keys(), ['ws'])
+        finally:
+            server.stop()
+
+    def test_limiter_counts_failures(self):
+        limiter = AdaptiveLimiter(initial=1)
+        client = self.make_client(limiter=limiter)
+        client.list_workspaces()
+        self.server.error_rate = 1.0
+        client.list_workspaces()
+        stats = limiter.stats()
+        self.assertEqual((stats['successes'], stats['congested']), (1, 1))
+
+
+class UnreachableServerTest(unittest.TestCase):
+    def test_post_is_retried_when_refused(self):
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        port = listener.getsockname()[1]
+        listener.close()
+        retry = RetryPolicy(retries=2, backoff=0.001)
+        client = GeoserverClient('127.0.0.1', port, 'admin', 'geoserver',
+                                 retry=retry)
+        self.assertRaises(requests.ConnectionError, client._request, 'POST',
+                          url(client.base_url, ['/geoserver/rest/reload']))
+        self.assertEqual(retry.retried, 2)
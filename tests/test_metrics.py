@@ -0,0 +1,98 @@
+import socket
+import unittest
+
+from geoserverlib.metrics import MetricsCollector
+from geoserverlib.metrics import RequestEvent
+from geoserverlib.metrics import StatsdHook
+from geoserverlib.metrics import url_template
+from tests.base import FakeGeoServerTestCase
+
+
+def event(status=200, latency=0.1):
+    return RequestEvent('GET', 'http://localhost/geoserver/rest/workspaces/'
+                        'ws.json', status=status, latency=latency)
+
+
+class UrlTemplateTest(unittest.TestCase):
+    def test_names_become_placeholders(self):
+        self.assertEqual(
+            url_template('http://localhost:8080/geoserver/rest/workspaces/ws/'
+                         'datastores/ds/featuretypes/v.xml?recalculate=x'),
+            '/geoserver/rest/workspaces/{ws}/datastores/{ds}/'
+            'featuretypes/{ft}.xml')
+        self.assertEqual(url_template('http://localhost/geoserver/rest/'
+                                      'workspaces.json'),
+                         '/geoserver/rest/workspaces.json')
+        self.assertEqual(url_template('http://localhost/geoserver/rest/'
+                                      'styles/'),
+                         '/geoserver/rest/styles/')
+
+
+class MetricsCollectorTest(FakeGeoServerTestCase):
+    def setUp(self):
+        self.metrics = MetricsCollector()
+        self.client_kwargs = {'hooks': [self.metrics]}
+        super(MetricsCollectorTest, self).setUp()
+
+    def test_summary_per_endpoint(self):
+        self.client.create_workspace('ws')
+        self.client.get_layer('ws:missing')
+        self.client.get_layer('ws:missing')
+        rows = dict(((row['method'], row['endpoint']), row)
+                    for row in self.metrics.summary())
+        layer = rows[('GET', '/geoserver/rest/layers/{layer}.json')]
+        self.assertEqual((layer['count'], layer['errors']), (2, 2))
+        self.assertTrue(layer['p50'] <= layer['p99'])
+        post = rows[('POST', '/geoserver/rest/workspaces')]
+        self.assertEqual((post['count'], post['errors']), (1, 0))
+        self.assertTrue(post['bytes_sent'] > 0)
+
+    def test_to_prometheus(self):
+        self.client.get_layer('ws:missing')
+        text = self.metrics.to_prometheus()
+        labels = 'method="GET",endpoint="/geoserver/rest/layers/{layer}.json"'
+        self.assertTrue('geoserverlib_requests_total{%s,status="404"} 1\n' %
+                        labels in text)
+        self.assertTrue('geoserverlib_request_latency_seconds_count{%s} 1\n'
+                        % labels in text)
+        self.assertTrue('# TYPE geoserverlib_request_latency_seconds summary'
+                        in text)
+
+    def test_reset(self):
+        self.client.list_workspaces()
+        self.metrics.reset()
+        self.assertEqual(self.metrics.summary(), [])
+
+
+class StatsdHookTest(unittest.TestCase):
+    def test_sends_a_packet_per_request(self):
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(('127.0.0.1', 0))
+        receiver.settimeout(5)
+        hook = StatsdHook('127.0.0.1', receiver.getsockname()[1])
+        try:
+            hook(event(latency=0.25))
+            name = 'geoserverlib.get.geoserver_rest_workspaces_ws_json'
+            self.assertEqual(receiver.recv(1024),
+                             '%s.time:250|ms\n%s.status_200:1|c' % (name,
+                                                                    name))
+        finally:
+            hook.socket.close()
+            receiver.close()
+
+
+class ToStatsdTest(unittest.TestCase):
+    def test_counters_are_deltas(self):
+        metrics = MetricsCollector()
+        metrics(event())
+        metrics(event(status=500))
+        name = 'geoserverlib.get.geoserver_rest_workspaces_ws_json'
+        lines = metrics.to_statsd()
+        self.assertEqual(lines[:2], ['%s.count:2|c' % name,
+                                     '%s.errors:1|c' % name])
+        self.assertEqual(lines[2], '%s.p50:100|g' % name)
+        metrics(event())
+        self.assertEqual(metrics.to_statsd()[:2], ['%s.count:1|c' % name,
+                                                   '%s.errors:0|c' % name])
+        self.assertEqual(metrics.to_statsd()[:2], ['%s.count:0|c' % name,
+                                                   '%s.errors:0|c' % name])
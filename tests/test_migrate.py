@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+
+from geoserverlib.migrate import Journal
+from geoserverlib.migrate import migrate
+from geoserverlib.provision import provision
+from geoserverlib.testing import FakeGeoServer
+from tests.base import SLD
+from tests.base import FakeGeoServerTestCase
+
+
+MANIFEST = {
+    'workspaces': ['ws'],
+    'datastores': [{'workspace': 'ws', 'name': 'ds',
+                    'connection_parameters': {'dbtype': 'postgis'}}],
+    'feature_types': [{'workspace': 'ws', 'datastore': 'ds',
+                       'name': 'view_%d' % i, 'sql': 'SELECT %d' % i}
+                      for i in range(3)],
+    'styles': [{'name': 'style', 'data': SLD % 'style'}],
+    'layer_styles': [{'workspace': 'ws', 'datastore': 'ds',
+                      'layer': 'view_0', 'style': 'style'}],
+}
+
+
+class MigrateTest(FakeGeoServerTestCase):
+    def setUp(self):
+        super(MigrateTest, self).setUp()
+        self.assertTrue(provision(self.client, MANIFEST).ok)
+        self.target_server = FakeGeoServer().start()
+        self.target = self.make_client(self.target_server)
+        self.directory = tempfile.mkdtemp()
+        self.journal = os.path.join(self.directory, 'migration.journal')
+
+    def tearDown(self):
+        super(MigrateTest, self).tearDown()
+        self.target_server.stop()
+        shutil.rmtree(self.directory)
+
+    def test_copies_the_catalog(self):
+        report = migrate(self.client, self.target)
+        self.assertTrue(report.ok, report.failed)
+        self.assertEqual(sorted(self.target.list_feature_types('ws', 'ds')),
+                         ['view_0', 'view_1', 'view_2'])
+        self.assertEqual(self.target.get_style_body('style'), SLD % 'style')
+        self.assertEqual(self.target.get_layer('ws:view_0')['defaultStyle'],
+                         {'name': 'style'})
+
+    def test_resume_from_journal(self):
+        self.target_server.error_rate = 1.0
+        failed = migrate(self.client, self.target, journal=self.journal)
+        self.assertFalse(failed.ok)
+        self.assertEqual(failed.resumed, 0)
+
+        self.target_server.error_rate = 0.0
+        first = migrate(self.client, self.target, journal=self.journal)
+        self.assertTrue(first.ok, first.failed)
+        self.assertEqual(first.resumed, 0)
+        self.assertEqual(len(Journal(self.journal).done), first.writes)
+
+        count = self.target_server.request_count
+        second = migrate(self.client, self.target, journal=self.journal)
+        self.assertTrue(second.ok, second.failed)
+        self.assertEqual(second.writes, 0)
+        self.assertEqual(second.resumed, first.writes)
+        self.assertEqual(self.target_server.request_count, count)
+
+    def test_failing_source(self):
+        self.server.error_rate = 1.0
+        report = migrate(self.client, self.target)
+        self.assertFalse(report.ok)
+        self.assertEqual(report.writes, 0)
+        self.assertEqual(self.target.list_workspaces(), [])
+
+    def test_failed_datastore_read_is_not_written(self):
+        get_datastore = self.client.get_datastore
+        self.client.get_datastore = lambda workspace, datastore: None
+        failed = migrate(self.client, self.target, journal=self.journal)
+        self.assertEqual([key for key, _ in failed.failed],
+                         [('read', 'read_datastore', 'ws', 'ds')])
+        self.assertFalse(self.target.datastore_exists('ws', 'ds'))
+
+        self.client.get_datastore = get_datastore
+        report = migrate(self.client, self.target, journal=self.journal)
+        self.assertTrue(report.ok, report.failed)
+        self.assertTrue(self.target.datastore_exists('ws', 'ds'))
+        self.assertEqual(len(self.target.list_feature_types('ws', 'ds')), 3)
+
+    def test_table_feature_types(self):
+        self.client.add_shapefile_directory('ws', 'shapes', '/data/shapes')
+        report = migrate(self.client, self.target)
+        self.assertTrue(report.ok, report.failed)
+        self.assertEqual(self.target.list_feature_types('ws', 'shapes'),
+                         ['shapes'])
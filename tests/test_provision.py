@@ -0,0 +1,116 @@
+from geoserverlib.client import GeoserverClientException
+from geoserverlib.provision import build_tasks
+from geoserverlib.provision import provision
+from geoserverlib.reconcile import apply
+from geoserverlib.reconcile import plan
+from tests.base import SLD
+from tests.base import FakeGeoServerTestCase
+
+
+def manifest(sql='SELECT * FROM roads'):
+    return {
+        'workspaces': ['ws'],
+        'datastores': [{'workspace': 'ws', 'name': 'ds',
+                        'connection_parameters': {'dbtype': 'postgis'}}],
+        'feature_types': [
+            {'workspace': 'ws', 'datastore': 'ds', 'name': 'roads',
+             'sql': sql},
+            {'workspace': 'ws', 'datastore': 'ds', 'name': 'areas',
+             'sql': 'SELECT * FROM areas WHERE code = %code%',
+             'parameters': [('code', 'x', r'^\w+$')], 'key_column': 'id',
+             'geometry_type': 'MultiPolygon'}],
+        'styles': [{'name': 'lines', 'data': SLD % 'lines'}],
+        'layer_styles': [{'workspace': 'ws', 'datastore': 'ds',
+                          'layer': 'roads', 'style': 'lines'}],
+    }
+
+
+class ProvisionTest(FakeGeoServerTestCase):
+    def test_dependencies(self):
+        tasks = dict((task.key, task) for task in build_tasks(manifest()))
+        self.assertEqual(list(tasks[('datastore', 'ws', 'ds')].depends),
+                         [('workspace', 'ws')])
+        self.assertEqual(
+            sorted(tasks[('layer_style', 'ws', 'roads')].depends),
+            [('bounding_boxes', 'ws', 'ds', 'roads'), ('style', 'lines')])
+
+    def test_provision(self):
+        report = provision(self.client, manifest())
+        self.assertTrue(report.ok, report.summary())
+        self.assertEqual(self.client.get_layer('ws:roads')['defaultStyle'],
+                         {'name': 'lines'})
+        self.assertEqual(sorted(self.client.list_feature_types('ws', 'ds')),
+                         ['areas', 'roads'])
+
+    def test_provision_again(self):
+        self.assertTrue(provision(self.client, manifest()).ok)
+        report = provision(self.client, manifest())
+        self.assertTrue(report.ok, report.summary())
+        self.assertFalse(report.skipped)
+
+    def test_provision_again_after_deleting_the_workspace(self):
+        self.assertTrue(provision(self.client, manifest()).ok)
+        self.client.delete_workspace('ws', recurse=True)
+        # The global style still exists; that is not a failure.
+        report = provision(self.client, manifest())
+        self.assertTrue(report.ok, report.summary())
+        self.assertFalse(report.skipped)
+
+    def test_styles(self):
+        styles = {'styles': [{'name': 'lines', 'data': SLD % 'lines'}]}
+        self.assertTrue(provision(self.client, styles).ok)
+        # An existence check and a single upload.
+        self.assertEqual(self.server.request_count, 2)
+        self.assertEqual(self.client.get_style_body('lines'), SLD % 'lines')
+        report = provision(self.client, styles)
+        self.assertTrue(report.ok, report.summary())
+        self.assertEqual(self.server.request_count, 4)
+
+
+class ReconcileTest(FakeGeoServerTestCase):
+    def test_round_trip(self):
+        changes = plan(self.client, manifest())
+        self.assertFalse(changes.empty)
+        self.assertTrue(apply(self.client, changes).ok)
+        self.assertTrue(plan(self.client, manifest()).empty)
+
+    def test_changed_sql_is_updated(self):
+        apply(self.client, plan(self.client, manifest()))
+        changed = manifest(sql='SELECT * FROM roads WHERE paved')
+        changes = plan(self.client, changed)
+        self.assertEqual(sorted(task.method for task in changes.tasks),
+                         ['recalculate_bounding_boxes',
+                          'update_feature_type'])
+        self.assertTrue(apply(self.client, changes).ok)
+        self.assertTrue(plan(self.client, changed).empty)
+
+    def test_changed_srid_is_updated(self):
+        apply(self.client, plan(self.client, manifest()))
+        changed = manifest()
+        changed['feature_types'][0].update(srs='EPSG:4326', srid=4326)
+        self.assertEqual(len(plan(self.client, changed)), 2)
+        # Only the srid differs: the native CRS of the layer changes too.
+        changed['feature_types'][0]['srs'] = 'EPSG:28992'
+        changes = plan(self.client, changed)
+        self.assertEqual(sorted(task.method for task in changes.tasks),
+                         ['recalculate_bounding_boxes',
+                          'update_feature_type'])
+        self.assertTrue(apply(self.client, changes).ok)
+        self.assertTrue(plan(self.client, changed).empty)
+
+    def test_prune(self):
+        apply(self.client, plan(self.client, manifest()))
+        self.client.create_feature_type('ws', 'ds', 'extra', 'SELECT 1')
+        self.assertTrue(plan(self.client, manifest()).empty)
+        changes = plan(self.client, manifest(), prune=True)
+        self.assertEqual(sorted(task.method for task in changes.tasks),
+                         ['delete_feature_type', 'delete_layer'])
+        self.assertTrue(apply(self.client, changes).ok)
+        self.assertEqual(sorted(self.client.list_feature_types('ws', 'ds')),
+                         ['areas', 'roads'])
+
+    def test_failed_listing_is_not_an_empty_catalog(self):
+        apply(self.client, plan(self.client, manifest()))
+        self.server.error_rate = 1.0
+        self.assertRaises(GeoserverClientException, plan, self.client,
+                          manifest(), prune=True)
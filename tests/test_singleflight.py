@@ -0,0 +1,111 @@
+import threading
+import time
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+
+from geoserverlib.singleflight import FutureSingleFlight
+from geoserverlib.singleflight import SingleFlight
+from tests.base import FakeGeoServerTestCase
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.001)
+
+
+class SingleFlightTest(unittest.TestCase):
+    def run_concurrently(self, flight, function, callers=5):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            self.call(flight, function))) for _ in range(callers)]
+        for thread in threads:
+            thread.start()
+        return threads, results
+
+    def call(self, flight, function):
+        try:
+            return flight.do('key', function)
+        except ValueError as e:
+            return e
+
+    def test_identical_calls_are_executed_once(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def function():
+            calls.append(1)
+            release.wait()
+            return 'result'
+
+        threads, results = self.run_concurrently(flight, function)
+        wait_for(lambda: flight.stats()['calls'] == 5)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['result'] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.stats(), {'calls': 5, 'executed': 1,
+                                          'saved': 4, 'in_flight': 0})
+
+    def test_exceptions_are_shared(self):
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def function():
+            release.wait()
+            raise ValueError('failed')
+
+        threads, results = self.run_concurrently(flight, function, 3)
+        wait_for(lambda: flight.stats()['calls'] == 3)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([str(result) for result in results],
+                         ['failed'] * 3)
+
+    def test_later_calls_execute_again(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do('key', lambda: 1), 1)
+        self.assertEqual(flight.do('key', lambda: 2), 2)
+        self.assertEqual(flight.stats()['executed'], 2)
+
+
+class FutureSingleFlightTest(unittest.TestCase):
+    def test_pending_futures_are_shared(self):
+        executor = ThreadPoolExecutor(max_workers=2)
+        flight = FutureSingleFlight()
+        release = threading.Event()
+        try:
+            first = flight.submit('key', executor.submit, release.wait)
+            second = flight.submit('key', executor.submit, release.wait)
+            self.assertTrue(first is second)
+            release.set()
+            first.result()
+            wait_for(lambda: flight.stats()['in_flight'] == 0)
+            third = flight.submit('key', executor.submit, release.wait)
+            self.assertFalse(third is first)
+        finally:
+            release.set()
+            executor.shutdown()
+
+
+class SingleFlightClientTest(FakeGeoServerTestCase):
+    def test_concurrent_gets_go_over_the_wire_once(self):
+        self.server.latency = 0.1
+        flight = SingleFlight()
+        client = self.make_client(single_flight=flight)
+        executor = ThreadPoolExecutor(max_workers=5)
+        try:
+            futures = [executor.submit(client.list_workspaces)
+                       for _ in range(5)]
+            self.assertEqual([future.result() for future in futures],
+                             [[]] * 5)
+        finally:
+            executor.shutdown()
+        self.assertEqual(self.server.request_count, 1)
+        self.assertEqual(flight.stats()['saved'], 4)
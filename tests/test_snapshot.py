@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+
+from geoserverlib.client import GeoserverClientException
+from geoserverlib.snapshot import export_snapshot
+from geoserverlib.snapshot import read_snapshot
+from tests.base import FakeGeoServerTestCase
+
+
+class SnapshotTest(FakeGeoServerTestCase):
+    def setUp(self):
+        super(SnapshotTest, self).setUp()
+        self.create_layer()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'catalog.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(SnapshotTest, self).tearDown()
+
+    def kinds(self):
+        return sorted(record['kind'] for record in read_snapshot(self.path))
+
+    def test_export(self):
+        report = export_snapshot(self.client, self.path)
+        self.assertTrue(report.ok)
+        self.assertEqual(self.kinds(), ['datastore', 'feature_type', 'layer',
+                                        'workspace'])
+
+    def test_incremental_export(self):
+        export_snapshot(self.client, self.path)
+        report = export_snapshot(self.client, self.path, previous=self.path)
+        self.assertEqual((report.fetched, report.unchanged), (0, 4))
+        self.assertEqual(len(self.kinds()), 4)
+
+    def test_failed_export_keeps_previous_snapshot(self):
+        export_snapshot(self.client, self.path)
+        self.server.error_rate = 1.0
+        report = export_snapshot(self.client, self.path, previous=self.path)
+        self.assertFalse(report.ok)
+        self.assertEqual(report.path, self.path + '.tmp')
+        self.assertEqual(len(self.kinds()), 4)
+
+    def test_failed_requests_are_reported(self):
+        self.server.error_rate = 1.0
+        report = export_snapshot(self.client, self.path)
+        self.assertFalse(report.ok)
+        errors = [error for _, error in report.failed]
+        self.assertTrue(errors)
+        for error in errors:
+            self.assertTrue(isinstance(error, Exception))
+            self.assertTrue(isinstance(error, GeoserverClientException))
@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+
+from geoserverlib.client import GeoserverClientException
+from geoserverlib.styles import sync_styles
+from geoserverlib.styles import upload_styles
+from tests.base import SLD
+from tests.base import FakeGeoServerTestCase
+
+
+class UploadStyleTest(FakeGeoServerTestCase):
+    def test_single_request(self):
+        response = self.client.upload_style('a', style_data=SLD % 'a')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.server.request_count, 1)
+        self.assertEqual(self.client.get_style_body('a'), SLD % 'a')
+        # Unlike create_style, no style without SLD is left behind.
+        self.assertFalse(self.client.upload_style('a',
+                                                  style_data=SLD % 'b').ok)
+        self.assertEqual(self.client.get_style_body('a'), SLD % 'a')
+
+    def test_upload_styles_from_a_dict(self):
+        results = upload_styles(self.client, dict(
+            ('style_%d' % i, SLD % i) for i in range(10)), max_workers=4)
+        self.assertEqual(len(results), 10)
+        self.assertTrue(all(response.ok for response in results.values()))
+        self.assertEqual(self.server.request_count, 10)
+        self.assertEqual(len(self.client.list_styles()), 10)
+
+    def test_upload_styles_from_a_directory(self):
+        directory = tempfile.mkdtemp()
+        try:
+            for name in ('a', 'b'):
+                with open(os.path.join(directory, name + '.sld'),
+                          'w') as sld:
+                    sld.write(SLD % name)
+            results = upload_styles(self.client, directory)
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(sorted(results), ['a', 'b'])
+        self.assertEqual(self.client.get_style_body('b'), SLD % 'b')
+
+
+class SyncStylesTest(FakeGeoServerTestCase):
+    def test_only_changed_styles_are_uploaded(self):
+        styles = {'a': SLD % 'a', 'b': SLD % 'b'}
+        first = sync_styles(self.client, styles)
+        self.assertEqual(sorted(first.created), ['a', 'b'])
+        styles['b'] = SLD % 'changed'
+        second = sync_styles(self.client, styles)
+        self.assertEqual((second.unchanged, second.updated), (['a'], ['b']))
+
+    def test_failed_listing_aborts(self):
+        sync_styles(self.client, {'a': SLD % 'a'})
+        self.server.error_rate = 1.0
+        self.assertRaises(GeoserverClientException, sync_styles,
+                          self.client, {'a': SLD % 'a'})
@@ -0,0 +1,27 @@
+import requests
+
+from tests.base import FakeGeoServerTestCase
+
+
+class FakeGeoServerTest(FakeGeoServerTestCase):
+    def test_catalog_round_trip(self):
+        self.create_layer()
+        self.assertEqual(self.client.list_workspaces(), ['ws'])
+        self.assertEqual(self.client.list_feature_types('ws', 'ds'), ['v'])
+        self.assertEqual(self.client.list_layers(), ['ws:v'])
+        self.assertEqual(self.server.catalog.layers.keys(), ['ws:v'])
+
+    def test_counts_requests(self):
+        self.client.list_workspaces()
+        self.client.list_workspaces()
+        self.assertEqual(self.server.request_count, 2)
+
+    def test_injected_errors(self):
+        self.server.error_rate = 1.0
+        self.assertEqual(self.client.list_workspaces(), None)
+        self.assertEqual(self.client.create_workspace('ws').status_code, 503)
+
+    def test_unknown_paths(self):
+        response = requests.get('http://127.0.0.1:%d/unknown' %
+                                self.server.port)
+        self.assertEqual(response.status_code, 404)
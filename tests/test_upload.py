@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from StringIO import StringIO
+
+from geoserverlib.upload import ProgressFile
+from geoserverlib.upload import ingest_shapefiles
+from geoserverlib.upload import iter_zip
+from tests.base import FakeGeoServerTestCase
+
+
+class ProgressFileTest(unittest.TestCase):
+    def test_reads_in_chunks(self):
+        calls = []
+        body = ProgressFile(StringIO('x' * 2500), 2500,
+                            progress=lambda *args: calls.append(args),
+                            chunk_size=1000)
+        self.assertEqual(len(body), 2500)
+        self.assertEqual([len(chunk) for chunk in body], [1000, 1000, 500])
+        self.assertEqual(len(body), 0)
+        self.assertEqual([(sent, total) for sent, total, _ in calls],
+                         [(1000, 2500), (2000, 2500), (2500, 2500)])
+
+
+class IterZipTest(unittest.TestCase):
+    def read_back(self, members, **kwargs):
+        data = ''.join(iter_zip(members, **kwargs))
+        return zipfile.ZipFile(StringIO(data))
+
+    def test_reads_back_with_zipfile(self):
+        shp = os.urandom(100000)
+        archive = self.read_back([('roads.shp', StringIO(shp)),
+                                  ('roads.dbf', StringIO('dbf'))],
+                                 chunk_size=1000)
+        self.assertEqual(archive.testzip(), None)
+        self.assertEqual(archive.namelist(), ['roads.shp', 'roads.dbf'])
+        self.assertEqual(archive.read('roads.shp'), shp)
+        self.assertEqual(archive.read('roads.dbf'), 'dbf')
+
+    def test_unicode_names(self):
+        archive = self.read_back([(u'caf\xe9.shp', StringIO('shp'))])
+        self.assertEqual(archive.namelist(), [u'caf\xe9.shp'])
+        self.assertEqual(archive.read(u'caf\xe9.shp'), 'shp')
+
+    def test_paths(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'roads.shx')
+            with open(path, 'wb') as shx:
+                shx.write('shx' * 1000)
+            archive = self.read_back([('roads.shx', path)])
+            self.assertEqual(archive.read('roads.shx'), 'shx' * 1000)
+        finally:
+            shutil.rmtree(directory)
+
+
+class UploadShapefileTest(FakeGeoServerTestCase):
+    def setUp(self):
+        super(UploadShapefileTest, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'roads.zip')
+        with open(self.path, 'wb') as zip_file:
+            zip_file.write(os.urandom(5000))
+        self.client.create_workspace('ws')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(UploadShapefileTest, self).tearDown()
+
+    def uploaded_size(self, datastore):
+        datastores = self.server.catalog.workspaces['ws']['datastores']
+        return datastores[datastore]['featuretypes'][datastore]['size']
+
+    def assert_uploaded(self, **kwargs):
+        calls = []
+        response = self.client.upload_shapefile(
+            'ws', 'roads', self.path, chunk_size=1000,
+            progress=lambda *args: calls.append(args), **kwargs)
+        self.assertTrue(response.ok)
+        self.assertEqual(self.uploaded_size('roads'), 5000)
+        self.assertEqual(len(calls), 5)
+        self.assertEqual(calls[-1][:2], (5000, 5000))
+
+    def test_upload(self):
+        self.assert_uploaded()
+
+    def test_upload_with_mmap(self):
+        self.assert_uploaded(use_mmap=True)
+
+    def test_existing_datastore(self):
+        self.client.create_datastore('ws', 'roads', {})
+        self.assertFalse(self.client.upload_shapefile('ws', 'roads',
+                                                      self.path))
+
+    def test_components_from_a_dict(self):
+        members = {'roads.shp': StringIO(os.urandom(3000)),
+                   'roads.dbf': StringIO('dbf' * 100)}
+        expected = ''.join(iter_zip(sorted(
+            (name, StringIO(member.getvalue()))
+            for name, member in members.items())))
+        calls = []
+        response = self.client.upload_shapefile_components(
+            'ws', 'roads', members, progress=lambda *args: calls.append(args))
+        self.assertTrue(response.ok)
+        self.assertEqual(self.uploaded_size('roads'), len(expected))
+        self.assertEqual(calls[-1][:2], (len(expected), None))
+        archive = zipfile.ZipFile(StringIO(expected))
+        self.assertEqual(archive.namelist(), ['roads.dbf', 'roads.shp'])
+
+    def test_components_from_a_shp_path(self):
+        for extension in ('.shp', '.shx', '.dbf', '.txt'):
+            with open(os.path.join(self.directory, 'roads' + extension),
+                      'wb') as component:
+                component.write('data')
+        response = self.client.upload_shapefile_components(
+            'ws', 'roads', os.path.join(self.directory, 'roads.shp'))
+        self.assertTrue(response.ok)
+        self.assertTrue(self.client.datastore_exists('ws', 'roads'))
+
+
+class IngestShapefilesTest(FakeGeoServerTestCase):
+    def setUp(self):
+        super(IngestShapefilesTest, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.client.create_workspace('ws')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(IngestShapefilesTest, self).tearDown()
+
+    def zipfile(self, name):
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as zip_file:
+            zip_file.write(os.urandom(1000))
+        return path
+
+    def test_uploads_all_jobs(self):
+        jobs = [('ws', 'store_%d' % i, self.zipfile('%d.zip' % i))
+                for i in range(5)]
+        results = ingest_shapefiles(self.client, jobs, max_workers=3,
+                                    max_bytes_in_flight=2000)
+        self.assertEqual([result.status for result in results],
+                         ['created'] * 5)
+        self.assertEqual([result.datastore for result in results],
+                         ['store_%d' % i for i in range(5)])
+
+    def test_missing_file_is_a_failed_result(self):
+        missing = os.path.join(self.directory, 'missing.zip')
+        jobs = [('ws', 'a', self.zipfile('a.zip')), ('ws', 'b', missing),
+                ('ws', 'c', self.zipfile('c.zip'))]
+        results = ingest_shapefiles(self.client, jobs)
+        self.assertEqual([result.status for result in results],
+                         ['created', 'error', 'created'])
+        self.assertTrue(isinstance(results[1].error, OSError))
+        self.assertFalse(results[1].ok)
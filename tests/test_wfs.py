@@ -0,0 +1,106 @@
+import time
+
+from StringIO import StringIO
+
+from geoserverlib.client import GeoserverClientException
+from geoserverlib.wfs import FeatureReader
+from geoserverlib.wfs import iter_features
+from geoserverlib.wfs import read_features
+from tests.base import FakeGeoServerTestCase
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.001)
+
+
+def point(i):
+    return {'type': 'Feature', 'id': 'points.%d' % i,
+            'geometry': {'type': 'Point', 'coordinates': [i, 0.5]},
+            'properties': {'n': i}}
+
+
+class FeatureReaderTest(FakeGeoServerTestCase):
+    def setUp(self):
+        super(FeatureReaderTest, self).setUp()
+        self.server.add_features('ws:points', [point(i) for i in range(105)])
+
+    def numbers(self, features):
+        return [feature['properties']['n'] for feature in features]
+
+    def test_pages_in_order(self):
+        self.server.jitter = 0.01
+        reader = FeatureReader(self.client, 'ws:points', page_size=10,
+                               max_workers=4)
+        self.assertEqual(self.numbers(reader), range(105))
+        self.assertEqual((reader.features, reader.pages), (105, 11))
+        self.assertTrue(reader.bytes > 0)
+
+    def test_exact_page_multiple(self):
+        reader = FeatureReader(self.client, 'ws:points', page_size=15,
+                               max_workers=1)
+        self.assertEqual(self.numbers(reader), range(105))
+        # The last, empty page tells that there are no more features.
+        self.assertEqual(self.server.request_count, 8)
+
+    def test_max_features(self):
+        reader = FeatureReader(self.client, 'ws:points', page_size=10,
+                               max_features=25)
+        self.assertEqual(self.numbers(reader), range(25))
+        self.assertEqual(self.server.request_count, 3)
+
+    def test_number_matched(self):
+        reader = FeatureReader(self.client, 'ws:points')
+        self.assertEqual(reader.number_matched(), 105)
+
+    def test_stop_early(self):
+        features = read_features(self.client, 'ws:points', page_size=10)
+        self.assertEqual(next(features)['id'], 'points.0')
+        features.close()
+
+    def test_stop_early_closes_downloaded_pages(self):
+        reader = FeatureReader(self.client, 'ws:points', page_size=10,
+                               max_workers=4)
+        fetch_page = reader.fetch_page
+        spools = []
+
+        def record(*args):
+            spool, size = fetch_page(*args)
+            spools.append(spool)
+            return spool, size
+
+        reader.fetch_page = record
+        features = iter(reader)
+        next(features)
+        wait_for(lambda: len(spools) == 4)
+        features.close()
+        wait_for(lambda: all(spool.closed for spool in spools))
+
+    def test_params(self):
+        reader = FeatureReader(self.client, 'ws:points', srs='EPSG:4326',
+                               bbox=(4, 52, 5, 53), sort_by='n',
+                               properties=['n'],
+                               parameters={'code': 'a;b'})
+        params = reader.params(20, 10)
+        self.assertEqual(params['bbox'], '4.0,52.0,5.0,53.0,EPSG:4326')
+        self.assertEqual(params['viewparams'], r'code:a\;b')
+        self.assertEqual((params['startIndex'], params['count']), (20, 10))
+        self.assertEqual(params['propertyName'], 'n')
+
+    def test_bbox_and_filter_conflict(self):
+        self.assertRaises(GeoserverClientException, FeatureReader,
+                          self.client, 'ws:points', bbox=(0, 0, 1, 1),
+                          cql_filter='n > 1')
+
+    def test_unknown_layer(self):
+        self.assertRaises(GeoserverClientException, list,
+                          read_features(self.client, 'ws:unknown'))
+
+    def test_parse_file(self):
+        features = iter_features(StringIO(
+            '{"type": "FeatureCollection", "features": [{"id": 1}, '
+            '{"id": 2}]}'))
+        self.assertEqual([feature['id'] for feature in features], [1, 2])